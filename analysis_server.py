@@ -0,0 +1,502 @@
+"""
+Long-running local analysis service: the analyser's functions behind a small HTTP/JSON API.
+
+A script run starts cold every time: imports, new upstream connections, no data in memory.
+The server pays that once and then keeps everything warm across requests:
+- one TickerSnapshot per ticker is shared by every request (profile, history with its SMAs,
+  financials), so a ticker's data is loaded once and indicators are computed once;
+- responses are cached for a short, per-endpoint time (prices for QUOTE_TTL_SECONDS);
+- concurrent identical requests share one call (single-flight) instead of fetching in parallel;
+- the Finnhub client and yfinance keep their pooled keep-alive connections for the whole process.
+The server is asyncio-based (standard library only); the blocking data calls run on a thread pool.
+
+Endpoints (GET, JSON responses):
+    /quote?tickers=AAPL,MSFT          current prices
+    /profile?ticker=AAPL              company details
+    /signal?ticker=AAPL&period=1y     price, SMAs, market signal and buy/sell recommendation
+    /history?ticker=AAPL&bars=60      daily closes with the 20- and 50-day SMAs
+    /compare?tickers=AAPL,MSFT,GOOG   comparison table
+    /report?ticker=AAPL               writes the text and PDF report and returns their paths
+    /health, /stats                   liveness, cache and upstream counters
+
+Usage:
+    python analysis_server.py --port 8050 --preload AAPL,MSFT,GOOG
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import json
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+import stock_analyser_with_ai as analyser
+
+# --- Configuration ---
+DEFAULT_HOST = '127.0.0.1'  # Local only; put a reverse proxy in front to expose it
+DEFAULT_PORT = 8050
+SERVER_THREADS = 16  # Threads running the blocking data calls
+SNAPSHOT_MAX_AGE_SECONDS = 15 * 60  # A ticker's shared data (profile, history, SMAs) is reloaded after this
+MAX_SNAPSHOTS = 2000  # Least recently used tickers beyond this are dropped from memory
+MAX_CACHED_RESPONSES = 10000
+QUOTE_TTL_SECONDS = analyser.QUOTE_CACHE_TTL_SECONDS
+SIGNAL_TTL_SECONDS = 15  # Signals move with the price
+COMPARE_TTL_SECONDS = 15
+HISTORY_TTL_SECONDS = 5 * 60
+PROFILE_TTL_SECONDS = 6 * 3600
+REPORT_TTL_SECONDS = 5 * 60
+SYMBOL_TTL_SECONDS = 24 * 3600
+MAX_TICKERS_PER_REQUEST = 200
+# yfinance's daily history periods; anything else is rejected before it reaches the snapshot pool
+VALID_PERIODS = ('1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max')
+MAX_HEADER_LINES = 100
+
+
+class HTTPError(Exception):
+    """An error response: `status` and a message sent as {"error": message}."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class SingleFlightCache:
+    """
+    Asyncio TTL cache whose concurrent misses for one key share a single call (single-flight).
+    Values are computed by blocking functions on `executor`; failures are not cached, so the
+    next request tries again. Only use it from the event loop thread.
+    """
+
+    def __init__(self, executor, max_entries=MAX_CACHED_RESPONSES):
+        self.executor = executor
+        self.max_entries = max_entries
+        self._values = collections.OrderedDict() # key -> (value, expires at)
+        self._in_flight = {} # key -> future of the running call
+        self.stats = collections.Counter()
+
+    def _store(self, key, value, ttl):
+        self._values[key] = (value, time.monotonic() + ttl)
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_entries:
+            self._values.popitem(last=False)
+
+    async def get(self, key, func, ttl):
+        entry = self._values.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            self._values.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[0]
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+        else:
+            self.stats['misses'] += 1
+            future = asyncio.get_running_loop().run_in_executor(self.executor, func)
+            self._in_flight[key] = future
+
+            def finished(future):
+                self._in_flight.pop(key, None)
+                if not future.cancelled() and future.exception() is None and ttl > 0:
+                    self._store(key, future.result(), ttl)
+            future.add_done_callback(finished)
+        # Shielded: a client that disconnects does not cancel the call other requests are waiting on
+        return await asyncio.shield(future)
+
+    def __len__(self):
+        return len(self._values)
+
+
+class SnapshotPool:
+    """
+    Shared TickerSnapshots: every request for a ticker (and period) uses the same snapshot until it is
+    SNAPSHOT_MAX_AGE_SECONDS old, so each dataset is loaded once and then served from memory.
+    Failed or empty loads are not kept: a reused snapshot retries them upstream on the next request.
+    Thread-safe; the least recently used snapshots beyond `max_snapshots` are dropped.
+    """
+
+    def __init__(self, max_age=SNAPSHOT_MAX_AGE_SECONDS, max_snapshots=MAX_SNAPSHOTS):
+        self.max_age = max_age
+        self.max_snapshots = max_snapshots
+        self._snapshots = collections.OrderedDict() # (ticker, period) -> (snapshot, created at)
+        self._lock = threading.Lock()
+
+    def get_many(self, ticker_symbols, period="1y"):
+        """
+        Snapshots for the tickers, in order. Histories of newly created snapshots are loaded in bulk.
+        """
+        now = time.monotonic()
+        snapshots, created, reused = [], [], []
+        with self._lock:
+            for ticker in ticker_symbols:
+                entry = self._snapshots.get((ticker, period))
+                if entry is None or now - entry[1] > self.max_age:
+                    entry = (analyser.TickerSnapshot(ticker, period=period), now)
+                    self._snapshots[(ticker, period)] = entry
+                    created.append(entry[0])
+                else:
+                    reused.append(entry[0])
+                self._snapshots.move_to_end((ticker, period))
+                snapshots.append(entry[0])
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        for snapshot in reused:
+            snapshot.forget_missing() # The getters return None on transient failures; do not pin that
+        if len(created) > 1:
+            analyser.prefetch_histories(created)
+        return snapshots
+
+    def get(self, ticker_symbol, period="1y"):
+        return self.get_many([ticker_symbol], period)[0]
+
+    def __len__(self):
+        return len(self._snapshots)
+
+
+class _ThreadMutedStdout:
+    """
+    sys.stdout wrapper that drops what a thread writes while it is muted. contextlib.redirect_stdout
+    swaps sys.stdout for the whole process, which concurrent handler threads would undo for each other.
+    """
+    _install_lock = threading.Lock()
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def write(self, text):
+        if getattr(self._local, 'muted', False):
+            return len(text)
+        return self._stream.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    @classmethod
+    @contextlib.contextmanager
+    def muted(cls):
+        """Silences the analyser's progress prints in the calling thread only."""
+        with cls._install_lock:
+            if not isinstance(sys.stdout, cls):
+                sys.stdout = cls(sys.stdout)
+            stdout = sys.stdout
+        stdout._local.muted = True
+        try:
+            yield
+        finally:
+            stdout._local.muted = False
+
+
+def _json_value(value):
+    """Plain JSON value: NaN and missing values as None, NumPy/pandas scalars as Python ones."""
+    if isinstance(value, dict):
+        return {str(key): _json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+def _records(df):
+    """A DataFrame (its index included) as a list of JSON-ready dicts."""
+    return json.loads(df.reset_index().to_json(orient='records', date_format='iso'))
+
+
+class AnalysisService:
+    """
+    The endpoints: each resolves its tickers, then serves the response from the cache or computes it
+    once on the thread pool, however many identical requests arrive meanwhile.
+    """
+
+    def __init__(self, threads=SERVER_THREADS, reports_dir='reports', allow_search=True):
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='analysis')
+        self.cache = SingleFlightCache(self.executor)
+        self.snapshots = SnapshotPool()
+        self.reports_dir = reports_dir
+        self.allow_search = allow_search
+        self.started = time.time()
+        self.requests = collections.Counter()
+        self.routes = {
+            '/quote': self.quote,
+            '/profile': self.profile,
+            '/signal': self.signal,
+            '/history': self.history,
+            '/compare': self.compare,
+            '/report': self.report,
+            '/health': self.health,
+            '/stats': self.stats,
+        }
+
+    # --- Parameters ---
+
+    def _resolve(self, query):
+        symbol = analyser.resolve_symbol(query, allow_search=self.allow_search)
+        if symbol is None and ' ' not in query.strip():
+            symbol = query.strip().upper() # Kept as typed, like the command line does
+        return symbol
+
+    async def _ticker(self, query):
+        query = query.strip()
+        symbol = await self.cache.get(('symbol', query.upper()), lambda: self._resolve(query), SYMBOL_TTL_SECONDS)
+        if symbol is None:
+            raise HTTPError(404, f"Could not resolve '{query}' to a ticker symbol.")
+        return symbol
+
+    async def _tickers(self, params, name='tickers'):
+        entries = [part for value in params.get(name, []) + params.get('ticker', [])
+                   for part in value.split(',') if part.strip()]
+        if not entries:
+            raise HTTPError(400, f"Missing '{name}' parameter.")
+        if len(entries) > MAX_TICKERS_PER_REQUEST:
+            raise HTTPError(400, f"At most {MAX_TICKERS_PER_REQUEST} tickers per request.")
+        symbols = await asyncio.gather(*(self._ticker(entry) for entry in entries))
+        return list(dict.fromkeys(symbols))
+
+    async def _one_ticker(self, params):
+        values = params.get('ticker') or params.get('tickers')
+        if not values or not values[0].strip():
+            raise HTTPError(400, "Missing 'ticker' parameter.")
+        return await self._ticker(values[0])
+
+    @staticmethod
+    def _period(params):
+        period = params.get('period', ['1y'])[0].strip().lower()
+        if period not in VALID_PERIODS:
+            raise HTTPError(400, f"'period' must be one of {', '.join(VALID_PERIODS)}.")
+        return period
+
+    @staticmethod
+    def _int_param(params, name, default):
+        value = params.get(name, [None])[0]
+        if value is None:
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise HTTPError(400, f"'{name}' must be a whole number.")
+
+    def _price(self, ticker_symbol):
+        # The analyser's batched quotes keep prices for QUOTE_TTL_SECONDS across requests
+        return analyser.get_current_prices([ticker_symbol])[ticker_symbol]
+
+    # --- Endpoints ---
+
+    async def quote(self, params):
+        tickers = await self._tickers(params)
+
+        def load():
+            prices = analyser.get_current_prices(tickers)
+            return [{'Ticker': ticker, 'Price': prices[ticker]} for ticker in tickers]
+        return await self.cache.get(('quote', tuple(tickers)), load, QUOTE_TTL_SECONDS)
+
+    async def profile(self, params):
+        ticker = await self._one_ticker(params)
+
+        def load():
+            details = analyser.get_company_details(ticker, self.snapshots.get(ticker))
+            if details['Error']:
+                raise HTTPError(404, f"{ticker}: {details['Error']}") # Raised, so it is not cached
+            return details
+        return await self.cache.get(('profile', ticker), load, PROFILE_TTL_SECONDS)
+
+    async def signal(self, params):
+        ticker = await self._one_ticker(params)
+        period = self._period(params)
+
+        def load():
+            # The pooled snapshot may be minutes old: judge on the live price only (null if there is none)
+            snapshot = self.snapshots.get(ticker, period).priced(self._price(ticker))
+            result = analyser.get_analysis(ticker, snapshot)
+            recommendation = analyser.get_buy_sell_recommendation(ticker, snapshot)
+            result['Recommendation'] = recommendation['Recommendation']
+            result['Recommendation Reasons'] = recommendation['Reasons']
+            return result
+        return await self.cache.get(('signal', ticker, period), load, SIGNAL_TTL_SECONDS)
+
+    async def history(self, params):
+        ticker = await self._one_ticker(params)
+        period = self._period(params)
+        bars = self._int_param(params, 'bars', None)
+
+        def load():
+            # The SMAs are computed once per snapshot and shared with /signal
+            df = self.snapshots.get(ticker, period).history_with_smas()
+            if df is None or df.empty:
+                raise HTTPError(404, f"{ticker}: no price history")
+            if 'SMA_20' not in df.columns: # Fewer than 50 days
+                df = df.assign(SMA_20=np.nan, SMA_50=np.nan)
+            return _records(df[['Close', 'SMA_20', 'SMA_50']])
+        records = await self.cache.get(('history', ticker, period), load, HISTORY_TTL_SECONDS)
+        return records[-bars:] if bars else records
+
+    async def compare(self, params):
+        tickers = await self._tickers(params)
+
+        def load():
+            # Priced views: compare_table seeds each with the live price and never falls back to an older one
+            snapshots = [snapshot.priced(None) for snapshot in self.snapshots.get_many(tickers)]
+            table, _, _ = analyser.compare_table(tickers, snapshots)
+            return _records(table)
+        return await self.cache.get(('compare', tuple(tickers)), load, COMPARE_TTL_SECONDS)
+
+    async def report(self, params):
+        ticker = await self._one_ticker(params)
+
+        def load():
+            snapshot = self.snapshots.get(ticker).priced(self._price(ticker))
+            os.makedirs(self.reports_dir, exist_ok=True)
+            with _ThreadMutedStdout.muted(): # The report prints its progress; keep it out of the server's output
+                text_path, pdf_path = analyser.generate_stock_report(ticker, snapshot, output_dir=self.reports_dir,
+                                                                     show_analysis=False)
+            if pdf_path is None:
+                raise HTTPError(500, f"{ticker}: PDF could not be generated")
+            return {'Ticker': ticker, 'Text': text_path, 'PDF': pdf_path}
+        return await self.cache.get(('report', ticker), load, REPORT_TTL_SECONDS)
+
+    async def health(self, params):
+        return {'status': 'ok', 'uptime_seconds': round(time.time() - self.started, 1)}
+
+    async def stats(self, params):
+        return {'requests': dict(self.requests), 'cache': dict(self.cache.stats), 'cached_responses': len(self.cache),
+                'snapshots': len(self.snapshots), 'upstream_calls': dict(analyser.UPSTREAM_CALL_COUNTS)}
+
+    async def dispatch(self, method, target):
+        """Returns (status, JSON-ready payload) for one request."""
+        url = urlsplit(target)
+        route = self.routes.get(url.path.rstrip('/') or '/')
+        try:
+            if route is None:
+                raise HTTPError(404, f"Unknown endpoint '{url.path}'.")
+            if method not in ('GET', 'HEAD'):
+                raise HTTPError(405, "Only GET requests are supported.")
+            self.requests[url.path] += 1
+            return 200, await route(parse_qs(url.query))
+        except HTTPError as e:
+            return e.status, {'error': e.message}
+        except Exception as e:
+            return 500, {'error': f"{type(e).__name__}: {e}"}
+
+    async def preload(self, ticker_symbols):
+        """Loads prices, histories (with SMAs) and profiles of the tickers, so their first requests are warm."""
+        def load():
+            snapshots = self.snapshots.get_many(ticker_symbols)
+            analyser.get_current_prices(ticker_symbols)
+            analyser.prefetch_snapshots(snapshots, fields=('profile',))
+            for snapshot in snapshots:
+                snapshot.history_with_smas()
+        await asyncio.get_running_loop().run_in_executor(self.executor, load)
+
+
+# --- HTTP ---
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+async def _read_request(reader):
+    """Reads one request head. Returns (method, target, version, headers), or None at end of stream."""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, target, version = request_line.decode('latin-1').split()
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if int(headers.get('content-length') or 0): # Bodies are not used; read past them
+        await reader.readexactly(int(headers['content-length']))
+    return method, target, version, headers
+
+
+def make_handler(service, log=True):
+    """The asyncio connection handler: HTTP/1.1 with keep-alive, one request at a time per connection."""
+    async def handle(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except ValueError:
+                    request = ('GET', '/', 'HTTP/1.0', {}) # Malformed request line: answered with 400 below
+                    status, payload = 400, {'error': "Malformed request."}
+                else:
+                    if request is None:
+                        break
+                    start = time.perf_counter()
+                    status, payload = await service.dispatch(request[0], request[1])
+                    if log:
+                        print(f"{request[0]} {request[1]} {status} {(time.perf_counter() - start) * 1000:.1f}ms",
+                              file=sys.stderr)
+                method, _, version, headers = request
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close' and status != 400
+                body = json.dumps(_json_value(payload)).encode('utf-8')
+                head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+                writer.write(head.encode('latin-1') + (b'' if method == 'HEAD' else body))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    return handle
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, threads=SERVER_THREADS, reports_dir='reports',
+                preload=(), allow_search=True, log=True):
+    """Runs the server until cancelled."""
+    service = AnalysisService(threads=threads, reports_dir=reports_dir, allow_search=allow_search)
+    if preload:
+        start = time.perf_counter()
+        await service.preload(list(preload))
+        print(f"Preloaded {len(preload)} ticker(s) in {time.perf_counter() - start:.1f}s.", file=sys.stderr)
+    server = await asyncio.start_server(make_handler(service, log), host, port)
+    print(f"Serving on http://{host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the stock analyser over a local HTTP/JSON API.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"Address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument('--threads', type=int, default=SERVER_THREADS, help="Threads for the blocking data calls")
+    parser.add_argument('--reports-dir', default='reports', help="Folder /report writes to (default: reports)")
+    parser.add_argument('--preload', default='', help="Comma-separated tickers, or a file with one per line, to load at startup")
+    parser.add_argument('--no-search', action='store_true', help="Resolve names from the local symbol index only")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Do not log requests")
+    args = parser.parse_args(argv)
+
+    analyser.CHART_OUTPUT_MODE = 'none' # Never open browser windows from a server
+    if os.path.isfile(args.preload):
+        preload = analyser.screener.read_universe(args.preload)
+    else:
+        preload = [ticker.strip().upper() for ticker in args.preload.split(',') if ticker.strip()]
+    try:
+        asyncio.run(serve(args.host, args.port, args.threads, args.reports_dir, preload,
+                          allow_search=not args.no_search, log=not args.quiet))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""
+Vectorized backtests of the SMA crossover recommendation rules.
+
+The rules from `signals` are replayed at every daily close for every ticker at once:
+a BUY (or strong BUY) opens a long position at that close, a SELL closes it (or goes
+short with `allow_short`), and HOLD keeps whatever position is open. Positions, returns,
+equity curves and trade statistics are computed with array arithmetic over the whole
+(dates x tickers) matrix; there is no per-bar Python loop. Window-length sweeps run
+across a process pool.
+
+Usage:
+    python backtest.py universe.txt --period 10y --short 10,20,30 --long 50,100,200 -o sweep.csv
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from bulk_history import load_histories
+from history_cache import HistoryCache, DEFAULT_CACHE_DIR
+from screener import read_universe
+from signals import signal_code_matrix, HOLD
+
+# --- Configuration ---
+TRADING_DAYS_PER_YEAR = 252
+DEFAULT_COST_BPS = 5.0  # Charged on every unit of position change
+
+
+@dataclass
+class BacktestResult:
+    """
+    equity:    DataFrame (dates x tickers) of strategy equity, starting at 1.0
+    positions: DataFrame (dates x tickers) of the position held after each close
+    metrics:   DataFrame (one row per ticker) of performance statistics
+    """
+    equity: pd.DataFrame
+    positions: pd.DataFrame
+    metrics: pd.DataFrame
+
+
+def load_close_matrix(ticker_symbols, period="10y", cache=None, workers=16):
+    """
+    Loads daily closes for many tickers (cached, or bulk-downloaded) into one (dates x tickers)
+    DataFrame on the union of trading dates. Dates a ticker has no bar for (before its listing,
+    suspensions, exchange holidays that differ between tickers) stay NaN; run_backtest computes
+    each ticker's signals on its own bars only.
+    """
+    cache = cache or HistoryCache(DEFAULT_CACHE_DIR)
+    histories = load_histories(ticker_symbols, period=period, threads=workers, cache=cache)
+    if not histories.tickers:
+        return pd.DataFrame()
+    return histories.to_frame()
+
+
+def _forward_fill(matrix):
+    """
+    Column-wise forward fill of NaNs without a Python loop.
+    """
+    rows = np.arange(matrix.shape[0])[:, None]
+    last_valid = np.where(np.isnan(matrix), 0, rows)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    return matrix[last_valid, np.arange(matrix.shape[1])]
+
+
+def signals_on_own_bars(close_values, short_window, long_window):
+    """
+    Recommendation codes for a (dates x tickers) close matrix with NaN gaps. Each ticker's closes are
+    moved to the bottom of its column, in order, so the SMA windows span its own bars only and no
+    synthetic flat bars are averaged in; the codes are then put back on the original dates.
+    Dates without a bar get HOLD (valid), so the position held before them carries over.
+    """
+    gaps = np.isnan(close_values)
+    order = np.argsort(~gaps, axis=0, kind='stable')  # Gap rows first, then the bars in date order
+    columns = np.arange(close_values.shape[1])
+    compact_codes, compact_valid = signal_code_matrix(close_values[order, columns], short_window, long_window)
+    codes = np.empty_like(compact_codes)
+    valid = np.empty_like(compact_valid)
+    codes[order, columns] = compact_codes
+    valid[order, columns] = compact_valid
+    codes[gaps] = HOLD
+    valid[gaps] = True
+    return codes, valid
+
+
+def positions_from_codes(codes, valid, allow_short=False):
+    """
+    Converts recommendation codes into held positions: BUY -> long (1), SELL -> flat (0) or
+    short (-1), HOLD -> unchanged. Bars without enough history are flat.
+    """
+    sell_position = -1.0 if allow_short else 0.0
+    target = np.where(codes > 0, 1.0, np.where(codes < 0, sell_position, np.nan))
+    target[~valid] = 0.0
+    return np.nan_to_num(_forward_fill(target), nan=0.0)
+
+
+def _trade_hit_rate(held, strategy_log_returns):
+    """
+    Per-ticker (trades, hit rate): a trade is a run of the same non-zero held position, and
+    a hit is a trade whose cumulative return is positive.
+    """
+    n_rows, n_cols = held.shape
+    previous = np.vstack([np.zeros((1, n_cols)), held[:-1]])
+    entries = (held != 0) & (held != previous)
+    trade_ids = np.cumsum(entries, axis=0) * (held != 0)
+    trades = trade_ids.max(axis=0) if n_rows else np.zeros(n_cols, dtype=np.int64)
+
+    slots = int(trades.max()) + 1 if n_cols else 1
+    flat_ids = (trade_ids + np.arange(n_cols) * slots).ravel()
+    per_trade = np.bincount(flat_ids, weights=strategy_log_returns.ravel(), minlength=n_cols * slots)
+    per_trade = per_trade.reshape(n_cols, slots)[:, 1:]  # Slot 0 collects bars without a position
+    exists = np.arange(1, slots)[None, :] <= trades[:, None]
+    wins = ((per_trade > 0) & exists).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        hit_rate = np.where(trades > 0, wins / trades, np.nan)
+    return trades, hit_rate
+
+
+def run_backtest(close, short_window=20, long_window=50, allow_short=False, cost_bps=DEFAULT_COST_BPS):
+    """
+    Backtests the recommendation rules on a (dates x tickers) close DataFrame.
+    A signal at a close is acted on at that close, so it earns the next bar's return.
+    NaN closes mark dates a ticker did not trade: its signals skip them and its position is held
+    across them, earning the move from the last close before the gap to the first one after it.
+    """
+    if short_window >= long_window:
+        raise ValueError("The short window must be shorter than the long window.")
+    close_values = close.to_numpy(dtype=np.float64)
+    codes, valid = signals_on_own_bars(close_values, short_window, long_window)
+    positions = positions_from_codes(codes, valid, allow_short=allow_short)
+
+    # Returns are taken between a ticker's own closes, so a gap defers the move to the next bar
+    last_close = _forward_fill(close_values)
+    returns = np.zeros_like(close_values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns[1:] = last_close[1:] / last_close[:-1] - 1.0
+    returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+    held = np.zeros_like(positions)
+    held[1:] = positions[:-1]  # Position carried into each bar
+    changes = np.abs(np.diff(positions, axis=0, prepend=0.0))
+    strategy_returns = held * returns - changes * (cost_bps / 10000.0)
+    equity = np.cumprod(1.0 + strategy_returns, axis=0)
+
+    peak = np.maximum.accumulate(equity, axis=0)
+    max_drawdown = (equity / peak - 1.0).min(axis=0)
+
+    active_days = (~np.isnan(close_values)).sum(axis=0)
+    years = np.maximum(active_days, 1) / TRADING_DAYS_PER_YEAR
+    final_equity = equity[-1] if len(equity) else np.ones(close_values.shape[1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cagr = np.where(final_equity > 0, final_equity ** (1.0 / years) - 1.0, -1.0)
+        first_close = close_values[np.argmax(~np.isnan(close_values), axis=0), np.arange(close_values.shape[1])]
+        buy_and_hold = close.ffill().to_numpy(dtype=np.float64)[-1] / first_close - 1.0
+
+    log_returns = np.log1p(np.maximum(strategy_returns, -0.999999))
+    trades, hit_rate = _trade_hit_rate(held, log_returns)
+
+    metrics = pd.DataFrame({
+        'Total Return': final_equity - 1.0,
+        'CAGR': cagr,
+        'Max Drawdown': max_drawdown,
+        'Hit Rate': hit_rate,
+        'Trades': trades,
+        'Turnover (per year)': changes.sum(axis=0) / years,
+        'Exposure': (held != 0).sum(axis=0) / np.maximum(active_days, 1),
+        'Buy & Hold Return': buy_and_hold,
+    }, index=close.columns)
+    metrics.index.name = 'Ticker'
+
+    return BacktestResult(
+        equity=pd.DataFrame(equity, index=close.index, columns=close.columns),
+        positions=pd.DataFrame(positions, index=close.index, columns=close.columns),
+        metrics=metrics,
+    )
+
+
+# --- Parameter Sweeps ---
+
+_sweep_close = None  # Close matrix shared with each worker process once, not per task
+
+
+def _init_sweep_worker(close):
+    global _sweep_close
+    _sweep_close = close
+
+
+def _sweep_one(args):
+    short_window, long_window, allow_short, cost_bps = args
+    metrics = run_backtest(_sweep_close, short_window, long_window, allow_short, cost_bps).metrics
+    metrics.insert(0, 'Long Window', long_window)
+    metrics.insert(0, 'Short Window', short_window)
+    return metrics
+
+
+def sweep(close, window_pairs, workers=None, allow_short=False, cost_bps=DEFAULT_COST_BPS):
+    """
+    Backtests every (short, long) window pair (pairs with short >= long are skipped) across a
+    process pool. Returns (per-ticker metrics for every pair, summary with the median per pair).
+    """
+    jobs = [(s, l, allow_short, cost_bps) for s, l in window_pairs if s < l]
+    if not jobs:
+        raise ValueError("No valid (short, long) window pairs to test.")
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) == 1:
+        _init_sweep_worker(close)
+        frames = [_sweep_one(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_init_sweep_worker,
+                                 initargs=(close,)) as pool:
+            frames = list(pool.map(_sweep_one, jobs))
+
+    detail = pd.concat(frames).reset_index()
+    summary = detail.groupby(['Short Window', 'Long Window']).median(numeric_only=True)
+    summary = summary.sort_values('CAGR', ascending=False).reset_index()
+    return detail, summary
+
+
+def _parse_windows(text):
+    return [int(part) for part in text.split(',') if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the SMA crossover recommendation rules.")
+    parser.add_argument('universe', help="Text file with one ticker per line, or a CSV with a Symbol/Ticker column")
+    parser.add_argument('--period', default="10y", help="History period to test (default: 10y)")
+    parser.add_argument('--short', default="20", help="Comma-separated short SMA windows (default: 20)")
+    parser.add_argument('--long', default="50", help="Comma-separated long SMA windows (default: 50)")
+    parser.add_argument('--allow-short', action='store_true', help="Go short on SELL instead of moving to cash")
+    parser.add_argument('--cost-bps', type=float, default=DEFAULT_COST_BPS, help="Cost per unit of position change, in basis points")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes for sweeps (default: all cores)")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="History cache directory")
+    parser.add_argument('-o', '--output', default='backtest_results.csv', help="Per-ticker metrics CSV")
+    parser.add_argument('--equity-out', help="Also write equity curves (single window pair only)")
+    args = parser.parse_args(argv)
+
+    ticker_symbols = read_universe(args.universe)
+    start = time.perf_counter()
+    close = load_close_matrix(ticker_symbols, period=args.period, cache=HistoryCache(args.cache_dir))
+    if close.empty:
+        print("No price history could be loaded for the universe.", file=sys.stderr)
+        return 1
+    print(f"Loaded {close.shape[1]} tickers x {close.shape[0]} days in {time.perf_counter() - start:.1f}s.",
+          file=sys.stderr)
+
+    pairs = list(itertools.product(_parse_windows(args.short), _parse_windows(args.long)))
+    start = time.perf_counter()
+    if len(pairs) == 1:
+        result = run_backtest(close, pairs[0][0], pairs[0][1], args.allow_short, args.cost_bps)
+        result.metrics.to_csv(args.output, float_format='%.6f')
+        if args.equity_out:
+            result.equity.to_csv(args.equity_out, float_format='%.6f')
+        print(result.metrics.median(numeric_only=True).to_string())
+    else:
+        detail, summary = sweep(close, pairs, workers=args.workers, allow_short=args.allow_short,
+                                cost_bps=args.cost_bps)
+        detail.to_csv(args.output, index=False, float_format='%.6f')
+        print(summary.to_string(index=False))
+    print(f"Backtest finished in {time.perf_counter() - start:.1f}s; results written to '{args.output}'.",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
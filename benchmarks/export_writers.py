@@ -0,0 +1,100 @@
+"""
+Benchmark: writing a large export (default 1M cells) with each writer.
+
+Rows of a synthetic tickers x periods x metrics export are produced batch by batch.
+The "pandas" cases collect them into one DataFrame first and call to_excel (openpyxl),
+to_csv or to_parquet, which is what the exports used to do. The "streaming" cases hand each
+batch to the exporters module as it is produced. Every case runs in a fresh process, so
+peak memory (growth of the max resident set size while writing) is measured separately.
+
+Usage:
+    python benchmarks/export_writers.py --cells 1000000
+    python benchmarks/export_writers.py --cells 200000 --skip-openpyxl
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exporters import open_export  # noqa: E402
+
+METRICS = 18  # Float columns per row, plus Ticker and Period: 20 cells per row
+BATCH_ROWS = 5000
+
+
+def columns():
+    return ['Ticker', 'Period'] + [f"Metric {i + 1}" for i in range(METRICS)]
+
+
+def row_batches(n_rows, seed=0):
+    """
+    Yields lists of rows (ticker, period label, METRICS floats with some gaps) in batches.
+    """
+    rng = np.random.default_rng(seed)
+    periods = [f"{year}-Q{quarter}" for year in range(2000, 2025) for quarter in range(1, 5)]
+    for start in range(0, n_rows, BATCH_ROWS):
+        count = min(BATCH_ROWS, n_rows - start)
+        values = rng.uniform(1e6, 1e10, (count, METRICS))
+        values[rng.random((count, METRICS)) < 0.05] = np.nan
+        yield [[f"T{(start + i) // len(periods):05d}", periods[(start + i) % len(periods)], *row]
+               for i, row in enumerate(values.tolist())]
+
+
+def _max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kilobytes on Linux
+
+
+def run_case(case, n_rows, path):
+    """Runs one case and returns (seconds, peak memory growth in MB, file size in MB)."""
+    kind, format = case.split('-')
+    before = _max_rss_mb()
+    start = time.perf_counter()
+    if kind == 'pandas':
+        df = pd.DataFrame([row for batch in row_batches(n_rows) for row in batch], columns=columns())
+        if format == 'xlsx':
+            df.to_excel(path, index=False, engine='openpyxl')
+        elif format == 'csv':
+            df.to_csv(path, index=False)
+        else:
+            df.to_parquet(path, index=False)
+    else:
+        with open_export(path, format, batch_rows=BATCH_ROWS) as export:
+            table = export.add_table('Export', columns())
+            for batch in row_batches(n_rows):
+                table.write_rows(batch)
+    seconds = time.perf_counter() - start
+    return seconds, _max_rss_mb() - before, os.path.getsize(path) / 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the export writers on a large table.")
+    parser.add_argument('--cells', type=int, default=1000000, help="Cells to export (default: 1,000,000)")
+    parser.add_argument('--skip-openpyxl', action='store_true', help="Skip the (slowest) pandas/openpyxl case")
+    args = parser.parse_args(argv)
+
+    n_rows = max(1, args.cells // len(columns()))
+    cases = ['pandas-xlsx', 'streaming-xlsx', 'pandas-csv', 'streaming-csv', 'pandas-parquet', 'streaming-parquet']
+    if args.skip_openpyxl:
+        cases.remove('pandas-xlsx')
+
+    print(f"{n_rows * len(columns()):,} cells ({n_rows:,} rows x {len(columns())} columns)")
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as output_dir:
+        for case in cases:
+            path = os.path.join(output_dir, f"{case}.{case.split('-')[1]}")
+            with context.Pool(1) as pool:
+                seconds, memory_mb, size_mb = pool.apply(run_case, (case, n_rows, path))
+            print(f"  {case:<18} {seconds:7.2f} s   peak memory +{memory_mb:7.1f} MB   file {size_mb:6.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Benchmark: per-report rendering cost with and without the shared ReportLab template.
+
+Renders the same report (text + PDF) for synthetic tickers through `generate_stock_report`,
+with every dataset pre-seeded so no network calls are made. "cold" clears the template
+cache before each report, which is what every report used to pay (stylesheet, table style
+and disclaimer markup rebuilt from scratch); "warm" reuses the process-wide template.
+
+Usage:
+    python benchmarks/report_rendering.py --reports 50
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_images import ChartCache  # noqa: E402
+from report_templates import get_report_template  # noqa: E402
+import stock_analyser_with_ai as analyser  # noqa: E402
+
+
+def make_snapshot(ticker, seed):
+    """
+    A TickerSnapshot with synthetic profile, history and financials already loaded.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end="2024-06-28", periods=252, name='Date')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, len(dates))))
+    history = pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99,
+                            'Close': close, 'Volume': rng.integers(1e6, 5e6, len(dates))}, index=dates)
+    years = pd.to_datetime(['2020-12-31', '2021-12-31', '2022-12-31', '2023-12-31'])
+    financials = pd.DataFrame([rng.uniform(1e9, 5e9, len(years))], index=['Total Revenue'], columns=years)
+    profile = {'name': f"{ticker} Corp", 'exchange': 'NASDAQ', 'finnhubIndustry': 'Technology',
+               'country': 'US', 'ipo': '1999-01-01', 'marketCapitalization': 12345.6,
+               'shareOutstanding': 789.0, 'weburl': f"https://{ticker.lower()}.example.com"}
+
+    snapshot = analyser.TickerSnapshot(ticker)
+    snapshot.seed(profile=profile, history=history, financials=financials,
+                  realtime_price=float(close[-1]), current_price=float(close[-1]))
+    return snapshot
+
+
+def time_reports(snapshots, output_dir, cold):
+    timings = []
+    for snapshot in snapshots:
+        if cold:
+            get_report_template.cache_clear()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyser.generate_stock_report(snapshot.ticker_symbol, snapshot, output_dir=output_dir,
+                                           show_analysis=False)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark per-report rendering cost.")
+    parser.add_argument('--reports', type=int, default=50, help="Reports rendered per mode (default: 50)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        # Charts are rendered once into a throwaway cache and then reused, as on a re-run
+        analyser.chart_cache = ChartCache(os.path.join(output_dir, 'charts'))
+        # One throwaway report so imports, font loading and first-use caches are not measured
+        time_reports([make_snapshot('WARMUP', 0)], output_dir, cold=False)
+
+        # Modes are interleaved report by report so machine noise affects both equally
+        results = {'cold (template rebuilt per report)': [], 'warm (shared template)': []}
+        for i in range(args.reports):
+            time_reports([make_snapshot(f"T{i:04d}", i)], output_dir, cold=False)  # Renders the cached chart
+            for mode, cold in zip(results, (True, False)):
+                snapshot = make_snapshot(f"T{i:04d}", i)
+                results[mode].extend(time_reports([snapshot], output_dir, cold))
+
+        start = time.perf_counter()
+        for _ in range(args.reports):
+            get_report_template.cache_clear()
+            get_report_template().disclaimer()
+        template_cost = (time.perf_counter() - start) / args.reports
+
+    print(f"{args.reports} reports per mode")
+    for mode, timings in results.items():
+        print(f"  {mode:<36} median {statistics.median(timings) * 1000:7.2f} ms   "
+              f"mean {statistics.mean(timings) * 1000:7.2f} ms")
+    cold, warm = (statistics.median(t) for t in results.values())
+    print(f"  template + disclaimer construction alone: {template_cost * 1000:.2f} ms per report")
+    print(f"  saved per report: {(cold - warm) * 1000:.2f} ms ({(cold - warm) / cold:.1%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
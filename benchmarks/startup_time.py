@@ -0,0 +1,82 @@
+"""
+Benchmark: cold-start import time of the analyser, with a regression check.
+
+Each run imports the module in a fresh `python -X importtime` process and reads the cumulative
+import time from its report. pandas (and numpy) are needed by every data feature and are
+imported up front, so the check compares against a plain `import pandas` measured the same way:
+the run fails if the module costs more than --max-overhead-ms on top of pandas, or if it loads
+any of the modules that should only be imported on first use (yfinance, requests, Plotly,
+ReportLab, matplotlib). Exits with 1 when a check fails, so it can run in CI.
+
+Usage:
+    python benchmarks/startup_time.py
+    python benchmarks/startup_time.py --runs 10 --max-overhead-ms 150 --module screener
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFERRED_MODULES = ('yfinance', 'requests', 'plotly', 'reportlab', 'matplotlib')
+DEFAULT_MAX_OVERHEAD_MS = 150  # Import time allowed on top of pandas (measured: under 50 ms)
+
+
+def import_times(module):
+    """
+    Imports `module` in a fresh interpreter. Returns ({imported module: cumulative ms}, total ms).
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], cwd=REPO_DIR,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative) / 1000
+    return times, times[module]
+
+
+def measure(module, runs):
+    """Median total import time of `module` (ms) and the import report of the median run."""
+    import_times(module) # Warm-up: writes the .pyc files and fills the OS file cache
+    samples = sorted((import_times(module) for _ in range(runs)), key=lambda sample: sample[1])
+    times, _ = samples[len(samples) // 2]
+    return statistics.median(total for _, total in samples), times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure and check the cold-start import time.")
+    parser.add_argument('--module', default='stock_analyser_with_ai', help="Module to import (default: the analyser)")
+    parser.add_argument('--runs', type=int, default=7, help="Fresh interpreters per measurement (default: 7)")
+    parser.add_argument('--max-overhead-ms', type=float, default=DEFAULT_MAX_OVERHEAD_MS,
+                        help="Fail if the import takes longer than pandas by more than this")
+    parser.add_argument('--top', type=int, default=10, help="Slowest packages to list")
+    args = parser.parse_args(argv)
+
+    baseline, _ = measure('pandas', args.runs)
+    total, times = measure(args.module, args.runs)
+    overhead = total - baseline
+    print(f"import pandas: {baseline:.1f} ms (median of {args.runs} runs)")
+    print(f"import {args.module}: {total:.1f} ms, {overhead:+.1f} ms over pandas (limit {args.max_overhead_ms:g} ms)")
+
+    top_level = sorted(((ms, name) for name, ms in times.items() if '.' not in name and name != args.module),
+                       reverse=True)
+    print("Slowest packages:")
+    for ms, name in top_level[:args.top]:
+        print(f"  {name:<24} {ms:8.1f} ms")
+
+    failures = []
+    loaded = sorted(name for name in times if name in DEFERRED_MODULES)
+    if loaded:
+        failures.append(f"imported at startup, should be imported on first use: {', '.join(loaded)}")
+    if overhead > args.max_overhead_ms:
+        failures.append(f"{overhead:.1f} ms over pandas exceeds the {args.max_overhead_ms:g} ms limit")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Bulk multi-ticker history loading with yf.download.
+
+One yf.download call fetches a whole chunk of symbols (yfinance threads the per-symbol
+requests internally) instead of one Ticker.history() round trip per symbol. The result is
+one compact (dates x tickers) matrix with a ticker index and a record of which symbols
+failed. Daily bars go through the history cache: tickers with fresh cached history are not
+downloaded again, and downloaded ones are stored for later per-ticker use.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from price_store import PriceStore, DEFAULT_COLUMNS, DEFAULT_DTYPE
+
+# --- Configuration ---
+DEFAULT_CHUNK_SIZE = 100  # Symbols per yf.download call
+DEFAULT_THREADS = 8  # yfinance download threads per call
+
+
+@dataclass
+class HistoryMatrix:
+    """
+    dates:        DatetimeIndex of the rows (union of every ticker's bars, tz-naive)
+    tickers:      column order of `values` (tickers with data only)
+    values:       ndarray (dates x tickers) of the requested field, NaN where a ticker has no bar
+    failed:       {ticker: reason} for symbols that returned no data
+    downloads:    number of yf.download calls made
+    ticker_index: {ticker: column}
+    """
+    dates: pd.DatetimeIndex
+    tickers: list
+    values: np.ndarray
+    failed: dict = field(default_factory=dict)
+    downloads: int = 0
+    ticker_index: dict = field(init=False)
+
+    def __post_init__(self):
+        self.ticker_index = {ticker: column for column, ticker in enumerate(self.tickers)}
+
+    def column(self, ticker_symbol):
+        """One ticker's values as a Series without the dates it has no bar for."""
+        series = pd.Series(self.values[:, self.ticker_index[ticker_symbol]], index=self.dates, name=ticker_symbol)
+        return series.dropna()
+
+    def to_frame(self):
+        """The matrix as a (dates x tickers) DataFrame (a view of `values` where pandas allows)."""
+        return pd.DataFrame(self.values, index=self.dates, columns=pd.Index(self.tickers, name='Ticker'), copy=False)
+
+
+def _ticker_frame(data, ticker_symbol):
+    """
+    Extracts one ticker's bars from a yf.download(group_by='ticker') result.
+    """
+    if isinstance(data.columns, pd.MultiIndex):
+        if ticker_symbol not in data.columns.get_level_values(0):
+            return None
+        df = data[ticker_symbol]
+    else:
+        df = data # Flat columns: older yfinance with a single ticker
+    if 'Close' not in df.columns:
+        return None
+    df = df[df['Close'].notna()]
+    if df.empty:
+        return None
+    df = df.copy()
+    df.index.name = 'Date'
+    return df
+
+
+def download_history_frames(ticker_symbols, period="1y", interval="1d", chunk_size=DEFAULT_CHUNK_SIZE,
+                            threads=DEFAULT_THREADS, progress=None):
+    """
+    Downloads full OHLCV history for many tickers with one yf.download call per chunk.
+    Returns ({ticker: DataFrame}, {ticker: reason} for failures, number of download calls).
+    Chunks run one after another: yfinance collects each call's results in shared module state.
+    """
+    import yfinance as yf # Imported on the first download only: cached histories never load it
+    try:
+        from yfinance import shared as yf_shared # Per-symbol error messages of the last download
+    except ImportError:
+        yf_shared = None
+    frames = {}
+    failed = {}
+    downloads = 0
+    for start in range(0, len(ticker_symbols), chunk_size):
+        chunk = ticker_symbols[start:start + chunk_size]
+        try:
+            downloads += 1
+            data = yf.download(chunk, period=period, interval=interval, group_by='ticker', auto_adjust=True,
+                               actions=True, threads=threads, progress=False)
+            errors = dict(getattr(yf_shared, '_ERRORS', None) or {})
+        except Exception as e:
+            failed.update({ticker: str(e) for ticker in chunk})
+            continue
+        for ticker in chunk:
+            df = _ticker_frame(data, ticker) if data is not None and not data.empty else None
+            if df is None:
+                failed[ticker] = errors.get(ticker) or "no data"
+            else:
+                frames[ticker] = df
+        if progress is not None:
+            progress(min(start + chunk_size, len(ticker_symbols)), len(ticker_symbols))
+    return frames, failed, downloads
+
+
+def iter_history_frames(ticker_symbols, period="1y", interval="1d", chunk_size=DEFAULT_CHUNK_SIZE,
+                        threads=DEFAULT_THREADS, cache=None, progress=None, failed=None, stats=None):
+    """
+    Yields (ticker, DataFrame) pairs: first every ticker with fresh daily history in `cache`, then
+    the rest as each bulk download chunk arrives (and is saved to the cache). Only one chunk of
+    frames is alive at a time. Failures go into the `failed` dict and the number of download calls
+    into stats['downloads'] when those are given.
+    """
+    failed = {} if failed is None else failed
+    ticker_symbols = list(dict.fromkeys(t.strip().upper() for t in ticker_symbols if t.strip()))
+    use_cache = cache is not None and interval == '1d'
+    missing = []
+    for ticker in ticker_symbols:
+        df = cache.peek(ticker, period) if use_cache else None
+        if df is None:
+            missing.append(ticker)
+        else:
+            yield ticker, df
+
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        frames, chunk_failed, downloads = download_history_frames(chunk, period, interval, chunk_size, threads)
+        failed.update(chunk_failed)
+        if stats is not None:
+            stats['downloads'] = stats.get('downloads', 0) + downloads
+        for ticker, df in frames.items():
+            if use_cache:
+                try:
+                    cache.put(ticker, df, period)
+                except Exception as e:
+                    # print(f"Error caching history for {ticker}: {e}")
+                    pass
+            yield ticker, df
+        if progress is not None:
+            progress(min(start + chunk_size, len(missing)), len(missing))
+
+
+def load_history_frames(ticker_symbols, period="1y", interval="1d", chunk_size=DEFAULT_CHUNK_SIZE,
+                        threads=DEFAULT_THREADS, cache=None, progress=None):
+    """
+    Like `download_history_frames`, but daily history is served from (and saved to) `cache`
+    when one is given, so only tickers without fresh cached bars are downloaded.
+    Returns ({ticker: DataFrame} in input order, {ticker: reason}, number of download calls).
+    """
+    failed, stats = {}, {}
+    frames = dict(iter_history_frames(ticker_symbols, period, interval, chunk_size, threads, cache, progress,
+                                      failed, stats))
+    ordered = {}
+    for ticker in dict.fromkeys(t.strip().upper() for t in ticker_symbols if t.strip()):
+        if ticker in frames:
+            ordered[ticker] = frames[ticker]
+    return ordered, failed, stats.get('downloads', 0)
+
+
+def load_price_store(ticker_symbols, period="1y", columns=DEFAULT_COLUMNS, dtype=DEFAULT_DTYPE,
+                     chunk_size=DEFAULT_CHUNK_SIZE, threads=DEFAULT_THREADS, cache=None, progress=None):
+    """
+    Loads daily history for many tickers straight into a compact PriceStore (only `columns`,
+    as `dtype`), converting each downloaded chunk as it arrives. Returns (store, {ticker: reason}).
+    """
+    failed = {}
+    frames = iter_history_frames(ticker_symbols, period, '1d', chunk_size, threads, cache, progress, failed)
+    return PriceStore.from_frames(frames, columns=columns, dtype=dtype), failed
+
+
+def _naive_index(index):
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_convert('UTC').tz_localize(None) # Intraday bars from different exchanges
+    return index.values.astype('datetime64[ns]')
+
+
+def frames_to_matrix(frames, column='Close', dtype=np.float64):
+    """
+    Places every frame's `column` into one (dates x tickers) array on the union of their dates.
+    Returns (DatetimeIndex, tickers, values).
+    """
+    tickers = list(frames)
+    if not tickers:
+        return pd.DatetimeIndex([], name='Date'), tickers, np.empty((0, 0), dtype=dtype)
+    row_dates = [_naive_index(frames[ticker].index) for ticker in tickers]
+    dates = np.unique(np.concatenate(row_dates))
+    values = np.full((len(dates), len(tickers)), np.nan, dtype=dtype)
+    for col, (ticker, ticker_dates) in enumerate(zip(tickers, row_dates)):
+        values[np.searchsorted(dates, ticker_dates), col] = frames[ticker][column].to_numpy(dtype=dtype)
+    return pd.DatetimeIndex(dates, name='Date'), tickers, values
+
+
+def load_histories(ticker_symbols, period="1y", interval="1d", column='Close', chunk_size=DEFAULT_CHUNK_SIZE,
+                   threads=DEFAULT_THREADS, dtype=np.float64, cache=None, progress=None):
+    """
+    Loads `column` (default: adjusted close) for many tickers as one HistoryMatrix.
+    Use dtype=np.float32 to halve the memory of very large universes.
+    """
+    frames, failed, downloads = load_history_frames(ticker_symbols, period, interval, chunk_size, threads,
+                                                    cache, progress)
+    dates, tickers, values = frames_to_matrix(frames, column, dtype)
+    return HistoryMatrix(dates, tickers, values, failed, downloads)
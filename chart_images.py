@@ -0,0 +1,130 @@
+"""
+Static price chart images for the PDF reports.
+
+Charts are drawn in-process with matplotlib's Agg renderer (no browser or Kaleido
+subprocess to start) and cached on disk under a hash of the ticker, the date range and
+the plotted values, so re-running a report on unchanged data reuses the existing PNG.
+"""
+import collections
+import glob
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+# --- Configuration ---
+DEFAULT_CHART_DIR = os.path.join(os.path.expanduser("~"), ".stock_analyser", "charts")
+CHART_VERSION = 1  # Bump when the chart layout changes so cached images are re-rendered
+CHART_SIZE_INCHES = (7.0, 3.5)
+CHART_DPI = 150
+CHART_KEY_LENGTH = 20
+CHART_COLUMNS = (  # (column, label, color, line width, line style), as in the interactive chart
+    ('Close', 'Close Price', 'blue', 1.5, '-'),
+    ('SMA_20', '20-Day SMA', 'orange', 1.0, ':'),
+    ('SMA_50', '50-Day SMA', 'red', 1.0, '--'),
+)
+
+
+def chart_key(ticker_symbol, df):
+    """
+    Hash of everything that affects the image: ticker, layout version, size and the plotted data.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{ticker_symbol}|{CHART_VERSION}|{CHART_SIZE_INCHES}|{CHART_DPI}".encode())
+    digest.update(df.index.to_numpy(dtype='datetime64[ns]').view(np.int64).tobytes())
+    for column, *_ in CHART_COLUMNS:
+        if column in df.columns:
+            digest.update(column.encode())
+            digest.update(df[column].to_numpy(dtype=np.float64).tobytes())
+    return digest.hexdigest()[:CHART_KEY_LENGTH]
+
+
+def render_price_chart(ticker_symbol, df, path):
+    """
+    Draws the close price and SMAs of `df` to a PNG at `path`. Requires matplotlib.
+    """
+    # Imported here so the analyser starts without matplotlib; the object API avoids pyplot's global state
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=CHART_SIZE_INCHES, dpi=CHART_DPI)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    for column, label, color, width, style in CHART_COLUMNS:
+        if column in df.columns:
+            ax.plot(df.index, df[column].to_numpy(dtype=np.float64), label=label, color=color,
+                    linewidth=width, linestyle=style)
+    start, end = df.index[0], df.index[-1]
+    ax.set_title(f"{ticker_symbol} Close Price with Moving Averages "
+                 f"({start:%Y-%m-%d} to {end:%Y-%m-%d})", fontsize=10)
+    ax.set_xlabel('Date', fontsize=8)
+    ax.set_ylabel('Price (USD)', fontsize=8)
+    ax.tick_params(labelsize=7)
+    ax.grid(True, color='#e5e5e5', linewidth=0.6)
+    ax.legend(fontsize=7, loc='best', framealpha=0.85)
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    fig.canvas.draw()
+    # Saved without an alpha channel: ReportLab would otherwise embed a second (mask) image per chart
+    from PIL import Image
+    rgba = np.asarray(fig.canvas.buffer_rgba())
+    Image.fromarray(rgba[..., :3]).save(path, format='PNG', dpi=(CHART_DPI, CHART_DPI))
+
+
+class ChartCache:
+    """
+    On-disk cache of rendered chart PNGs, keyed by `chart_key`. Only the latest image is kept
+    per ticker, so the cache does not grow as new bars arrive.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CHART_DIR):
+        self.cache_dir = cache_dir
+        self._locks = collections.defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+        self.renders = 0
+        self.hits = 0
+
+    def _path(self, ticker_symbol, key):
+        safe_ticker = "".join(c if c.isalnum() or c in '.-_' else '_' for c in ticker_symbol)
+        return os.path.join(self.cache_dir, f"{safe_ticker}_{key}.png")
+
+    def get_price_chart(self, ticker_symbol, df):
+        """
+        Returns the path of a PNG chart for `df` (with Close and SMA columns), rendering it only
+        if the data changed. Returns None if the chart cannot be drawn (no data, no matplotlib).
+        """
+        if df is None or df.empty:
+            return None
+        key = chart_key(ticker_symbol, df)
+        path = self._path(ticker_symbol, key)
+        with self._locks_guard:
+            lock = self._locks[path]
+        with lock:
+            if os.path.exists(path):
+                self.hits += 1
+                return path
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                try:
+                    render_price_chart(ticker_symbol, df, temp_path)
+                    os.replace(temp_path, path)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+            except Exception as e:
+                # print(f"Error rendering chart for {ticker_symbol}: {e}")
+                return None
+            self.renders += 1
+            self._remove_older(ticker_symbol, path)
+            return path
+
+    def _remove_older(self, ticker_symbol, keep_path):
+        pattern = os.path.basename(self._path(ticker_symbol, '?' * CHART_KEY_LENGTH))
+        for old_path in glob.glob(os.path.join(glob.escape(self.cache_dir), pattern)):
+            if old_path != keep_path and not old_path.endswith('.tmp'):
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass # Another process may have removed it already
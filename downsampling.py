@@ -0,0 +1,119 @@
+"""
+Point-budget downsampling for long price series before they are sent to a chart.
+
+Two shape-preserving methods are provided:
+- 'lttb'   Largest-Triangle-Three-Buckets: keeps the points that define the visual shape
+           of the line (peaks, troughs, turns) with a fixed number of points.
+- 'minmax' keeps the first, last, lowest and highest point of every bucket, so no extreme
+           is ever dropped; best when each bucket is about one pixel wide.
+
+Selected points are original samples (never averages), so hover values are real prices.
+"""
+import numpy as np
+
+# --- Configuration ---
+DEFAULT_MAX_POINTS = 2000
+METHODS = ('lttb', 'minmax')
+
+
+def lttb_indices(y, n_out, x=None):
+    """
+    Indices of the `n_out` points chosen by Largest-Triangle-Three-Buckets (always includes the
+    first and last point). `x` defaults to evenly spaced positions; pass timestamps for irregular
+    spacing. `y` must not contain NaN.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # n_out - 2 buckets over the interior points; each bucket has at least one point since n_out < n
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts = edges[:-1]
+    counts = np.diff(edges)
+    bucket_x = np.add.reduceat(x[1:n - 1], starts - 1) / counts
+    bucket_y = np.add.reduceat(y[1:n - 1], starts - 1) / counts
+    # The point each bucket is compared against is the mean of the next bucket (the last point for the final one)
+    next_x = np.append(bucket_x[1:], x[-1])
+    next_y = np.append(bucket_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Twice the triangle area between the last selected point, each candidate and the next bucket's mean
+        area = np.abs((x[a] - next_x[i]) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y[i] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, n_buckets):
+    """
+    Indices of the first and last point plus the minimum and maximum of each of `n_buckets`
+    equal-width buckets (at most 2 * n_buckets + 2 points), in order. NaNs are ignored.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_buckets < 1 or 2 * n_buckets + 2 >= n:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    n_buckets = -(-n // size)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(n_buckets, size)
+    missing = np.isnan(blocks)
+    offsets = np.arange(n_buckets) * size
+    lows = offsets + np.where(missing, np.inf, blocks).argmin(axis=1)
+    highs = offsets + np.where(missing, -np.inf, blocks).argmax(axis=1)
+    selected = np.unique(np.concatenate(([0, n - 1], lows, highs)))
+    return selected[selected < n]
+
+
+def downsample_indices(y, max_points=DEFAULT_MAX_POINTS, method='lttb', x=None):
+    """
+    Indices (into `y`) of at most about `max_points` points that keep the shape of `y`.
+    NaN values are skipped. Returns every index when the series already fits the budget
+    or when max_points is None.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}'; expected one of {METHODS}.")
+    y = np.asarray(y, dtype=np.float64)
+    if max_points is None or len(y) <= max_points:
+        return np.arange(len(y))
+    valid = np.flatnonzero(~np.isnan(y))
+    if method == 'minmax':
+        chosen = minmax_indices(y[valid], max(1, (max_points - 2) // 2))
+    else:
+        chosen = lttb_indices(y[valid], max_points, None if x is None else np.asarray(x)[valid])
+    return valid[chosen]
+
+
+def _positions(index):
+    """Numeric x positions for an index: nanoseconds for datetimes, None (even spacing) otherwise."""
+    if hasattr(index, 'asi8'):
+        return index.asi8.astype(np.float64)
+    return None
+
+
+def downsample_frame(df, column='Close', max_points=DEFAULT_MAX_POINTS, method='lttb'):
+    """
+    Returns the rows of `df` selected by downsampling `column`, so every other column (e.g. SMAs)
+    is sampled at the same dates. The original frame is returned when it already fits.
+    """
+    if df is None or max_points is None or len(df) <= max_points:
+        return df
+    indices = downsample_indices(df[column].to_numpy(dtype=np.float64), max_points, method, _positions(df.index))
+    return df.iloc[indices]
+
+
+def downsample_series(series, max_points=DEFAULT_MAX_POINTS, method='lttb'):
+    """
+    Series counterpart of `downsample_frame`.
+    """
+    if series is None or max_points is None or len(series) <= max_points:
+        return series
+    indices = downsample_indices(series.to_numpy(dtype=np.float64), max_points, method, _positions(series.index))
+    return series.iloc[indices]
@@ -0,0 +1,342 @@
+"""
+Streaming table exports to Excel, CSV and Parquet for large outputs.
+
+Rows are written in batches as they are produced, so an export never has to exist as one
+big DataFrame in memory:
+- 'xlsx'    xlsxwriter in constant_memory mode: each row is flushed to disk once the next
+            one starts, so memory stays flat however many rows a sheet has.
+- 'csv'     the csv module.
+- 'parquet' pyarrow, one row group per batch.
+An Excel export keeps each table as a sheet of one workbook. CSV and Parquet have no sheets,
+so the first table is written to `path` and every further table to `<path stem>_<table><ext>`.
+Every file is written to a temp file next to it and only renamed into place once the export
+closes cleanly, so a failed export never leaves a truncated file behind.
+
+Usage:
+    with open_export("out.xlsx") as export:
+        table = export.add_table("Sales", ["Ticker", "2023", "2024"])
+        for row in rows:
+            table.write_row(row)
+"""
+import csv
+import datetime
+import math
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+FORMATS = {'.xlsx': 'xlsx', '.csv': 'csv', '.parquet': 'parquet'}
+DEFAULT_BATCH_ROWS = 5000  # Rows buffered per table before they are written out
+EXCEL_DATE_FORMAT = 'yyyy-mm-dd'
+EXCEL_MAX_ROWS = 1048576
+
+
+def export_format(path, format=None):
+    """
+    The export format for `path`: `format` if given, else from the file extension (CSV if unknown).
+    """
+    if format is not None:
+        if format not in FORMATS.values():
+            raise ValueError(f"Unknown export format '{format}'; expected one of {tuple(FORMATS.values())}.")
+        return format
+    return FORMATS.get(os.path.splitext(path)[1].lower(), 'csv')
+
+
+def excel_sheet_name(name):
+    """Excel sheet names are at most 31 characters and cannot contain []:*?/\\."""
+    return ''.join('_' if c in '[]:*?/\\' else c for c in str(name))[:31] or 'Sheet'
+
+
+def _cell(value):
+    """Plain Python value for one cell: None for missing values, no NumPy or pandas scalar types."""
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+
+class TableWriter:
+    """
+    One table (sheet or file) of an export. Rows are buffered and handed to the export in batches.
+    """
+
+    def __init__(self, export, name, columns, batch_rows):
+        self.export = export
+        self.name = name
+        self.columns = [str(column) for column in columns]
+        self.batch_rows = batch_rows
+        self.path = None # File the table is written to (set by the export)
+        self.rows_written = 0
+        self._buffer = []
+
+    def write_row(self, row):
+        self._buffer.append([_cell(value) for value in row])
+        if len(self._buffer) >= self.batch_rows:
+            self.flush()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+
+    def write_frame(self, df, index=False):
+        """Streams a DataFrame's rows (with its index as the first column if `index`) in batches."""
+        self.flush()
+        for start in range(0, len(df), self.batch_rows):
+            batch = df.iloc[start:start + self.batch_rows]
+            if index:
+                batch = batch.reset_index()
+            batch.columns = self.columns
+            self.export._write_frame(self, batch)
+            self.rows_written += len(batch)
+
+    def flush(self):
+        if self._buffer:
+            self.export._write_batch(self, self._buffer)
+            self.rows_written += len(self._buffer)
+            self._buffer = []
+
+
+class TableExport:
+    """
+    Base class of the format-specific exports: `add_table` starts a table, `close` finishes every one.
+    """
+
+    def __init__(self, path, batch_rows=DEFAULT_BATCH_ROWS):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.paths = [] # Files written, in order
+        self.tables = []
+        self._temp_paths = {} # Final path -> temp file it is written to until close
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _table_path(self, name):
+        if not self.paths:
+            return self.path
+        stem, ext = os.path.splitext(self.path)
+        safe_name = "".join(c if c.isalnum() or c in '.-_' else '_' for c in str(name))
+        return f"{stem}_{safe_name}{ext}"
+
+    def add_table(self, name, columns):
+        table = TableWriter(self, name, columns, self.batch_rows)
+        self._open_table(table)
+        self.tables.append(table)
+        return table
+
+    def _temp_path(self, path):
+        """The temp file `path` is written to; it replaces `path` when the export closes."""
+        if path not in self._temp_paths:
+            self._temp_paths[path] = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        return self._temp_paths[path]
+
+    def close(self):
+        try:
+            for table in self.tables:
+                table.flush()
+            self._closed = True
+            self._close()
+        except BaseException:
+            self.abort()
+            raise
+        for path, temp_path in self._temp_paths.items():
+            os.replace(temp_path, path)
+        self._temp_paths = {}
+
+    def abort(self):
+        """Closes the export without writing any file: the temp files are removed, `path` is untouched."""
+        try:
+            if not self._closed:
+                self._closed = True
+                self._close()
+        except Exception:
+            pass # The files are discarded anyway
+        finally:
+            for temp_path in self._temp_paths.values():
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            self._temp_paths = {}
+
+    def _open_table(self, table):
+        raise NotImplementedError
+
+    def _write_batch(self, table, rows):
+        raise NotImplementedError
+
+    def _write_frame(self, table, frame):
+        """Writes a DataFrame batch; formats with a faster columnar path override this."""
+        self._write_batch(table, [[_cell(value) for value in row] for row in frame.itertuples(index=False, name=None)])
+
+    def _close(self):
+        pass
+
+
+class ExcelExport(TableExport):
+    """
+    One workbook written with xlsxwriter in constant_memory mode; every table is a sheet.
+    """
+
+    def __init__(self, path, batch_rows=DEFAULT_BATCH_ROWS):
+        super().__init__(path, batch_rows)
+        import xlsxwriter # Imported here so CSV/Parquet exports work without it
+        # Cells are written as data: no formulas or hyperlinks from strings that happen to look like them
+        self._workbook = xlsxwriter.Workbook(self._temp_path(path), {'constant_memory': True, 'default_date_format': EXCEL_DATE_FORMAT,
+                                                    'strings_to_formulas': False, 'strings_to_urls': False})
+        self._header_format = self._workbook.add_format({'bold': True})
+        self._sheets = {}
+        self._next_row = {}
+        self.paths.append(path)
+
+    def _open_table(self, table):
+        name = excel_sheet_name(table.name)
+        taken = {sheet.name for sheet in self._sheets.values()}
+        suffix = 2
+        while name in taken:
+            name = excel_sheet_name(f"{table.name[:27]} ({suffix})")
+            suffix += 1
+        sheet = self._workbook.add_worksheet(name)
+        table.path = self.path
+        for column, header in enumerate(table.columns):
+            sheet.set_column(column, column, max(10, len(header) + 2))
+        sheet.write_row(0, 0, table.columns, self._header_format)
+        self._sheets[id(table)] = sheet
+        self._next_row[id(table)] = 1
+
+    def _write_batch(self, table, rows):
+        sheet = self._sheets[id(table)]
+        row_number = self._next_row[id(table)]
+        if row_number + len(rows) > EXCEL_MAX_ROWS:
+            raise ValueError(f"Table '{table.name}' does not fit in an Excel sheet ({EXCEL_MAX_ROWS} rows); "
+                             f"export it as CSV or Parquet instead.")
+        for row in rows:
+            sheet.write_row(row_number, 0, row)
+            row_number += 1
+        self._next_row[id(table)] = row_number
+
+    def _close(self):
+        self._workbook.close()
+
+
+class CsvExport(TableExport):
+    """
+    One CSV file per table. `float_format` (e.g. '%.4f') formats float cells.
+    """
+
+    def __init__(self, path, batch_rows=DEFAULT_BATCH_ROWS, float_format=None):
+        super().__init__(path, batch_rows)
+        self.float_format = float_format
+        self._files = {}
+
+    def _open_table(self, table):
+        table.path = self._table_path(table.name)
+        f = open(self._temp_path(table.path), 'w', newline='', encoding='utf-8')
+        writer = csv.writer(f, lineterminator='\n') # As pandas' to_csv
+        writer.writerow(table.columns)
+        self._files[id(table)] = (f, writer)
+        self.paths.append(table.path)
+
+    def _format(self, value):
+        if value is None:
+            return ''
+        if isinstance(value, float) and self.float_format:
+            return self.float_format % value
+        if isinstance(value, datetime.datetime) and value.time() == datetime.time(0):
+            return value.date().isoformat()
+        return value
+
+    def _write_batch(self, table, rows):
+        _, writer = self._files[id(table)]
+        writer.writerows([self._format(value) for value in row] for row in rows)
+
+    def _write_frame(self, table, frame):
+        f, _ = self._files[id(table)]
+        frame.to_csv(f, header=False, index=False, float_format=self.float_format, lineterminator='\n')
+
+    def _close(self):
+        for f, _ in self._files.values():
+            f.close()
+
+
+class ParquetExport(TableExport):
+    """
+    One Parquet file per table, one row group per batch. The column types are taken from the
+    first batch (columns that are empty there are stored as strings). Requires pyarrow.
+    """
+
+    def __init__(self, path, batch_rows=DEFAULT_BATCH_ROWS):
+        super().__init__(path, batch_rows)
+        import pyarrow # Imported here so Excel/CSV exports work without it
+        self._pa = pyarrow
+        self._writers = {}
+
+    def _open_table(self, table):
+        table.path = self._table_path(table.name)
+        self._writers[id(table)] = None # Opened with the first batch, once the column types are known
+        self.paths.append(table.path)
+
+    def _write_batch(self, table, rows):
+        self._write_frame(table, pd.DataFrame(rows, columns=table.columns))
+
+    def _write_frame(self, table, frame):
+        import pyarrow.parquet as pq
+        pa = self._pa
+        writer = self._writers[id(table)]
+        if writer is None:
+            schema = pa.Schema.from_pandas(frame, preserve_index=False)
+            for i, field in enumerate(schema):
+                if pa.types.is_null(field.type):
+                    schema = schema.set(i, field.with_type(pa.string()))
+            writer = pq.ParquetWriter(self._temp_path(table.path), schema)
+            self._writers[id(table)] = writer
+        writer.write_table(pa.Table.from_pandas(frame, schema=writer.schema, preserve_index=False))
+
+    def _close(self):
+        for table in self.tables:
+            writer = self._writers[id(table)]
+            if writer is None: # No rows: still write a file with the columns
+                import pyarrow.parquet as pq
+                schema = self._pa.schema([(column, self._pa.string()) for column in table.columns])
+                pq.write_table(schema.empty_table(), self._temp_path(table.path))
+            else:
+                writer.close()
+
+
+def open_export(path, format=None, batch_rows=DEFAULT_BATCH_ROWS, float_format=None):
+    """
+    Opens a streaming export to `path`; the format comes from `format` or the file extension.
+    `float_format` only applies to CSV (Excel and Parquet keep full precision).
+    """
+    format = export_format(path, format)
+    if format == 'xlsx':
+        return ExcelExport(path, batch_rows)
+    if format == 'parquet':
+        return ParquetExport(path, batch_rows)
+    return CsvExport(path, batch_rows, float_format)
+
+
+def export_frame(df, path, format=None, index=False, table_name='Sheet1', float_format=None,
+                 batch_rows=DEFAULT_BATCH_ROWS):
+    """
+    Writes one DataFrame through a streaming export. Returns the path written.
+    """
+    columns = list(df.columns)
+    if index:
+        columns = [df.index.name or ''] + columns
+    with open_export(path, format, batch_rows, float_format) as export:
+        export.add_table(table_name, columns).write_frame(df, index=index)
+    return path
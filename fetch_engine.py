@@ -0,0 +1,80 @@
+"""
+Thread-pool fetch scheduler for fanning blocking data calls out across tickers.
+
+The data sources (Finnhub over requests, yfinance) are blocking libraries, so a thread
+pool gives real overlap of network waits without rewriting them for asyncio.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# --- Configuration ---
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+class TaskResult:
+    """
+    Outcome of one scheduled call: `value` on success, `error` (the exception) on failure.
+    """
+    __slots__ = ('key', 'value', 'error', 'elapsed')
+
+    def __init__(self, key, value=None, error=None, elapsed=0.0):
+        self.key = key
+        self.value = value
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        status = 'ok' if self.ok else f'error={self.error!r}'
+        return f"TaskResult({self.key!r}, {status}, {self.elapsed:.3f}s)"
+
+
+def _timed_call(key, func):
+    start = time.perf_counter()
+    try:
+        value = func()
+    except Exception as e:
+        return TaskResult(key, error=e, elapsed=time.perf_counter() - start)
+    return TaskResult(key, value=value, elapsed=time.perf_counter() - start)
+
+
+def run_concurrently(tasks, max_concurrency=DEFAULT_MAX_CONCURRENCY, progress=None):
+    """
+    Runs `tasks`, a list of (key, zero-argument callable) pairs, on at most
+    `max_concurrency` threads. Returns a list of TaskResult in the same order as `tasks`;
+    an exception in one task never affects the others. `progress(done, total)` is called
+    from the calling thread as tasks finish.
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return []
+    if max_concurrency <= 1 or len(tasks) == 1:
+        results = []
+        for key, func in tasks:
+            results.append(_timed_call(key, func))
+            if progress is not None:
+                progress(len(results), len(tasks))
+        return results
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(tasks))) as pool:
+        futures = [pool.submit(_timed_call, key, func) for key, func in tasks]
+        if progress is not None:
+            for done, _ in enumerate(as_completed(futures), start=1):
+                progress(done, len(tasks))
+        return [future.result() for future in futures]
+
+
+def errors_by_key(results):
+    """
+    Groups failed TaskResults into {key: [exception, ...]}. Tuple keys are grouped by their first item
+    (e.g. ('AAPL', 'profile') is reported under 'AAPL').
+    """
+    errors = {}
+    for result in results:
+        if not result.ok:
+            key = result.key[0] if isinstance(result.key, tuple) else result.key
+            errors.setdefault(key, []).append(result.error)
+    return errors
@@ -0,0 +1,185 @@
+"""
+Shared Finnhub HTTP client: one pooled keep-alive session with connect/read timeouts,
+retries with exponential backoff and jitter on 429/5xx, a token-bucket rate limiter for
+the per-minute quota, and connection-reuse / wait-vs-in-flight metrics.
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import TokenBucket
+
+# --- Configuration ---
+FINNHUB_BASE_URL = "https://finnhub.io/api/v1"
+CONNECT_TIMEOUT = 3.05  # Seconds to establish the TCP/TLS connection
+READ_TIMEOUT = 10  # Seconds to wait for the response once connected
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5  # Seconds; the retry delay ceiling doubles on every attempt
+BACKOFF_MAX = 8.0
+POOL_SIZE = 16  # Keep-alive connections kept open per host (match the fetch concurrency)
+CALLS_PER_MINUTE = 60  # Finnhub free tier quota; raise for paid plans
+BURST = 10  # Calls allowed back-to-back before the per-minute pacing kicks in
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class FinnhubClient:
+    """
+    Thread-safe Finnhub API client reusing TCP/TLS connections across calls.
+
+    `get()` returns the decoded JSON body or raises the usual `requests` exceptions
+    (HTTPError, ConnectionError, Timeout) once retries are exhausted. Every attempt first
+    takes a token from `rate_limiter` (if given), so callers queue instead of hitting 429s.
+    Point `base_url` at a local stub server to test without network access.
+    """
+
+    def __init__(self, api_key, base_url=FINNHUB_BASE_URL, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX, pool_size=POOL_SIZE, rate_limiter=None):
+        self.api_key = api_key
+        self.rate_limiter = rate_limiter
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        # Retries are handled in get() so that every attempt is counted and backed off with jitter
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', self._adapter)
+        self.session.mount('https://', self._adapter)
+        self.session.headers['X-Finnhub-Token'] = api_key
+
+        self._metrics_lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+        self._in_flight_seconds = 0.0
+
+    def _backoff_delay(self, attempt, response=None):
+        """
+        Full-jitter exponential backoff; a 429's Retry-After header takes precedence.
+        """
+        if response is not None and response.headers.get('Retry-After'):
+            try:
+                return min(float(response.headers['Retry-After']), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get(self, path, **params):
+        """
+        GETs `path` (e.g. '/quote') with query `params` and returns the parsed JSON.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            with self._metrics_lock:
+                self._requests += 1
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                with self._metrics_lock:
+                    self._in_flight_seconds += time.perf_counter() - start
+                if attempt >= self.max_retries:
+                    with self._metrics_lock:
+                        self._failures += 1
+                    raise
+                response = None
+            else:
+                with self._metrics_lock:
+                    self._in_flight_seconds += time.perf_counter() - start
+                if response.status_code == 429 and self.rate_limiter is not None:
+                    # Our quota estimate was too generous: make every caller back off together
+                    self.rate_limiter.penalize(self._backoff_delay(attempt, response))
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    if not response.ok:
+                        with self._metrics_lock:
+                            self._failures += 1
+                    response.raise_for_status()
+                    return response.json()
+
+            with self._metrics_lock:
+                self._retries += 1
+            delay = self._backoff_delay(attempt, response)
+            if response is not None:
+                response.close()  # Return the connection to the pool before retrying
+            time.sleep(delay)
+            attempt += 1
+
+    # --- Endpoints ---
+
+    def quote(self, ticker_symbol):
+        return self.get('/quote', symbol=ticker_symbol)
+
+    def company_profile(self, ticker_symbol):
+        return self.get('/stock/profile2', symbol=ticker_symbol)
+
+    def search(self, query):
+        return self.get('/search', q=query)
+
+    def stock_symbols(self, exchange):
+        return self.get('/stock/symbol', exchange=exchange)
+
+    # --- Metrics ---
+
+    def _connections_opened(self):
+        opened = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+        return opened
+
+    def metrics(self):
+        """
+        Returns request/retry/failure counts, how many requests reused a pooled connection,
+        and the time spent queued in the rate limiter versus in flight.
+        """
+        with self._metrics_lock:
+            sent, retries, failures = self._requests, self._retries, self._failures
+            in_flight = self._in_flight_seconds
+        opened = self._connections_opened()
+        metrics = {
+            'requests': sent,
+            'retries': retries,
+            'failures': failures,
+            'connections_opened': opened,
+            'connections_reused': max(sent - opened, 0),
+            'in_flight_seconds': round(in_flight, 3),
+        }
+        if self.rate_limiter is not None:
+            limiter_stats = self.rate_limiter.stats()
+            metrics['rate_limited_calls'] = limiter_stats['waited']
+            metrics['wait_seconds'] = limiter_stats['wait_seconds']
+        return metrics
+
+    def close(self):
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_finnhub_client(api_key, base_url=FINNHUB_BASE_URL, calls_per_minute=CALLS_PER_MINUTE, burst=BURST):
+    """
+    Returns the process-wide client for `api_key`, creating it on first use.
+    The quota is per API key, so every caller using the key shares one rate limiter.
+    The rate settings only apply when the client is first created.
+    """
+    with _clients_lock:
+        client = _clients.get((api_key, base_url))
+        if client is None:
+            client = FinnhubClient(api_key, base_url=base_url,
+                                   rate_limiter=TokenBucket(calls_per_minute, burst=burst))
+            _clients[(api_key, base_url)] = client
+        return client
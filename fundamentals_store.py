@@ -0,0 +1,290 @@
+"""
+Persistent store of income statements (annual and quarterly) keyed by ticker and fiscal period.
+
+Statements are kept in SQLite as one (ticker, frequency, period end, metric) -> value row each.
+A refresh adds new periods to the ones already stored, so the history grows beyond the four or
+five periods yfinance returns. Statements only change when a company files, so instead of a
+fixed TTL each ticker is refreshed when its next report is due: the expected end of its next
+fiscal period plus the usual filing lag. Until then, reads never touch the network.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from fetch_engine import run_concurrently
+
+# --- Configuration ---
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser("~"), ".stock_analyser", "fundamentals.sqlite")
+FREQUENCIES = ('annual', 'quarterly')
+PERIOD_MONTHS = {'annual': 12, 'quarterly': 3}
+# Days between the end of a fiscal period and its statement showing up (10-K / 10-Q deadlines plus slack)
+FILING_LAG_DAYS = {'annual': 90, 'quarterly': 50}
+OVERDUE_RETRY_DAYS = 1  # A report is due but not out yet: check again this often
+EMPTY_RETRY_DAYS = 7  # No statements at all (funds, new listings): check again this often
+MAX_REFRESH_DAYS = 180  # Re-check at least this often, to pick up restatements
+DEFAULT_CONCURRENCY = 8
+REVENUE_KEYS = ('Total Revenue', 'Revenue', 'Sales')  # Names yfinance has used for sales, most common first
+METRIC_ALIASES = {'Sales': REVENUE_KEYS, 'Revenue': REVENUE_KEYS}  # Export names -> statement rows tried in order
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS statements (
+    ticker TEXT,
+    frequency TEXT,
+    period_end TEXT,   -- ISO date
+    metric TEXT,
+    position INTEGER,  -- row order of the metric in the statement
+    value REAL,
+    PRIMARY KEY (ticker, frequency, period_end, metric)
+);
+CREATE TABLE IF NOT EXISTS refreshes (
+    ticker TEXT,
+    frequency TEXT,
+    fetched_at REAL,
+    next_refresh REAL,
+    PRIMARY KEY (ticker, frequency)
+);
+"""
+
+
+def _check_frequency(frequency):
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Unknown statement frequency '{frequency}'; expected one of {FREQUENCIES}.")
+
+
+def fetch_income_statement(ticker_symbol, frequency='annual'):
+    """
+    Downloads an income statement from yfinance (metrics x period ends), or None if there is none.
+    """
+    _check_frequency(frequency)
+    import yfinance as yf # Imported on the first download only: store hits never load it
+    stock = yf.Ticker(ticker_symbol)
+    df = stock.financials if frequency == 'annual' else stock.quarterly_financials
+    if df is None or df.empty:
+        return None
+    return df
+
+
+def next_refresh_time(period_ends, frequency, now=None):
+    """
+    Epoch seconds at which a statement with these fiscal period ends can next have a new period.
+    """
+    now = time.time() if now is None else now
+    if not period_ends:
+        return now + EMPTY_RETRY_DAYS * 86400
+    last_end = max(period_ends)
+    months = last_end.month - 1 + PERIOD_MONTHS[frequency]
+    next_end = pd.Timestamp(last_end.year + months // 12, months % 12 + 1, 1) + pd.offsets.MonthEnd(0)
+    due = (next_end + pd.Timedelta(days=FILING_LAG_DAYS[frequency])).timestamp()
+    if due <= now:
+        return now + OVERDUE_RETRY_DAYS * 86400
+    return min(due, now + MAX_REFRESH_DAYS * 86400)
+
+
+def extract_metric(financials_df, keys):
+    """
+    One metric of a statement (metrics x period ends) as a Series indexed by period end, oldest
+    first. `keys` is a metric name or a sequence of alternative names tried in order (e.g.
+    REVENUE_KEYS). Returns None if the statement has none of them.
+    """
+    if financials_df is None or financials_df.empty:
+        return None
+    for key in ([keys] if isinstance(keys, str) else keys):
+        if key in financials_df.index:
+            series = financials_df.loc[key]
+            if isinstance(series, pd.DataFrame): # Duplicated metric rows: keep the first
+                series = series.iloc[0]
+            return pd.to_numeric(series, errors='coerce').dropna().sort_index()
+    return None
+
+
+def extract_sales(financials_df):
+    """Annual or quarterly sales (revenue) of a statement as a Series named 'Sales', or None."""
+    sales = extract_metric(financials_df, REVENUE_KEYS)
+    return None if sales is None else sales.rename('Sales')
+
+
+class FundamentalsStore:
+    """
+    Thread-safe statement store backed by the SQLite file at `path` (':memory:' for a throwaway store).
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, fetch=fetch_income_statement):
+        self.path = path
+        self.fetch = fetch # fetch(ticker, frequency) -> DataFrame (metrics x period ends) or None
+        self._lock = threading.Lock()
+        self._connection = None
+        self.fetches = 0
+
+    @property
+    def _db(self):
+        # Opened on first use (call with the lock held), so merely importing a user of the store touches no files
+        if self._connection is None:
+            if self.path != ':memory:':
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            # A cache: write-ahead logging without an fsync per commit keeps batches of small writes cheap
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def due(self, ticker_symbols, frequency='annual', now=None):
+        """The tickers (upper-cased) whose statement was never fetched or may have a new period by now."""
+        now = time.time() if now is None else now
+        with self._lock:
+            next_refresh = dict(self._db.execute("SELECT ticker, next_refresh FROM refreshes WHERE frequency = ?",
+                                                 (frequency,)))
+        tickers = dict.fromkeys(t.strip().upper() for t in ticker_symbols if t.strip())
+        return [ticker for ticker in tickers if now >= next_refresh.get(ticker, now)]
+
+    def needs_refresh(self, ticker_symbol, frequency='annual', now=None):
+        """True if the ticker's statement was never fetched or a new period may have been filed since."""
+        with self._lock:
+            row = self._db.execute("SELECT next_refresh FROM refreshes WHERE ticker = ? AND frequency = ?",
+                                   (ticker_symbol.upper(), frequency)).fetchone()
+        return row is None or (time.time() if now is None else now) >= row[0]
+
+    def statements(self, ticker_symbols, frequency='annual'):
+        """
+        Stored statements shaped like yfinance's (metrics x period ends, newest first), read in one
+        query. Returns {ticker: DataFrame or None} in input order. Never fetches.
+        """
+        tickers = list(dict.fromkeys(t.strip().upper() for t in ticker_symbols if t.strip()))
+        rows_by_ticker = {ticker: [] for ticker in tickers}
+        with self._lock:
+            for start in range(0, len(tickers), 500): # SQLite caps the number of query parameters
+                chunk = tickers[start:start + 500]
+                query = (f"SELECT ticker, metric, position, period_end, value FROM statements "
+                         f"WHERE frequency = ? AND ticker IN ({', '.join('?' * len(chunk))})")
+                for ticker, *row in self._db.execute(query, [frequency, *chunk]):
+                    rows_by_ticker[ticker].append(row)
+        return {ticker: _statement_frame(rows) for ticker, rows in rows_by_ticker.items()}
+
+    def statement(self, ticker_symbol, frequency='annual'):
+        """
+        One stored statement (metrics x period ends, newest first), or None. Never fetches.
+        """
+        return self.statements([ticker_symbol], frequency)[ticker_symbol.strip().upper()]
+
+    def put(self, ticker_symbol, frequency, financials_df, now=None):
+        """
+        Adds (or replaces) the periods of a fetched statement and schedules the next refresh.
+        Periods already stored but no longer returned upstream are kept.
+        """
+        _check_frequency(frequency)
+        ticker_symbol = ticker_symbol.upper()
+        now = time.time() if now is None else now
+        records = []
+        period_ends = []
+        if financials_df is not None and not financials_df.empty:
+            period_ends = [pd.Timestamp(column) for column in financials_df.columns]
+            for position, (metric, values) in enumerate(financials_df.iterrows()):
+                for period_end, value in zip(period_ends, values):
+                    try:
+                        value = float(value)
+                    except (TypeError, ValueError):
+                        continue
+                    if not math.isnan(value):
+                        records.append((ticker_symbol, frequency, period_end.strftime('%Y-%m-%d'), str(metric),
+                                        position, value))
+        with self._lock:
+            with self._db:
+                stored = [row[0] for row in self._db.execute(
+                    "SELECT DISTINCT period_end FROM statements WHERE ticker = ? AND frequency = ?",
+                    (ticker_symbol, frequency))]
+                self._db.executemany("INSERT OR REPLACE INTO statements VALUES (?, ?, ?, ?, ?, ?)", records)
+                all_ends = set(period_ends) | {pd.Timestamp(end) for end in stored}
+                self._db.execute("INSERT OR REPLACE INTO refreshes VALUES (?, ?, ?, ?)",
+                                 (ticker_symbol, frequency, now, next_refresh_time(all_ends, frequency, now)))
+
+    def refresh(self, ticker_symbol, frequency='annual'):
+        """
+        Fetches and stores the ticker's statement. Fetch errors propagate without recording
+        anything, so the next call tries again.
+        """
+        _check_frequency(frequency)
+        self.fetches += 1
+        self.put(ticker_symbol, frequency, self.fetch(ticker_symbol, frequency))
+
+    def get(self, ticker_symbol, frequency='annual', force_refresh=False):
+        """
+        The ticker's statement, fetched only when a new period may be out (or `force_refresh`).
+        """
+        if force_refresh or self.needs_refresh(ticker_symbol, frequency):
+            self.refresh(ticker_symbol, frequency)
+        return self.statement(ticker_symbol, frequency)
+
+    def get_many(self, ticker_symbols, frequency='annual', max_concurrency=DEFAULT_CONCURRENCY, progress=None):
+        """
+        Statements for many tickers: only tickers that are due are fetched (concurrently), then
+        everything is read from the store. Returns ({ticker: DataFrame or None} in input order,
+        {ticker: exception} for failed fetches, whose previously stored statement is returned).
+        """
+        _check_frequency(frequency)
+        due = self.due(ticker_symbols, frequency)
+        errors = {}
+        if due:
+            results = run_concurrently([(ticker, lambda ticker=ticker: self.refresh(ticker, frequency)) for ticker in due],
+                                       max_concurrency=max_concurrency, progress=progress)
+            errors = {result.key: result.error for result in results if not result.ok}
+        return self.statements(ticker_symbols, frequency), errors
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def _statement_frame(rows):
+    """Builds a statement DataFrame from (metric, position, period_end, value) rows."""
+    if not rows:
+        return None
+    metrics = {}
+    for metric, position, _, _ in rows:
+        metrics[metric] = min(position, metrics.get(metric, position))
+    metric_order = sorted(metrics, key=metrics.get)
+    period_ends = sorted({row[2] for row in rows}, reverse=True)
+    metric_row = {metric: i for i, metric in enumerate(metric_order)}
+    period_column = {period_end: i for i, period_end in enumerate(period_ends)}
+    values = np.full((len(metric_order), len(period_ends)), np.nan)
+    for metric, _, period_end, value in rows:
+        values[metric_row[metric], period_column[period_end]] = value
+    return pd.DataFrame(values, index=metric_order, columns=pd.DatetimeIndex(np.array(period_ends, dtype='datetime64[ns]')))
+
+
+def period_label(period_end, frequency):
+    """'2023' for annual periods, '2023-Q4' (calendar quarter of the period end) for quarterly ones."""
+    period_end = pd.Timestamp(period_end)
+    if frequency == 'annual':
+        return str(period_end.year)
+    return f"{period_end.year}-Q{(period_end.month - 1) // 3 + 1}"
+
+
+def metric_table(statements, keys, frequency='annual', periods=None):
+    """
+    One metric for many tickers as a DataFrame (tickers x period labels, oldest first), from
+    {ticker: statement}. `keys` is a statement row name, a METRIC_ALIASES name or a sequence of
+    alternatives. Tickers without the metric get an all-NaN row. `periods` keeps the latest N.
+    """
+    if isinstance(keys, str):
+        keys = METRIC_ALIASES.get(keys, keys)
+    rows = {}
+    for ticker, df in statements.items():
+        series = extract_metric(df, keys)
+        if series is None or series.empty:
+            rows[ticker] = pd.Series(dtype='float64')
+            continue
+        series.index = [period_label(end, frequency) for end in series.index]
+        rows[ticker] = series[~series.index.duplicated(keep='last')]
+    table = pd.DataFrame.from_dict(rows, orient='index')
+    table = table.reindex(columns=sorted(table.columns)).reindex(list(statements))
+    if periods is not None:
+        table = table.iloc[:, -periods:] if periods > 0 else table.iloc[:, :0]
+    table.index.name = 'Ticker'
+    return table
@@ -0,0 +1,409 @@
+"""
+Persistent on-disk OHLCV cache for daily yfinance history.
+
+Every ticker is stored as one NumPy structured array (``<TICKER>.npy``) with an
+int64 epoch-day date column and float64 price/volume columns, plus a small JSON
+sidecar recording when it was last refreshed and used and how far back it is complete.
+Repeat requests only download the bars after the last cached date and append them.
+"""
+import datetime
+import json
+import os
+import re
+import threading
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".stock_analyser", "history")
+
+# Exchange hours keyed by Yahoo ticker suffix: (timezone, open (h, m), close (h, m)).
+# Tickers without a known suffix are treated as US listings.
+MARKET_HOURS = {
+    '': ('America/New_York', (9, 30), (16, 0)),
+    '.NS': ('Asia/Kolkata', (9, 15), (15, 30)),
+    '.BO': ('Asia/Kolkata', (9, 15), (15, 30)),
+    '.L': ('Europe/London', (8, 0), (16, 30)),
+    '.DE': ('Europe/Berlin', (9, 0), (17, 30)),
+    '.PA': ('Europe/Paris', (9, 0), (17, 30)),
+    '.TO': ('America/Toronto', (9, 30), (16, 0)),
+    '.HK': ('Asia/Hong_Kong', (9, 30), (16, 0)),
+    '.T': ('Asia/Tokyo', (9, 0), (15, 30)),
+}
+CLOSE_SETTLE_MINUTES = 30  # Give the data provider time to publish the final daily bar
+INTRADAY_MAX_AGE_MINUTES = 15  # While the market is open, today's bar is refreshed at most this often
+ACCESS_TOUCH_MINUTES = 60  # Cache hits rewrite the last-access time at most this often
+
+BAR_DTYPE = np.dtype([
+    ('date', '<i8'),  # Days since 1970-01-01
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('dividends', '<f8'),
+    ('splits', '<f8'),
+])
+
+# Structured-array field -> yfinance column name
+COLUMN_MAP = [
+    ('open', 'Open'),
+    ('high', 'High'),
+    ('low', 'Low'),
+    ('close', 'Close'),
+    ('volume', 'Volume'),
+    ('dividends', 'Dividends'),
+    ('splits', 'Stock Splits'),
+]
+
+_FULL_HISTORY = np.iinfo(np.int64).min  # "covered_from" marker for period="max"
+
+
+# --- Market Calendar Helpers ---
+
+def market_hours_for(ticker_symbol):
+    """
+    Returns (timezone, open_time, close_time) for the exchange a Yahoo ticker trades on.
+    """
+    suffix = ''
+    if '.' in ticker_symbol:
+        suffix = ticker_symbol[ticker_symbol.rindex('.'):].upper()
+    tz_name, open_hm, close_hm = MARKET_HOURS.get(suffix, MARKET_HOURS[''])
+    return ZoneInfo(tz_name), datetime.time(*open_hm), datetime.time(*close_hm)
+
+
+def is_market_open(ticker_symbol, now=None):
+    """
+    True if the ticker's exchange is inside its regular session (weekends excluded, holidays ignored).
+    """
+    tz, open_time, close_time = market_hours_for(ticker_symbol)
+    local_now = (now or datetime.datetime.now(datetime.timezone.utc)).astimezone(tz)
+    return local_now.weekday() < 5 and open_time <= local_now.time() < close_time
+
+
+def last_session_close(ticker_symbol, now=None):
+    """
+    Returns the most recent (settled) session close at or before `now` as an aware datetime.
+    """
+    tz, _, close_time = market_hours_for(ticker_symbol)
+    local_now = (now or datetime.datetime.now(datetime.timezone.utc)).astimezone(tz)
+    settle = datetime.timedelta(minutes=CLOSE_SETTLE_MINUTES)
+    day = local_now.date()
+    while True:
+        candidate = datetime.datetime.combine(day, close_time, tzinfo=tz) + settle
+        if day.weekday() < 5 and candidate <= local_now:
+            return candidate
+        day -= datetime.timedelta(days=1)
+
+
+def period_start(period, today=None):
+    """
+    Converts a yfinance period string ('5d', '6mo', '1y', 'ytd', 'max', ...) into a start date.
+    Returns None for 'max'.
+    """
+    today = today or datetime.date.today()
+    period = period.lower().strip()
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return datetime.date(today.year, 1, 1)
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if not match:
+        raise ValueError(f"Unsupported period '{period}'.")
+    amount, unit = int(match.group(1)), match.group(2)
+    if unit == 'd':
+        return today - datetime.timedelta(days=amount)
+    if unit == 'wk':
+        return today - datetime.timedelta(weeks=amount)
+    months = amount if unit == 'mo' else amount * 12
+    year, month = divmod(today.year * 12 + today.month - 1 - months, 12)
+    month += 1
+    # Clamp the day for shorter months (e.g. 31 March - 1 month)
+    for day in range(today.day, 0, -1):
+        try:
+            return datetime.date(year, month, day)
+        except ValueError:
+            continue
+
+
+def _epoch_day(date):
+    return (date - datetime.date(1970, 1, 1)).days
+
+
+# --- Frame <-> Record Conversion ---
+
+def frame_to_records(df):
+    """
+    Converts a yfinance history DataFrame into a sorted, de-duplicated BAR_DTYPE array.
+    """
+    index = df.index
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    records = np.zeros(len(df), dtype=BAR_DTYPE)
+    records['date'] = index.values.astype('datetime64[D]').astype(np.int64)
+    for field, column in COLUMN_MAP:
+        if column in df.columns:
+            records[field] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    records = records[np.argsort(records['date'], kind='stable')]
+    # Keep the last row for any duplicated date (the freshest value wins)
+    if len(records) > 1:
+        keep = np.append(records['date'][1:] != records['date'][:-1], True)
+        records = records[keep]
+    return records
+
+
+def records_to_frame(records):
+    """
+    Converts a BAR_DTYPE array back into a DataFrame shaped like yfinance's history() output.
+    """
+    index = pd.DatetimeIndex(records['date'].astype('datetime64[D]'), name='Date')
+    return pd.DataFrame({column: np.asarray(records[field]) for field, column in COLUMN_MAP}, index=index)
+
+
+def merge_records(cached, fresh):
+    """
+    Appends `fresh` bars to `cached`, replacing any cached bars on or after the first fresh date.
+    """
+    if len(cached) == 0:
+        return fresh
+    if len(fresh) == 0:
+        return cached
+    return np.concatenate([cached[cached['date'] < fresh['date'][0]], fresh])
+
+
+# --- The Cache ---
+
+class HistoryCache:
+    """
+    One-file-per-ticker store of daily bars with incremental refresh.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, on_download=None):
+        self.cache_dir = cache_dir
+        self.on_download = on_download  # Called with the ticker before every real download (e.g. for call counters)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _paths(self, ticker_symbol):
+        safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', ticker_symbol.upper())
+        base = os.path.join(self.cache_dir, safe_name)
+        return base + '.npy', base + '.json'
+
+    def _lock_for(self, ticker_symbol):
+        with self._locks_guard:
+            return self._locks.setdefault(ticker_symbol.upper(), threading.Lock())
+
+    def _read(self, ticker_symbol):
+        data_path, meta_path = self._paths(ticker_symbol)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            records = np.load(data_path)
+        except (OSError, ValueError):
+            return np.zeros(0, dtype=BAR_DTYPE), {}
+        return records, meta
+
+    def _write(self, ticker_symbol, records, meta):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data_path, meta_path = self._paths(ticker_symbol)
+        # Write to temporary files and rename so readers never see a half-written series
+        tmp_data = data_path + '.tmp'
+        with open(tmp_data, 'wb') as f:
+            np.save(f, np.ascontiguousarray(records, dtype=BAR_DTYPE))
+        os.replace(tmp_data, data_path)
+        self._write_meta(ticker_symbol, meta)
+
+    def _write_meta(self, ticker_symbol, meta):
+        _, meta_path = self._paths(ticker_symbol)
+        tmp_meta = meta_path + '.tmp'
+        with open(tmp_meta, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+
+    def _touch(self, ticker_symbol, meta, now):
+        """
+        Records a cache hit in the sidecar so evict() can tell recently used tickers apart.
+        Rewritten at most once per ACCESS_TOUCH_MINUTES to keep hits cheap.
+        """
+        accessed_at = meta.get('accessed_at')
+        if accessed_at and now - datetime.datetime.fromisoformat(accessed_at) < datetime.timedelta(minutes=ACCESS_TOUCH_MINUTES):
+            return
+        meta['accessed_at'] = now.isoformat()
+        self._write_meta(ticker_symbol, meta)
+
+    def _fetch(self, ticker_symbol, start):
+        """
+        Downloads daily bars from `start` (a date, or None for the full history).
+        """
+        import yfinance as yf # Imported on the first download only: cache hits never load it
+        if self.on_download is not None:
+            self.on_download(ticker_symbol)
+        stock = yf.Ticker(ticker_symbol)
+        if start is None:
+            df = stock.history(period='max', auto_adjust=True)
+        else:
+            df = stock.history(start=start.isoformat(), auto_adjust=True)
+        if df is None or df.empty:
+            return np.zeros(0, dtype=BAR_DTYPE)
+        return frame_to_records(df)
+
+    def is_stale(self, ticker_symbol, meta, now=None):
+        """
+        Staleness rule: while the market is open, refresh every INTRADAY_MAX_AGE_MINUTES;
+        otherwise refresh once after each settled session close.
+        """
+        refreshed_at = meta.get('refreshed_at')
+        if not refreshed_at:
+            return True
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        refreshed_at = datetime.datetime.fromisoformat(refreshed_at)
+        if is_market_open(ticker_symbol, now):
+            return now - refreshed_at > datetime.timedelta(minutes=INTRADAY_MAX_AGE_MINUTES)
+        return refreshed_at < last_session_close(ticker_symbol, now)
+
+    def get(self, ticker_symbol, period="1y", force_refresh=False):
+        """
+        Returns daily history for `period` as a DataFrame, downloading only what is missing.
+        Returns None if no data exists for the ticker.
+        """
+        start = period_start(period)
+        wanted_from = _FULL_HISTORY if start is None else _epoch_day(start)
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        with self._lock_for(ticker_symbol):
+            records, meta = self._read(ticker_symbol)
+            covered_from = meta.get('covered_from')
+
+            if len(records) == 0 or covered_from is None or covered_from > wanted_from:
+                # Nothing cached for the requested range yet: fetch it in full
+                records = self._fetch(ticker_symbol, start)
+                covered_from = wanted_from
+                self._write(ticker_symbol, records, self._meta(covered_from, now))
+            elif force_refresh or self.is_stale(ticker_symbol, meta, now):
+                records = self._refresh_tail(ticker_symbol, records, covered_from)
+                self._write(ticker_symbol, records, self._meta(covered_from, now))
+            else:
+                self._touch(ticker_symbol, meta, now)
+
+        if len(records) == 0:
+            return None
+        if start is not None:
+            records = records[records['date'] >= wanted_from]
+        return records_to_frame(records) if len(records) else None
+
+    def peek(self, ticker_symbol, period="1y"):
+        """
+        Returns cached history for `period` without downloading anything, or None if the cache
+        does not cover the period or is due for a refresh.
+        """
+        start = period_start(period)
+        wanted_from = _FULL_HISTORY if start is None else _epoch_day(start)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with self._lock_for(ticker_symbol):
+            records, meta = self._read(ticker_symbol)
+            covered_from = meta.get('covered_from')
+            if len(records) == 0 or covered_from is None or covered_from > wanted_from or self.is_stale(ticker_symbol, meta, now):
+                return None
+            self._touch(ticker_symbol, meta, now)
+        if start is not None:
+            records = records[records['date'] >= wanted_from]
+        return records_to_frame(records) if len(records) else None
+
+    def put(self, ticker_symbol, df, period="1y"):
+        """
+        Stores history for `period` that was downloaded elsewhere (e.g. by a bulk download).
+        If the cache already holds a longer history, the new bars are appended only when they
+        continue it unchanged (same overlapping close, no new split or dividend).
+        """
+        fresh = frame_to_records(df)
+        if len(fresh) == 0:
+            return
+        start = period_start(period)
+        wanted_from = _FULL_HISTORY if start is None else _epoch_day(start)
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        with self._lock_for(ticker_symbol):
+            records, meta = self._read(ticker_symbol)
+            covered_from = meta.get('covered_from')
+            if len(records) and covered_from is not None and covered_from < wanted_from:
+                overlap = records['date'] == fresh['date'][0]
+                new_bars = fresh[fresh['date'] > records['date'][-1]]
+                if (not overlap.any() or not np.isclose(records['close'][overlap][0], fresh['close'][0], rtol=1e-6)
+                        or np.any(new_bars['splits'] != 0) or np.any(new_bars['dividends'] != 0)):
+                    return # Cannot extend the longer history safely; the next get() refreshes it
+                records = merge_records(records, fresh)
+            else:
+                records, covered_from = fresh, wanted_from
+            self._write(ticker_symbol, records, self._meta(covered_from, now))
+
+    @staticmethod
+    def _meta(covered_from, now):
+        # A download or store is also a use of the ticker
+        return {'covered_from': covered_from, 'refreshed_at': now.isoformat(), 'accessed_at': now.isoformat()}
+
+    def _refresh_tail(self, ticker_symbol, records, covered_from):
+        """
+        Fetches bars from the second-to-last cached date onwards and appends them.
+        The overlapping (complete) bar is used to detect retroactive price adjustments.
+        """
+        overlap_day = int(records['date'][-2] if len(records) > 1 else records['date'][-1])
+        fresh = self._fetch(ticker_symbol, datetime.date(1970, 1, 1) + datetime.timedelta(days=overlap_day))
+        if len(fresh) == 0:
+            return records
+
+        cached_close = records['close'][records['date'] == overlap_day]
+        fresh_close = fresh['close'][fresh['date'] == overlap_day]
+        adjusted = (
+            len(cached_close) and len(fresh_close)
+            and not np.isclose(cached_close[0], fresh_close[0], rtol=1e-6)
+        )
+        new_bars = fresh[fresh['date'] > overlap_day]
+        if adjusted or np.any(new_bars['splits'] != 0) or np.any(new_bars['dividends'] != 0):
+            # A split/dividend re-adjusts the whole back-adjusted series: re-download it
+            start = None if covered_from == _FULL_HISTORY else datetime.date(1970, 1, 1) + datetime.timedelta(days=covered_from)
+            return self._fetch(ticker_symbol, start)
+        return merge_records(records, fresh)
+
+    def evict(self, max_idle_days=30, keep_days=None):
+        """
+        Removes tickers not used (read or refreshed) within `max_idle_days`, and optionally trims every
+        remaining series to its last `keep_days` calendar days. Returns the removed tickers.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        now = datetime.datetime.now(datetime.timezone.utc)
+        removed = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            ticker_symbol = name[:-len('.json')]
+            with self._lock_for(ticker_symbol):
+                records, meta = self._read(ticker_symbol)
+                last_used = meta.get('accessed_at') or meta.get('refreshed_at')  # Older sidecars lack accessed_at
+                idle = last_used is None or \
+                    now - datetime.datetime.fromisoformat(last_used) > datetime.timedelta(days=max_idle_days)
+                if idle:
+                    for path in self._paths(ticker_symbol):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                    removed.append(ticker_symbol)
+                elif keep_days is not None and len(records):
+                    cutoff = _epoch_day(now.date()) - keep_days
+                    if records['date'][0] < cutoff:
+                        meta['covered_from'] = max(meta.get('covered_from', cutoff), cutoff)
+                        self._write(ticker_symbol, records[records['date'] >= cutoff], meta)
+        return removed
+
+    def clear(self):
+        """
+        Deletes every cached series.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(('.npy', '.json', '.tmp')):
+                os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,165 @@
+"""
+Vectorized technical indicators over a 2-D price matrix (dates x tickers).
+
+Every function accepts a 1-D/2-D NumPy array or a pandas Series/DataFrame and computes
+the indicator for all columns in one pass. Rolling windows use cumulative sums, so each
+window costs O(1) per element regardless of its length. Leading NaNs (tickers that
+started trading later) are handled per column; a value is NaN until its window is full,
+matching pandas' `rolling(window).mean()`.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _as_matrix(values):
+    """
+    Returns (float64 2-D array, wrap) where wrap(result) restores the caller's type/shape.
+    """
+    if isinstance(values, pd.DataFrame):
+        index, columns = values.index, values.columns
+        return values.to_numpy(dtype=np.float64, na_value=np.nan), \
+            lambda result: pd.DataFrame(result, index=index, columns=columns)
+    if isinstance(values, pd.Series):
+        index, name = values.index, values.name
+        return values.to_numpy(dtype=np.float64, na_value=np.nan).reshape(-1, 1), \
+            lambda result: pd.Series(result[:, 0], index=index, name=name)
+    array = np.asarray(values, dtype=np.float64)
+    if array.ndim == 1:
+        return array.reshape(-1, 1), lambda result: result[:, 0]
+    return array, lambda result: result
+
+
+def _window_sums(matrix, window):
+    """
+    Returns (sum over the trailing `window` rows, count of non-NaN values in it) for every cell.
+    """
+    valid = ~np.isnan(matrix)
+    padded = np.zeros((matrix.shape[0] + 1, matrix.shape[1]))
+    np.cumsum(np.where(valid, matrix, 0.0), axis=0, out=padded[1:])
+    counts = np.zeros((matrix.shape[0] + 1, matrix.shape[1]))
+    np.cumsum(valid, axis=0, out=counts[1:])
+
+    sums = np.empty_like(matrix)
+    filled = np.empty_like(matrix)
+    sums[:window - 1] = np.nan
+    filled[:window - 1] = 0
+    sums[window - 1:] = padded[window:] - padded[:-window]
+    filled[window - 1:] = counts[window:] - counts[:-window]
+    return sums, filled
+
+
+def _rolling_mean(matrix, window):
+    if window < 1:
+        raise ValueError("window must be at least 1.")
+    sums, filled = _window_sums(matrix, window)
+    with np.errstate(invalid='ignore'):
+        return np.where(filled == window, sums / window, np.nan)
+
+
+def _ewm(matrix, alpha):
+    """
+    Exponentially weighted mean seeded with each column's first valid value
+    (pandas' `ewm(adjust=False)`); NaNs carry the previous value forward.
+    The loop runs over dates only; each step updates every ticker at once.
+    """
+    result = np.empty_like(matrix)
+    state = np.full(matrix.shape[1], np.nan)
+    for row in range(matrix.shape[0]):
+        values = matrix[row]
+        updated = np.where(np.isnan(state), values, state + alpha * (values - state))
+        state = np.where(np.isnan(values), state, updated)
+        result[row] = state
+    return result
+
+
+def sma(close, window):
+    """
+    Simple moving average of every column.
+    """
+    matrix, wrap = _as_matrix(close)
+    return wrap(_rolling_mean(matrix, window))
+
+
+def ema(close, span):
+    """
+    Exponential moving average with smoothing 2 / (span + 1).
+    """
+    matrix, wrap = _as_matrix(close)
+    return wrap(_ewm(matrix, 2.0 / (span + 1)))
+
+
+def rsi(close, period=14):
+    """
+    Wilder's Relative Strength Index (0-100).
+    """
+    matrix, wrap = _as_matrix(close)
+    change = np.full_like(matrix, np.nan)
+    change[1:] = np.diff(matrix, axis=0)
+    gain = _ewm(np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.0)), 1.0 / period)
+    loss = _ewm(np.where(change < 0, -change, np.where(np.isnan(change), np.nan, 0.0)), 1.0 / period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = 100.0 - 100.0 / (1.0 + gain / loss)
+    result = np.where(loss == 0, np.where(gain == 0, 50.0, 100.0), result)
+    # Wilder's average needs `period` changes before it is meaningful
+    _, filled = _window_sums(change, period)
+    result[filled < period] = np.nan
+    return wrap(result)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """
+    Returns (macd_line, signal_line, histogram).
+    """
+    matrix, wrap = _as_matrix(close)
+    line = _ewm(matrix, 2.0 / (fast + 1)) - _ewm(matrix, 2.0 / (slow + 1))
+    signal_line = _ewm(line, 2.0 / (signal + 1))
+    return wrap(line), wrap(signal_line), wrap(line - signal_line)
+
+
+def bollinger_bands(close, window=20, num_std=2.0):
+    """
+    Returns (middle, upper, lower) bands using the population standard deviation over `window`.
+    """
+    matrix, wrap = _as_matrix(close)
+    middle = _rolling_mean(matrix, window)
+    # Center on the column mean before squaring to keep the cumulative sums well conditioned
+    centered = matrix - np.nanmean(matrix, axis=0)
+    mean_sq = _rolling_mean(centered * centered, window)
+    mean_centered = middle - np.nanmean(matrix, axis=0)
+    std = np.sqrt(np.maximum(mean_sq - mean_centered * mean_centered, 0.0))
+    return wrap(middle), wrap(middle + num_std * std), wrap(middle - num_std * std)
+
+
+def atr(high, low, close, period=14):
+    """
+    Wilder's Average True Range.
+    """
+    high_m, wrap = _as_matrix(high)
+    low_m, _ = _as_matrix(low)
+    close_m, _ = _as_matrix(close)
+    prev_close = np.full_like(close_m, np.nan)
+    prev_close[1:] = close_m[:-1]
+    with np.errstate(invalid='ignore'):
+        true_range = np.fmax(high_m - low_m, np.fmax(np.abs(high_m - prev_close), np.abs(low_m - prev_close)))
+    result = _ewm(true_range, 1.0 / period)
+    _, filled = _window_sums(true_range, period)
+    result[filled < period] = np.nan
+    return wrap(result)
+
+
+def compute_indicators(close, high=None, low=None, sma_windows=(20, 50)):
+    """
+    Computes the full indicator set for every column of `close` and returns a dict of
+    matrices keyed by name ('SMA_20', 'SMA_50', 'EMA_12', 'EMA_26', 'RSI_14', 'MACD',
+    'MACD_Signal', 'MACD_Hist', 'BB_Middle', 'BB_Upper', 'BB_Lower' and, when high/low
+    are given, 'ATR_14').
+    """
+    result = {f'SMA_{window}': sma(close, window) for window in sma_windows}
+    result['EMA_12'] = ema(close, 12)
+    result['EMA_26'] = ema(close, 26)
+    result['RSI_14'] = rsi(close, 14)
+    result['MACD'], result['MACD_Signal'], result['MACD_Hist'] = macd(close)
+    result['BB_Middle'], result['BB_Upper'], result['BB_Lower'] = bollinger_bands(close)
+    if high is not None and low is not None:
+        result['ATR_14'] = atr(high, low, close, 14)
+    return result
@@ -0,0 +1,116 @@
+"""
+Compact columnar in-memory store for the daily price histories of many tickers.
+
+A pandas DataFrame per ticker carries seven float64 columns, its own DatetimeIndex and
+per-object overhead. A PriceStore keeps only the requested columns, each as one contiguous
+(tickers x dates) array (optionally float32), on one shared int64 epoch-day date axis.
+Per-ticker series and dates, and whole-universe matrices, are zero-copy views.
+"""
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+DEFAULT_COLUMNS = ('Close',)
+DEFAULT_DTYPE = np.float32
+
+
+def _epoch_days(index):
+    """Epoch-day int64 array for a (daily) DatetimeIndex."""
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    return index.values.astype('datetime64[D]').astype(np.int64)
+
+
+class PriceStore:
+    """
+    dates:   int64 days since 1970-01-01, shared by every ticker (the union of their bars)
+    tickers: row order of every column array
+    Bars a ticker does not have (before its first bar, or holidays of its exchange that other
+    tickers traded on) are NaN. Build with `PriceStore.from_frames`.
+    """
+
+    def __init__(self, dates, tickers, columns, first, last):
+        self.dates = dates
+        self.tickers = list(tickers)
+        self.ticker_index = {ticker: row for row, ticker in enumerate(self.tickers)}
+        self._columns = columns  # column name -> (tickers x dates) array
+        self._first = first  # per-ticker position of the first and last bar
+        self._last = last
+
+    @classmethod
+    def from_frames(cls, frames, columns=DEFAULT_COLUMNS, dtype=DEFAULT_DTYPE):
+        """
+        Builds a store from an iterable of (ticker, history DataFrame) pairs (or a dict). Each frame
+        is reduced to compact arrays as it arrives, so a generator of downloaded chunks never has
+        every DataFrame in memory at once.
+        """
+        items = frames.items() if isinstance(frames, dict) else frames
+        tickers, ticker_days, ticker_values = [], [], []
+        for ticker, df in items:
+            if df is None or df.empty:
+                continue
+            days = _epoch_days(df.index)
+            order = np.argsort(days, kind='stable')
+            tickers.append(ticker)
+            ticker_days.append(days[order])
+            ticker_values.append([
+                df[column].to_numpy(dtype=dtype, na_value=np.nan)[order] if column in df.columns
+                else np.full(len(days), np.nan, dtype=dtype)
+                for column in columns
+            ])
+
+        dates = np.unique(np.concatenate(ticker_days)) if ticker_days else np.zeros(0, dtype=np.int64)
+        arrays = {column: np.full((len(tickers), len(dates)), np.nan, dtype=dtype) for column in columns}
+        first = np.zeros(len(tickers), dtype=np.int64)
+        last = np.zeros(len(tickers), dtype=np.int64)
+        for row, (days, values) in enumerate(zip(ticker_days, ticker_values)):
+            positions = np.searchsorted(dates, days)
+            first[row], last[row] = positions[0], positions[-1]
+            for column, column_values in zip(columns, values):
+                arrays[column][row, positions] = column_values
+        return cls(dates, tickers, arrays, first, last)
+
+    @property
+    def columns(self):
+        return tuple(self._columns)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the arrays of the store."""
+        return self.dates.nbytes + self._first.nbytes + self._last.nbytes + sum(a.nbytes for a in self._columns.values())
+
+    def __contains__(self, ticker_symbol):
+        return ticker_symbol in self.ticker_index
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def values(self, ticker_symbol, column='Close'):
+        """One ticker's values from its first to its last bar (a view; do not modify)."""
+        row = self.ticker_index[ticker_symbol]
+        return self._columns[column][row, self._first[row]:self._last[row] + 1]
+
+    def dates_for(self, ticker_symbol):
+        """datetime64[D] dates matching `values(ticker_symbol)` (a view)."""
+        row = self.ticker_index[ticker_symbol]
+        return self.dates[self._first[row]:self._last[row] + 1].view('datetime64[D]')
+
+    def matrix(self, column='Close'):
+        """(dates x tickers) view of one column, for vectorized whole-universe work."""
+        return self._columns[column].T
+
+    def frame(self, ticker_symbol, columns=None):
+        """
+        One ticker's history as a DataFrame shaped like yfinance's (requested columns only),
+        without the dates it has no bar for. This copies; prefer `values` in hot paths.
+        """
+        columns = columns or self.columns
+        close = self.values(ticker_symbol, columns[0])
+        keep = ~np.isnan(close)
+        index = pd.DatetimeIndex(self.dates_for(ticker_symbol)[keep], name='Date')
+        return pd.DataFrame({column: self.values(ticker_symbol, column)[keep] for column in columns}, index=index)
+
+    def to_frame(self, column='Close'):
+        """(dates x tickers) DataFrame of one column."""
+        return pd.DataFrame(self.matrix(column), index=pd.DatetimeIndex(self.dates.view('datetime64[D]'), name='Date'),
+                            columns=pd.Index(self.tickers, name='Ticker'), copy=False)
@@ -0,0 +1,74 @@
+"""
+Thread-safe token-bucket rate limiter. Callers block in `acquire()` until a token is
+available instead of failing, so a batch stays just under an API's per-minute quota.
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Allows `calls_per_minute` on average with bursts of up to `burst` calls.
+    """
+
+    def __init__(self, calls_per_minute, burst=None):
+        if calls_per_minute <= 0:
+            raise ValueError("calls_per_minute must be positive.")
+        self.rate = calls_per_minute / 60.0  # Tokens per second
+        self.capacity = float(burst if burst is not None else max(1, calls_per_minute // 10))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._acquired = 0
+        self._waited = 0
+        self._wait_seconds = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """
+        Takes one token, sleeping until one is available. Returns the seconds spent waiting.
+        """
+        start = time.monotonic()
+        slept = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self._acquired += 1
+                    if not slept:
+                        return 0.0
+                    waited = now - start
+                    self._waited += 1
+                    self._wait_seconds += waited
+                    return waited
+                sleep_for = (1 - self._tokens) / self.rate
+            slept = True
+            time.sleep(sleep_for)
+
+    def penalize(self, seconds=None):
+        """
+        Empties the bucket (and optionally pushes the next refill `seconds` into the future),
+        e.g. after the server answered 429 so that every caller backs off together.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = 0.0
+            if seconds:
+                self._updated = now + seconds
+
+    def stats(self):
+        """
+        Returns how many calls went through and how long callers spent queued.
+        """
+        with self._lock:
+            return {
+                'acquired': self._acquired,
+                'waited': self._waited,
+                'wait_seconds': round(self._wait_seconds, 3),
+            }
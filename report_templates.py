@@ -0,0 +1,119 @@
+"""
+Reusable ReportLab building blocks for the stock reports.
+
+Paragraph styles, table styles and the static sections of a report (the disclaimer)
+are built once per process and shared by every report, instead of re-creating the
+sample stylesheet and re-parsing the same markup for each ticker. Static flowables are
+handed out as shallow copies: the parsed text is shared, while the layout state that
+ReportLab sets while wrapping belongs to each report.
+"""
+import contextlib
+import copy
+import functools
+import threading
+
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import Paragraph, TableStyle
+
+_a85_lock = threading.Lock()
+_a85_users = 0
+_a85_saved = None
+
+DISCLAIMER_TEXT = """
+    This report is generated by an AI assistant for informational and educational purposes only.
+    It relies on publicly available data and simplified technical indicators (Moving Averages).
+    It does NOT constitute financial advice. Investing in the stock market involves significant risks,
+    and past performance is not indicative of future results. Before making any investment decisions,
+    it is crucial to conduct your own thorough research, consider all relevant market factors,
+    and consult with a qualified and licensed financial advisor. The AI assistant does not consider
+    your individual financial situation, risk tolerance, or investment objectives.
+    You are solely responsible for your investment choices.
+    """
+
+
+class ReportTemplate:
+    """
+    Styles and static flowables shared by all reports. Use `get_report_template()` rather
+    than creating instances directly.
+    """
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.h1 = styles['h1']
+        self.h2 = styles['h2']
+        self.h3 = styles['h3']
+        self.normal = styles['Normal']
+        # Custom style for disclaimers
+        self.disclaimer_style = ParagraphStyle(
+            'Disclaimer',
+            parent=self.normal,
+            fontSize=8,
+            textColor=colors.red,
+            leading=10,
+            spaceBefore=6
+        )
+        self.sales_table_style = TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.grey),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0,0), (-1,0), 12),
+            ('BACKGROUND', (0,1), (-1,-1), colors.beige),
+            ('GRID', (0,0), (-1,-1), 1, colors.black)
+        ])
+        self._paragraphs = {}
+        self._lock = threading.Lock()
+
+    def paragraph(self, text, style=None):
+        """
+        Returns a Paragraph for static text (headings, labels), parsing each (text, style)
+        pair only once. Do not use it for per-ticker text, which would grow the cache.
+        """
+        style = style or self.normal
+        key = (text, style.name)
+        parsed = self._paragraphs.get(key)
+        if parsed is None:
+            parsed = Paragraph(text, style)
+            with self._lock:
+                self._paragraphs.setdefault(key, parsed)
+        return copy.copy(parsed)
+
+    def disclaimer(self):
+        """
+        Returns the flowables of the disclaimer section, ready to append to a report.
+        """
+        return [self.paragraph("IMPORTANT DISCLAIMER:", self.h3),
+                self.paragraph(DISCLAIMER_TEXT, self.disclaimer_style)]
+
+
+@contextlib.contextmanager
+def binary_pdf_streams():
+    """
+    Writes PDF streams as binary instead of ASCII85 text while the block runs: smaller files, and
+    ReportLab's pure-Python ASCII85 encoder was most of the time spent embedding chart images.
+    ReportLab only has a process-wide switch, so it is set for the duration of the build and
+    restored once the last concurrent report leaves the block.
+    """
+    global _a85_users, _a85_saved
+    with _a85_lock:
+        if _a85_users == 0:
+            _a85_saved = rl_config.useA85
+            rl_config.useA85 = 0
+        _a85_users += 1
+    try:
+        yield
+    finally:
+        with _a85_lock:
+            _a85_users -= 1
+            if _a85_users == 0:
+                rl_config.useA85 = _a85_saved
+
+
+@functools.lru_cache(maxsize=1)
+def get_report_template():
+    """
+    Returns the process-wide ReportTemplate, building it on first use.
+    """
+    return ReportTemplate()
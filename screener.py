@@ -0,0 +1,165 @@
+"""
+Non-interactive whole-universe screener.
+
+Loads daily history for every symbol in a universe file (through the on-disk history
+cache, with bulk yf.download calls for whatever is missing), applies the same SMA/crossover/price-vs-SMA rules as the
+Buy/Sell recommendation to all tickers in one vectorized pass, and writes a ranked
+CSV, Excel or Parquet file of signals.
+
+Usage:
+    python screener.py universe.txt -o signals.csv --workers 16 --batch-size 100
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from bulk_history import load_price_store, DEFAULT_CHUNK_SIZE
+from exporters import export_frame
+from history_cache import HistoryCache, DEFAULT_CACHE_DIR
+from signals import evaluate_signals, RECOMMENDATION_LABELS
+
+# --- Configuration ---
+DEFAULT_WORKERS = 16
+DEFAULT_PERIOD = "1y"
+SHORT_WINDOW = 20
+LONG_WINDOW = 50
+
+
+def read_universe(path):
+    """
+    Reads ticker symbols from a text file (one per line, '#' comments allowed) or from a CSV
+    with a 'Symbol' or 'Ticker' column. Returns upper-cased, de-duplicated symbols in file order.
+    """
+    if path.lower().endswith('.csv'):
+        df = pd.read_csv(path)
+        column = next((c for c in df.columns if c.strip().lower() in ('symbol', 'ticker')), df.columns[0])
+        symbols = df[column].dropna().astype(str)
+    else:
+        with open(path) as f:
+            symbols = [line.split('#', 1)[0] for line in f]
+    return _normalize(symbols)
+
+
+def _normalize(ticker_symbols):
+    # The same form the bulk loader keys its results by: stripped, upper-cased, de-duplicated
+    return list(dict.fromkeys(s.strip().upper() for s in ticker_symbols if s.strip()))
+
+
+def _print_progress(label):
+    start = time.perf_counter()
+
+    def report(done, total):
+        # Report roughly every 5% (and at the end) to keep batch logs readable
+        step = max(1, total // 20)
+        if done == total or done % step == 0:
+            print(f"{label}: {done}/{total} ({done / total:.0%}) in {time.perf_counter() - start:.1f}s",
+                  file=sys.stderr)
+    return report
+
+
+def load_close_tail(ticker_symbols, period=DEFAULT_PERIOD, bars=LONG_WINDOW + 1, workers=DEFAULT_WORKERS,
+                    cache=None, progress=None, batch_size=DEFAULT_CHUNK_SIZE):
+    """
+    Loads history for every ticker (fresh cached bars first, then bulk downloads of `batch_size`
+    symbols with `workers` download threads) and returns (close_matrix, bar_counts, failed).
+    close_matrix is (bars x tickers): each column holds that ticker's last `bars` closes, oldest
+    first, NaN-padded at the top when the history is shorter. Tickers are stripped, upper-cased
+    and de-duplicated first; the columns follow that order.
+    """
+    ticker_symbols = _normalize(ticker_symbols)
+    cache = cache or HistoryCache(DEFAULT_CACHE_DIR)
+    # Closes only, in a compact store, so large universes never hold a DataFrame per ticker
+    store, failed = load_price_store(ticker_symbols, period=period, columns=('Close',), dtype=np.float64,
+                                     chunk_size=batch_size, threads=workers, cache=cache, progress=progress)
+    close_matrix = np.full((bars, len(ticker_symbols)), np.nan)
+    bar_counts = np.zeros(len(ticker_symbols), dtype=np.int64)
+    for column, ticker in enumerate(ticker_symbols):
+        if ticker not in store:
+            failed.setdefault(ticker, "no data")
+            continue
+        closes = store.values(ticker)
+        closes = closes[~np.isnan(closes)] # Dates only other tickers traded on
+        close_matrix[bars - min(bars, len(closes)):, column] = closes[-bars:]
+        bar_counts[column] = len(closes)
+    return close_matrix, bar_counts, failed
+
+
+def screen(ticker_symbols, period=DEFAULT_PERIOD, workers=DEFAULT_WORKERS, cache=None, progress=None,
+           batch_size=DEFAULT_CHUNK_SIZE):
+    """
+    Screens `ticker_symbols` and returns (ranked DataFrame, {ticker: error} for tickers without data).
+    Ranked strongest BUY first, then by how far the 20-day SMA is above the 50-day SMA.
+    Tickers are reported stripped and upper-cased.
+    """
+    ticker_symbols = _normalize(ticker_symbols)
+    close_matrix, bar_counts, failed = load_close_tail(
+        ticker_symbols, period=period, workers=workers, cache=cache, progress=progress, batch_size=batch_size)
+    signals = evaluate_signals(close_matrix, short_window=SHORT_WINDOW, long_window=LONG_WINDOW)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        trend = signals['sma_short'] / signals['sma_long'] - 1.0
+        price_vs_long = signals['price'] / signals['sma_long'] - 1.0
+    results = pd.DataFrame({
+        'Ticker': ticker_symbols,
+        'Recommendation': [RECOMMENDATION_LABELS[c] for c in signals['code']],
+        'Code': signals['code'],
+        'Crossover': np.select([signals['crossover'] == 1, signals['crossover'] == -1],
+                               ['Golden Cross', 'Death Cross'], default=''),
+        'Price': signals['price'],
+        f'SMA_{SHORT_WINDOW}': signals['sma_short'],
+        f'SMA_{LONG_WINDOW}': signals['sma_long'],
+        'SMA_Trend_Pct': trend * 100,
+        'Price_vs_SMA_Pct': price_vs_long * 100,
+        'Bars': bar_counts,
+    })
+    # Tickers without enough history to apply the rules are dropped (and reported as failures)
+    for ticker in results.loc[~signals['valid'], 'Ticker']:
+        failed.setdefault(ticker, f"fewer than {LONG_WINDOW} bars of history")
+    results = results[signals['valid']]
+    results = results.sort_values(['Code', 'SMA_Trend_Pct'], ascending=[False, False], kind='stable')
+    results.insert(0, 'Rank', np.arange(1, len(results) + 1))
+    return results.reset_index(drop=True), failed
+
+
+def write_results(results, output_path):
+    """
+    Streams results to Parquet (.parquet, requires pyarrow), Excel (.xlsx, requires xlsxwriter)
+    or CSV (anything else).
+    """
+    export_frame(results, output_path, table_name='Screen', float_format='%.4f')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank a universe of tickers by the SMA buy/sell rules.")
+    parser.add_argument('universe', help="Text file with one ticker per line, or a CSV with a Symbol/Ticker column")
+    parser.add_argument('-o', '--output', default='screen_results.csv', help="Output .csv, .xlsx or .parquet file")
+    parser.add_argument('--period', default=DEFAULT_PERIOD, help="History period to load (default: 1y)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Download threads per bulk request")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Symbols per bulk download request")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="History cache directory")
+    args = parser.parse_args(argv)
+
+    ticker_symbols = read_universe(args.universe)
+    if not ticker_symbols:
+        print(f"No ticker symbols found in '{args.universe}'.", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    results, failed = screen(ticker_symbols, period=args.period, workers=args.workers,
+                             cache=HistoryCache(args.cache_dir), progress=_print_progress("Downloading histories"),
+                             batch_size=args.batch_size)
+    write_results(results, args.output)
+
+    print(f"Screened {len(results)} of {len(ticker_symbols)} tickers in {time.perf_counter() - start:.1f}s; "
+          f"results written to '{args.output}'.", file=sys.stderr)
+    if failed:
+        print(f"{len(failed)} ticker(s) had no usable data: {', '.join(sorted(failed)[:20])}"
+              f"{' ...' if len(failed) > 20 else ''}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Buy/sell signal rules shared by the interactive recommendation and the batch screener.
+
+The rules are the ones `provide_buy_sell_recommendation` applies to one ticker:
+a 20/50-day SMA Golden/Death Cross on the latest bar is a strong signal; otherwise a
+price above (below) both SMAs is a BUY (SELL), and anything in between is HOLD.
+
+Everything here is pure: no printing, plotting or network access. `evaluate_signal`
+handles one ticker cheaply enough to call in a hot loop (backtests, screens);
+`evaluate_signals` handles a whole close matrix at once. The CLI renders the results.
+"""
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from indicators import sma
+
+# Recommendation codes (ordered, so they can be ranked numerically)
+STRONG_SELL = -2
+SELL = -1
+HOLD = 0
+BUY = 1
+STRONG_BUY = 2
+
+RECOMMENDATION_LABELS = {
+    STRONG_BUY: "BUY (Strong Signal)",
+    BUY: "BUY",
+    HOLD: "HOLD / NEUTRAL",
+    SELL: "SELL",
+    STRONG_SELL: "SELL (Strong Signal)",
+}
+
+
+@dataclass(slots=True, frozen=True)
+class Signal:
+    """
+    Result of the recommendation rules for one ticker.
+
+    code:         STRONG_SELL..STRONG_BUY (HOLD when `valid` is False)
+    valid:        enough history for both SMAs on the latest bar
+    has_previous: the SMAs are also available for the previous bar (crossovers can be checked)
+    crossover:    +1 Golden Cross, -1 Death Cross, 0 none
+    trend:        sign of (short SMA - long SMA)
+    position:     +1 price above both SMAs, -1 below both, 0 in between, None without a price
+    """
+    code: int
+    valid: bool
+    has_previous: bool
+    crossover: int
+    trend: int
+    position: int | None
+    price: float | None
+    sma_short: float
+    sma_long: float
+
+    @property
+    def label(self):
+        return RECOMMENDATION_LABELS[self.code]
+
+
+def _from_end(values, back):
+    """values[-back] as a float, or NaN if there are fewer than `back` values."""
+    return float(values[-back]) if len(values) >= back else math.nan
+
+
+def evaluate_signal(close, current_price=None, short_window=20, long_window=50):
+    """
+    Applies the recommendation rules to one ticker's closes (oldest first; any 1-D sequence)
+    and the current price (None to judge on the SMAs alone). Only the last long_window + 1
+    closes are read, so the cost does not grow with the length of the history.
+    """
+    values = np.asarray(close[-(long_window + 1):], dtype=np.float64)
+    # The same indicator code as the matrix paths, on at most long_window + 1 values
+    short_sma = sma(values, short_window)
+    long_sma = sma(values, long_window)
+    sma_short, sma_long = _from_end(short_sma, 1), _from_end(long_sma, 1)
+    if math.isnan(sma_short) or math.isnan(sma_long):
+        return Signal(HOLD, False, False, 0, 0, None, current_price, sma_short, sma_long)
+
+    prev_short, prev_long = _from_end(short_sma, 2), _from_end(long_sma, 2)
+    has_previous = not (math.isnan(prev_short) or math.isnan(prev_long))
+
+    crossover = 0
+    if has_previous:
+        if sma_short > sma_long and prev_short <= prev_long:
+            crossover = 1
+        elif sma_short < sma_long and prev_short >= prev_long:
+            crossover = -1
+    trend = (sma_short > sma_long) - (sma_short < sma_long)
+
+    position = None
+    if current_price is not None:
+        if current_price > sma_short and current_price > sma_long:
+            position = 1
+        elif current_price < sma_short and current_price < sma_long:
+            position = -1
+        else:
+            position = 0
+
+    if crossover:
+        code = STRONG_BUY if crossover > 0 else STRONG_SELL
+    elif position:
+        code = BUY if position > 0 else SELL
+    else:
+        code = HOLD
+    return Signal(code, True, has_previous, crossover, trend, position, current_price, sma_short, sma_long)
+
+
+def _apply_rules(last_short, last_long, prev_short, prev_long, price):
+    """
+    Element-wise recommendation rules on arrays of any (matching) shape.
+    Returns (code, valid, crossover) arrays.
+    """
+    valid = ~np.isnan(last_short) & ~np.isnan(last_long) & ~np.isnan(price)
+    has_prev = ~np.isnan(prev_short) & ~np.isnan(prev_long)
+    with np.errstate(invalid='ignore'):
+        golden = has_prev & (last_short > last_long) & (prev_short <= prev_long)
+        death = has_prev & (last_short < last_long) & (prev_short >= prev_long)
+        above = (price > last_short) & (price > last_long)
+        below = (price < last_short) & (price < last_long)
+
+    code = np.select(
+        [golden, death, above, below],
+        [STRONG_BUY, STRONG_SELL, BUY, SELL],
+        default=HOLD,
+    ).astype(np.int8)
+    code[~valid] = HOLD
+    crossover = np.where(golden, 1, np.where(death, -1, 0)).astype(np.int8)
+    crossover[~valid] = 0
+    return code, valid, crossover
+
+
+def signal_code_matrix(close_matrix, short_window=20, long_window=50):
+    """
+    Recommendation code for every bar of every ticker, as if the rules had been run at each
+    close with that close as the current price. Returns (codes, valid), both shaped like the input.
+    """
+    close_matrix = np.asarray(close_matrix, dtype=np.float64)
+    short_sma = sma(close_matrix, short_window)
+    long_sma = sma(close_matrix, long_window)
+    prev_short = np.full_like(short_sma, np.nan)
+    prev_long = np.full_like(long_sma, np.nan)
+    prev_short[1:] = short_sma[:-1]
+    prev_long[1:] = long_sma[:-1]
+    code, valid, _ = _apply_rules(short_sma, long_sma, prev_short, prev_long, close_matrix)
+    return code, valid
+
+
+def evaluate_signals(close_matrix, current_prices=None, short_window=20, long_window=50):
+    """
+    Applies the recommendation rules to every column of a (bars x tickers) close matrix at once.
+    Each column holds one ticker's most recent closes, oldest first, NaN-padded at the top
+    for tickers with shorter histories. `current_prices` (one per column) defaults to the last close.
+
+    Returns a dict of 1-D arrays: 'code' (recommendation code), 'valid' (enough data for the
+    rules), 'crossover' (+1 Golden Cross, -1 Death Cross, 0 none), 'price', 'sma_short', 'sma_long'.
+    """
+    close_matrix = np.asarray(close_matrix, dtype=np.float64)
+    if close_matrix.ndim == 1:
+        close_matrix = close_matrix.reshape(-1, 1)
+    # Only the last long_window + 1 bars matter: the latest SMAs and the ones before them
+    tail = close_matrix[-(long_window + 1):]
+    short_sma = sma(tail, short_window)
+    long_sma = sma(tail, long_window)
+
+    last_short, last_long = short_sma[-1], long_sma[-1]
+    if len(tail) > 1:
+        prev_short, prev_long = short_sma[-2], long_sma[-2]
+    else:
+        prev_short = prev_long = np.full(tail.shape[1], np.nan)
+
+    if current_prices is None:
+        price = tail[-1].copy()
+    else:
+        price = np.asarray(current_prices, dtype=np.float64).reshape(-1)
+
+    code, valid, crossover = _apply_rules(last_short, last_long, prev_short, prev_long, price)
+    return {
+        'code': code,
+        'valid': valid,
+        'crossover': crossover,
+        'price': price,
+        'sma_short': last_short,
+        'sma_long': last_long,
+    }
@@ -1,25 +1,114 @@
-import yfinance as yf
 import pandas as pd
+import numpy as np
 import datetime
-import requests
 import os
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-
-# For PDF generation
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
+import collections
+import threading
+import time
+import io
+import contextlib
+import json
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# yfinance, requests, Plotly and ReportLab are imported inside the functions that use them, so a run
+# only pays for loading the features it touches (see benchmarks/startup_time.py).
+
+from history_cache import HistoryCache, DEFAULT_CACHE_DIR, is_market_open, market_hours_for
+import bulk_history
+import screener
+from fetch_engine import run_concurrently, errors_by_key
+from indicators import sma
+from signals import evaluate_signal
+from streaming import CrossoverMonitor
+from chart_images import ChartCache, DEFAULT_CHART_DIR
+from downsampling import downsample_frame, downsample_series
+from symbol_index import SymbolIndex, DEFAULT_INDEX_PATH, RELEVANT_TYPES
+from fundamentals_store import (FundamentalsStore, DEFAULT_STORE_PATH, fetch_income_statement, extract_sales,
+                                metric_table)
+from exporters import open_export, export_frame
 
 # --- Configuration ---
 # IMPORTANT: Replace 'YOUR_FINNHUB_API_KEY_HERE' with your actual Finnhub API key.
 FINNHUB_API_KEY = ''
 
+# Daily price history is kept on disk and only the missing bars are downloaded on later runs.
+# Set USE_HISTORY_CACHE to False to always download the full period from yfinance.
+USE_HISTORY_CACHE = True
+HISTORY_CACHE_DIR = DEFAULT_CACHE_DIR
+# Only real downloads count towards the debug counter; cache hits make no upstream call
+history_cache = HistoryCache(HISTORY_CACHE_DIR,
+                             on_download=lambda ticker_symbol: UPSTREAM_CALL_COUNTS.update(['yfinance_history']))
+
+# Income statements (annual and quarterly) are kept in a local store and only downloaded again once a
+# company's next report is due, so repeated exports and reports make no network calls in between.
+USE_FUNDAMENTALS_STORE = True
+FUNDAMENTALS_STORE_PATH = DEFAULT_STORE_PATH
+fundamentals_store = FundamentalsStore(FUNDAMENTALS_STORE_PATH)
+
+# Finnhub quota shared by every Finnhub call in this process (free tier: 60 calls/minute).
+# Calls beyond the quota wait for their turn instead of failing over to the slower yfinance path.
+FINNHUB_CALLS_PER_MINUTE = 60
+FINNHUB_BURST = 10
+
+# Maximum number of upstream calls run at the same time when fetching data for several tickers.
+FETCH_CONCURRENCY = 8
+
+# Batched quotes: symbols per yf.download call, and how long a fetched price is reused.
+QUOTE_BATCH_SIZE = 200
+QUOTE_CACHE_TTL_SECONDS = 15
+
+# Bulk history downloads (comparisons, watchlist reports): symbols per yf.download call and
+# the download threads yfinance uses inside each call.
+HISTORY_BATCH_SIZE = 100
+HISTORY_DOWNLOAD_THREADS = 8
+
+# Local symbol index: known tickers and company names resolve without a network call, and names that
+# had to be searched online are remembered. Finnhub exchange lists (e.g. 'US', 'L', 'NS') are reloaded
+# when older than SYMBOL_LIST_MAX_AGE_DAYS; SYMBOL_LIST_CSV can point at a local CSV with
+# symbol,description[,type,exchange] columns instead of (or as well as) them.
+SYMBOL_INDEX_PATH = DEFAULT_INDEX_PATH
+SYMBOL_LIST_EXCHANGES = ('US',)
+SYMBOL_LIST_CSV = None
+SYMBOL_LIST_MAX_AGE_DAYS = 7
+
+# Interactive chart output: 'browser' opens each chart (fig.show()), 'file' writes one small HTML file per
+# chart into CHART_OUTPUT_DIR (plotly.js is shared from one local file), 'none' skips charts entirely.
+# The STOCK_ANALYSER_CHARTS environment variable overrides it, e.g. for servers and batch runs.
+CHART_OUTPUT_MODE = os.environ.get('STOCK_ANALYSER_CHARTS', 'browser')
+CHART_OUTPUT_DIR = 'charts'
+# Long series are reduced to about this many points per trace before charting ('lttb' keeps the line's
+# shape, 'minmax' keeps every bucket's high and low). None sends every point.
+CHART_MAX_POINTS = 2000
+CHART_DOWNSAMPLING = 'lttb'
+
+# How compare_stocks aligns tickers' dates: 'inner' keeps only dates every ticker traded on,
+# 'outer' keeps all dates and forward-fills gaps (e.g. holidays on other exchanges).
+COMPARE_JOIN = 'inner'
+
+# Price charts embedded in PDF reports are rendered with matplotlib and cached here by a hash of the data.
+INCLUDE_CHARTS_IN_REPORTS = True
+CHART_CACHE_DIR = DEFAULT_CHART_DIR
+chart_cache = ChartCache(CHART_CACHE_DIR)
+
+# Worker processes used to lay out PDFs when generating reports for a watchlist (None = all CPU cores).
+REPORT_WORKERS = None
+
+# Set to True to print how many upstream data requests each report made.
+DEBUG_FETCH_COUNTS = False
+# Debug counter of upstream data requests, keyed by endpoint (e.g. 'finnhub_quote').
+UPSTREAM_CALL_COUNTS = collections.Counter()
+
 # --- Data Fetching Functions ---
 
+def get_shared_finnhub_client(api_key):
+    """
+    Returns the pooled, rate-limited Finnhub client shared by all Finnhub calls for `api_key`.
+    """
+    from finnhub_client import get_finnhub_client # Loads requests on the first Finnhub call only
+    return get_finnhub_client(api_key, calls_per_minute=FINNHUB_CALLS_PER_MINUTE, burst=FINNHUB_BURST)
+
 def get_current_price_realtime_api(ticker_symbol, api_key):
     """
     Fetches the real-time (or near real-time) price using Finnhub API.
@@ -27,11 +116,11 @@ def get_current_price_realtime_api(ticker_symbol, api_key):
     if not api_key:
         return None
 
-    url = f"https://finnhub.io/api/v1/quote?symbol={ticker_symbol}&token={api_key}"
+    import requests # Already loaded by the Finnhub client; needed for the exception types below
+    UPSTREAM_CALL_COUNTS['finnhub_quote'] += 1
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        # Pooled keep-alive session with timeouts, rate limiting and retries on 429/5xx
+        data = get_shared_finnhub_client(api_key).quote(ticker_symbol)
 
         if data and 'c' in data and data['c'] != 0:
             price = float(data['c'])
@@ -60,11 +149,10 @@ def get_company_profile_finnhub(ticker_symbol, api_key):
     if not api_key:
         return None
 
-    url = f"https://finnhub.io/api/v1/stock/profile2?symbol={ticker_symbol}&token={api_key}"
+    import requests
+    UPSTREAM_CALL_COUNTS['finnhub_profile'] += 1
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        data = get_shared_finnhub_client(api_key).company_profile(ticker_symbol)
 
         if data and data != {}:
             return data
@@ -94,11 +182,10 @@ def search_symbol_finnhub(query, api_key):
         print("Finnhub API key is not set. Cannot perform symbol search.")
         return []
 
-    url = f"https://finnhub.io/api/v1/search?q={query}&token={api_key}"
+    import requests
+    UPSTREAM_CALL_COUNTS['finnhub_search'] += 1
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        data = get_shared_finnhub_client(api_key).search(query)
         if data and 'result' in data and data['result']:
             return data['result']
         else:
@@ -117,31 +204,57 @@ def search_symbol_finnhub(query, api_key):
         # print(f"An unexpected error occurred during symbol search: {e}")
         return []
 
+def get_exchange_symbols_finnhub(exchange, api_key):
+    """
+    Fetches every symbol listed on an exchange (e.g. 'US') from Finnhub, for the local symbol index.
+    """
+    if not api_key:
+        return []
+
+    UPSTREAM_CALL_COUNTS['finnhub_symbols'] += 1
+    try:
+        data = get_shared_finnhub_client(api_key).stock_symbols(exchange)
+        return data if isinstance(data, list) else []
+    except Exception as e:
+        # print(f"Error fetching the symbol list for {exchange}: {e}")
+        return []
+
 def get_current_price_yfinance(ticker_symbol):
     """
     Fetches the current market price using yfinance (near real-time).
     """
     try:
+        import yfinance as yf
+        UPSTREAM_CALL_COUNTS['yfinance_info'] += 1
         stock = yf.Ticker(ticker_symbol)
-        info = stock.info
-        price = info.get('currentPrice') or \
-                info.get('regularMarketPrice') or \
-                info.get('ask')
-
-        if price:
-            return price
-        else:
-            # print(f"No current price found in yfinance info for {ticker_symbol}.")
-            return None
+        return get_price_from_yfinance_info(stock.info)
     except Exception as e:
         # print(f"Error fetching current price from yfinance for {ticker_symbol}: {e}")
         return None
 
+def get_price_from_yfinance_info(info):
+    """
+    Extracts the current market price from a yfinance info dict.
+    """
+    if not info:
+        return None
+    price = info.get('currentPrice') or \
+            info.get('regularMarketPrice') or \
+            info.get('ask')
+
+    if price:
+        return price
+    else:
+        # print("No current price found in yfinance info.")
+        return None
+
 def get_yfinance_info(ticker_symbol):
     """
     Fetches comprehensive stock information using yfinance's info attribute.
     """
     try:
+        import yfinance as yf
+        UPSTREAM_CALL_COUNTS['yfinance_info'] += 1
         stock = yf.Ticker(ticker_symbol)
         info = stock.info
         if not info:
@@ -152,11 +265,19 @@ def get_yfinance_info(ticker_symbol):
         # print(f"Error fetching yfinance info for {ticker_symbol}: {e}")
         return None
 
-def get_historical_data_yfinance(ticker_symbol, period="1y"):
+def get_historical_data_yfinance(ticker_symbol, period="1y", use_cache=None):
     """
     Fetches historical stock data for a given ticker symbol using yfinance.
+    Served from the on-disk history cache when enabled, which only downloads bars
+    newer than the last cached date.
     """
+    if use_cache is None:
+        use_cache = USE_HISTORY_CACHE
     try:
+        if use_cache:
+            return history_cache.get(ticker_symbol, period=period)
+        import yfinance as yf
+        UPSTREAM_CALL_COUNTS['yfinance_history'] += 1
         stock = yf.Ticker(ticker_symbol)
         hist_data = stock.history(period=period)
         if hist_data.empty:
@@ -167,14 +288,28 @@ def get_historical_data_yfinance(ticker_symbol, period="1y"):
         # print(f"Error fetching historical data for {ticker_symbol} with yfinance: {e}")
         return None
 
+def get_financial_statements_yfinance(ticker_symbol, frequency='annual', use_store=None):
+    """
+    Fetches the annual or quarterly income statement using yfinance. Served from the local
+    fundamentals store when enabled, which only downloads it again once a new report is due.
+    Errors propagate to the caller.
+    """
+    if use_store is None:
+        use_store = USE_FUNDAMENTALS_STORE
+    if not use_store:
+        UPSTREAM_CALL_COUNTS['yfinance_financials'] += 1
+        return fetch_income_statement(ticker_symbol, frequency)
+    if fundamentals_store.needs_refresh(ticker_symbol, frequency):
+        UPSTREAM_CALL_COUNTS['yfinance_financials'] += 1
+    return fundamentals_store.get(ticker_symbol, frequency)
+
 def get_annual_financials_yfinance(ticker_symbol):
     """
     Fetches annual financial statements (Income Statement) using yfinance.
     """
     try:
-        stock = yf.Ticker(ticker_symbol)
-        financials = stock.financials # This typically fetches annual data
-        if financials.empty:
+        financials = get_financial_statements_yfinance(ticker_symbol, 'annual')
+        if financials is None or financials.empty:
             print(f"No annual financial data found for {ticker_symbol}.")
             return None
         return financials
@@ -183,20 +318,672 @@ def get_annual_financials_yfinance(ticker_symbol):
         print("This might occur if the ticker is invalid or data is not available.")
         return None
 
+def load_financial_statements(ticker_symbols, frequency='annual'):
+    """
+    Income statements for many tickers: stored ones are read locally, the rest are fetched concurrently.
+    Returns ({ticker: DataFrame or None} in input order, {ticker: exception} for failed fetches).
+    """
+    if USE_FUNDAMENTALS_STORE:
+        UPSTREAM_CALL_COUNTS['yfinance_financials'] += len(fundamentals_store.due(ticker_symbols, frequency))
+        return fundamentals_store.get_many(ticker_symbols, frequency, max_concurrency=FETCH_CONCURRENCY)
+    ticker_symbols = list(dict.fromkeys(t.strip().upper() for t in ticker_symbols if t.strip()))
+    UPSTREAM_CALL_COUNTS['yfinance_financials'] += len(ticker_symbols)
+    results = run_concurrently(
+        [(ticker, lambda ticker=ticker: fetch_income_statement(ticker, frequency)) for ticker in ticker_symbols],
+        max_concurrency=FETCH_CONCURRENCY)
+    return ({result.key: result.value if result.ok else None for result in results},
+            {result.key: result.error for result in results if not result.ok})
+
+# --- Batched Quotes ---
+
+_quote_cache = {} # ticker -> (price, time.monotonic() when fetched)
+_quote_cache_lock = threading.Lock()
+
+def _download_last_prices(ticker_symbols):
+    """
+    Returns {ticker: last traded price} for the tickers yf.download could price, in chunks of QUOTE_BATCH_SIZE.
+    """
+    import yfinance as yf
+    prices = {}
+    for start in range(0, len(ticker_symbols), QUOTE_BATCH_SIZE):
+        chunk = ticker_symbols[start:start + QUOTE_BATCH_SIZE]
+        try:
+            UPSTREAM_CALL_COUNTS['yfinance_download'] += 1
+            data = yf.download(chunk, period="5d", interval="1d", group_by='column',
+                               auto_adjust=True, threads=True, progress=False)
+            if data is None or data.empty:
+                continue
+            close = data['Close']
+            if isinstance(close, pd.Series): # Older yfinance returns flat columns for one ticker
+                close = close.to_frame(chunk[0])
+            last_close = close.ffill().iloc[-1]
+            for ticker in chunk:
+                price = last_close.get(ticker)
+                if price is not None and not pd.isna(price) and price != 0:
+                    prices[ticker] = float(price)
+        except Exception as e:
+            # print(f"Error downloading batch quotes: {e}")
+            continue
+    return prices
+
+def get_current_prices(ticker_symbols, api_key=None, max_concurrency=None):
+    """
+    Fetches current prices for many tickers in one pass: a bulk yf.download for all of them,
+    then concurrent Finnhub /quote calls for any the bulk download could not price.
+    Prices are reused for QUOTE_CACHE_TTL_SECONDS. Returns {ticker: price or None} in input order.
+    """
+    if api_key is None:
+        api_key = FINNHUB_API_KEY
+    if max_concurrency is None:
+        max_concurrency = FETCH_CONCURRENCY
+
+    prices = {}
+    missing = []
+    now = time.monotonic()
+    with _quote_cache_lock:
+        for ticker in dict.fromkeys(ticker_symbols): # De-duplicate, keep order
+            cached = _quote_cache.get(ticker)
+            if cached and now - cached[1] <= QUOTE_CACHE_TTL_SECONDS:
+                prices[ticker] = cached[0]
+            else:
+                missing.append(ticker)
+
+    if missing:
+        fetched = _download_last_prices(missing)
+        gaps = [ticker for ticker in missing if ticker not in fetched]
+        if gaps and api_key:
+            results = run_concurrently(
+                [(ticker, lambda ticker=ticker: get_current_price_realtime_api(ticker, api_key)) for ticker in gaps],
+                max_concurrency=max_concurrency,
+            )
+            for result in results:
+                if result.ok and result.value is not None:
+                    fetched[result.key] = result.value
+
+        fetched_at = time.monotonic()
+        with _quote_cache_lock:
+            for ticker, price in fetched.items():
+                _quote_cache[ticker] = (price, fetched_at)
+        prices.update(fetched)
+
+    return {ticker: prices.get(ticker) for ticker in ticker_symbols}
+
+# --- Bulk History Loading ---
+
+def load_history_frames(ticker_symbols, period="1y", interval="1d"):
+    """
+    Downloads OHLCV history for many tickers with one yf.download call per HISTORY_BATCH_SIZE
+    symbols (daily bars come from the history cache when it is fresh and enabled).
+    Returns ({ticker: DataFrame}, {ticker: reason} for symbols without data).
+    """
+    frames, failed, downloads = bulk_history.load_history_frames(
+        ticker_symbols, period, interval, chunk_size=HISTORY_BATCH_SIZE, threads=HISTORY_DOWNLOAD_THREADS,
+        cache=history_cache if USE_HISTORY_CACHE else None,
+    )
+    UPSTREAM_CALL_COUNTS['yfinance_download'] += downloads
+    return frames, failed
+
+def load_histories(ticker_symbols, period="1y", interval="1d", column='Close', dtype=np.float64):
+    """
+    Loads `column` for many tickers in bulk and returns a HistoryMatrix: a compact (dates x tickers)
+    array (`values`, float64 or float32), its `tickers` / `ticker_index`, and the `failed` symbols.
+    """
+    frames, failed = load_history_frames(ticker_symbols, period, interval)
+    dates, tickers, values = bulk_history.frames_to_matrix(frames, column, dtype)
+    return bulk_history.HistoryMatrix(dates, tickers, values, failed)
+
+
+# --- Symbol Index ---
+
+_symbol_index = None
+_symbol_index_lock = threading.Lock()
+
+def _refresh_symbol_lists(index):
+    """
+    Loads the configured symbol CSV and Finnhub exchange lists that are missing or out of date.
+    """
+    if SYMBOL_LIST_CSV:
+        source = f"csv:{os.path.abspath(SYMBOL_LIST_CSV)}"
+        try:
+            loaded_at = index.source_loaded_at(source)
+            if loaded_at is None or os.path.getmtime(SYMBOL_LIST_CSV) > loaded_at:
+                index.load_csv(SYMBOL_LIST_CSV, source)
+        except Exception as e:
+            # print(f"Error loading the symbol list {SYMBOL_LIST_CSV}: {e}")
+            pass
+    if FINNHUB_API_KEY:
+        for exchange in SYMBOL_LIST_EXCHANGES:
+            source = f"finnhub:{exchange}"
+            loaded_at = index.source_loaded_at(source)
+            if loaded_at is None or time.time() - loaded_at > SYMBOL_LIST_MAX_AGE_DAYS * 86400:
+                rows = get_exchange_symbols_finnhub(exchange, FINNHUB_API_KEY)
+                if rows: # A failed download keeps the previous list
+                    index.add_symbols(rows, source)
+
+def get_symbol_index():
+    """
+    Returns the process-wide local symbol index, opening (and if needed refreshing) it on first use.
+    """
+    global _symbol_index
+    with _symbol_index_lock:
+        if _symbol_index is None:
+            try:
+                _symbol_index = SymbolIndex(SYMBOL_INDEX_PATH)
+            except Exception as e:
+                # print(f"Error opening the symbol index: {e}")
+                _symbol_index = SymbolIndex(':memory:') # e.g. read-only home folder: remember for this run only
+            _refresh_symbol_lists(_symbol_index)
+        return _symbol_index
+
+def _relevant_search_results(search_results):
+    """
+    Keeps the Finnhub search results that are stock-like listings with a symbol.
+    """
+    return [r for r in search_results if r.get('type') in RELEVANT_TYPES and r.get('symbol')]
+
+def _resolve_locally(index, query):
+    """
+    Local symbol index hit for a query. Ticker-shaped input (no spaces) only takes an exact symbol or a
+    remembered query: name prefix and fuzzy matching would silently turn 'ABC' into 'ABCL'.
+    """
+    return index.resolve(query, exact_only=' ' not in query.strip())
+
+def resolve_symbol(query, allow_search=True):
+    """
+    Resolves a ticker or company name to a ticker symbol without prompting. The local symbol index
+    is tried first; on a miss (if allowed) a Finnhub quote check and symbol search, whose best
+    result (or the lack of one) is remembered in the index. A single word that neither the quote
+    check nor the search could resolve is finally matched as a (misspelled) company name.
+    Returns the symbol or None.
+    """
+    index = get_symbol_index()
+    symbol = _resolve_locally(index, query)
+    if symbol or not allow_search or not FINNHUB_API_KEY:
+        return symbol
+    single_word = ' ' not in query.strip()
+    if index.is_known_miss(query):
+        return index.resolve(query) if single_word else None
+
+    ticker = query.strip().upper()
+    if single_word and get_current_price_realtime_api(ticker, FINNHUB_API_KEY) is not None:
+        index.remember(query, ticker)
+        return ticker
+
+    UPSTREAM_CALL_COUNTS['finnhub_search'] += 1
+    try:
+        data = get_shared_finnhub_client(FINNHUB_API_KEY).search(query)
+    except Exception as e:
+        # print(f"Error searching for '{query}': {e}")
+        return None # Not remembered, so a failed request is retried next time
+    results = _relevant_search_results((data or {}).get('result') or [])
+    best = results[0] if results else {}
+    index.remember(query, best.get('symbol'), best.get('description'), best.get('type'))
+    if best.get('symbol') is None and single_word:
+        return index.resolve(query)
+    return best.get('symbol')
+
+def resolve_symbols(queries, allow_search=True, max_concurrency=None):
+    """
+    Batch form of `resolve_symbol`: local matches first, then the misses concurrently over the network.
+    Returns {query: symbol or None} for the de-duplicated, stripped queries in input order.
+    """
+    queries = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+    index = get_symbol_index()
+    resolved = {query: _resolve_locally(index, query) for query in queries}
+    misses = [query for query, symbol in resolved.items() if symbol is None]
+    if misses and allow_search:
+        results = run_concurrently([(query, lambda query=query: resolve_symbol(query)) for query in misses],
+                                   max_concurrency=max_concurrency or FETCH_CONCURRENCY)
+        for result in results:
+            if result.ok:
+                resolved[result.key] = result.value
+    return resolved
+
+def _resolve_ticker_list(entries, allow_search=True):
+    """
+    Turns user-entered tickers or company names into ticker symbols for batch commands. Entries that
+    cannot be resolved but look like a ticker are kept as typed; the rest are reported and dropped.
+    """
+    resolved = resolve_symbols(entries, allow_search=allow_search)
+    ticker_symbols = []
+    for query, symbol in resolved.items():
+        if symbol is None and ' ' not in query:
+            symbol = query.upper()
+        if symbol is None:
+            print(f"Could not resolve '{query}' to a ticker symbol; skipping it.")
+        elif symbol not in ticker_symbols:
+            if symbol != query.upper():
+                print(f"Resolved '{query}' to {symbol}.")
+            ticker_symbols.append(symbol)
+    return ticker_symbols
+
+
+# --- Request-Scoped Data Context ---
+
+_NOT_LOADED = object()
+
+class MissingData(LookupError):
+    """
+    Recorded in TickerSnapshot.errors when a source returned no data. The data getters catch their
+    own exceptions and return None, so this is how a failed quote, profile or history is reported.
+    """
+
+class TickerSnapshot:
+    """
+    Holds every dataset for one ticker (quote, profile, info, history, financials) and
+    loads each of them at most once, on first use. Analysis and report functions take a
+    snapshot instead of calling the network themselves, so a report for N tickers makes
+    N sets of upstream calls rather than two or three times that.
+    """
+
+    def __init__(self, ticker_symbol, api_key=None, period="1y"):
+        self.ticker_symbol = ticker_symbol
+        self.api_key = FINNHUB_API_KEY if api_key is None else api_key
+        self.period = period
+        self._values = {}
+        self.errors = {}  # field name -> exception raised while loading it, or MissingData
+        self._locks = collections.defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+
+    def _load(self, name, loader, required=True):
+        """
+        Loads and memoizes one field. A None result from a `required` loader is recorded as MissingData.
+        """
+        value = self._values.get(name, _NOT_LOADED)
+        if value is not _NOT_LOADED:
+            return value
+        with self._locks_guard:
+            lock = self._locks[name]
+        with lock:
+            # Another thread may have loaded it while we waited
+            value = self._values.get(name, _NOT_LOADED)
+            if value is _NOT_LOADED:
+                try:
+                    value = loader()
+                except Exception as e:
+                    # A failed load is remembered as missing data rather than retried on every access
+                    self.errors[name] = e
+                    value = None
+                else:
+                    if value is None and required:
+                        self.errors[name] = MissingData(f"{name}: no data returned for {self.ticker_symbol}")
+                self._values[name] = value
+        return value
+
+    @property
+    def realtime_price(self):
+        """Finnhub real-time price, or None if unavailable (or no API key)."""
+        return self._load('realtime_price', lambda: get_current_price_realtime_api(self.ticker_symbol, self.api_key),
+                          required=bool(self.api_key))
+
+    @property
+    def info(self):
+        """yfinance info dict, or None."""
+        return self._load('info', lambda: get_yfinance_info(self.ticker_symbol))
+
+    @property
+    def yfinance_price(self):
+        """Near real-time price read from the (shared) yfinance info dict."""
+        return get_price_from_yfinance_info(self.info)
+
+    def __getstate__(self):
+        # Locks cannot be pickled; loaded data travels to worker processes without them
+        state = self.__dict__.copy()
+        del state['_locks'], state['_locks_guard']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._locks = collections.defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+
+    def forget_missing(self):
+        """
+        Drops fields that failed or came back empty (and their errors), so the next access loads them
+        again. Long-lived holders of a snapshot call it before reusing one.
+        """
+        with self._locks_guard:
+            for name, value in list(self._values.items()):
+                if value is None:
+                    del self._values[name]
+                    self.errors.pop(name, None)
+
+    def seed(self, **fields):
+        """
+        Pre-populates fields that were fetched elsewhere (e.g. current_price from get_current_prices).
+        """
+        self._values.update(fields)
+
+    @property
+    def current_price(self):
+        """Finnhub price with a yfinance fallback, as used throughout the analyser."""
+        seeded = self._values.get('current_price')
+        if seeded is not None:
+            return seeded
+        price = self.realtime_price
+        if price is None:
+            price = self.yfinance_price
+        return price
+
+    @property
+    def profile(self):
+        """Finnhub company profile dict, or None."""
+        return self._load('profile', lambda: get_company_profile_finnhub(self.ticker_symbol, self.api_key),
+                          required=bool(self.api_key))
+
+    @property
+    def history(self):
+        """Daily history for `period`, or None. Shared; do not mutate."""
+        return self._load('history', lambda: get_historical_data_yfinance(self.ticker_symbol, period=self.period))
+
+    @property
+    def financials(self):
+        """Annual income statement DataFrame, or None."""
+        return self._load('financials', lambda: get_annual_financials_yfinance(self.ticker_symbol))
+
+    @property
+    def quarterly_financials(self):
+        """Quarterly income statement DataFrame, or None."""
+        return self._load('quarterly_financials',
+                          lambda: get_financial_statements_yfinance(self.ticker_symbol, 'quarterly'))
+
+    def history_with_smas(self):
+        """
+        Returns a copy of the history with SMA_20 and SMA_50 columns, computed once per snapshot.
+        """
+        def compute():
+            df = self.history
+            if df is None or df.empty:
+                return df
+            df = df.copy()
+            # Both windows from the vectorized indicator engine (cumulative-sum rolling means)
+            df['SMA_20'] = sma(df['Close'], 20)
+            df['SMA_50'] = sma(df['Close'], 50)
+            return df
+        return self._load('history_with_smas', compute, required=False)  # A missing history is already recorded
+
+    def priced(self, price):
+        """
+        A view of this snapshot whose every price is `price` (None: no price, with no fallback to the
+        memoized Finnhub or yfinance prices). All other data is shared with, and loaded through, this
+        snapshot. For long-lived snapshots whose memoized prices may be older than the caller allows.
+        """
+        return _PricedSnapshot(self, price)
+
+
+class _PricedSnapshot(TickerSnapshot):
+    """
+    TickerSnapshot.priced(): the base snapshot's data with a price of its own. Seeding current_price
+    changes this view's price only.
+    """
+
+    def __init__(self, base, price):
+        self.__dict__.update(base.__dict__)  # Shares the loaded values, errors and locks with the base
+        self._price = price
+
+    def seed(self, **fields):
+        if 'current_price' in fields:
+            self._price = fields.pop('current_price')
+        super().seed(**fields)
+
+    @property
+    def current_price(self):
+        return self._price
+
+    @property
+    def realtime_price(self):
+        return self._price
+
+    @property
+    def yfinance_price(self):
+        return self._price
+
+
+def prefetch_snapshots(snapshots, fields=('realtime_price', 'profile', 'info', 'history'), max_concurrency=None):
+    """
+    Loads the given snapshot fields for many tickers concurrently (one task per ticker and field).
+    Results stay on the snapshots, so callers read them in their own order afterwards.
+    Returns {ticker: [exception, ...]} for any loads that raised or returned no data (MissingData).
+    """
+    if max_concurrency is None:
+        max_concurrency = FETCH_CONCURRENCY
+    tasks = [
+        ((snapshot.ticker_symbol, field), lambda snapshot=snapshot, field=field: getattr(snapshot, field))
+        for snapshot in snapshots for field in fields
+    ]
+    errors = errors_by_key(run_concurrently(tasks, max_concurrency=max_concurrency))
+    for snapshot in snapshots:
+        for field in fields:
+            if field in snapshot.errors:
+                errors.setdefault(snapshot.ticker_symbol, []).append(snapshot.errors[field])
+    return errors
+
+
+def prefetch_histories(snapshots):
+    """
+    Loads the history of many snapshots with bulk downloads instead of one request per ticker.
+    Returns {ticker: reason} for tickers without data (their history is None).
+    """
+    by_period = collections.defaultdict(list)
+    for snapshot in snapshots:
+        by_period[snapshot.period].append(snapshot)
+    failures = {}
+    for period, group in by_period.items():
+        frames, failed = load_history_frames([snapshot.ticker_symbol for snapshot in group], period)
+        for snapshot in group:
+            snapshot.seed(history=frames.get(snapshot.ticker_symbol.strip().upper()))
+        failures.update(failed)
+    return failures
+
+
+def create_crossover_monitor(ticker_symbols, callback=None):
+    """
+    Returns a CrossoverMonitor with a 20/50-day tracker per ticker, seeded from (cached) daily history.
+    Feed it live prices with monitor.on_quote(ticker, price, session) and each session's official
+    close with monitor.on_bar(ticker, close, session), where `session` is the trading date
+    (a datetime.date in the exchange's timezone). The first quote of a session opens a provisional
+    bar, later quotes revise it and on_bar finalizes it; each update is O(1) per ticker.
+    """
+    monitor = CrossoverMonitor(short_window=20, long_window=50, callback=callback)
+    snapshots = [TickerSnapshot(ticker) for ticker in ticker_symbols]
+    prefetch_snapshots(snapshots, fields=('history',))
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for snapshot in snapshots:
+        if snapshot.history is not None and not snapshot.history.empty:
+            last_session = snapshot.history.index[-1].date()
+            # While the market is open, a cached bar for today is still trading: quotes keep revising it
+            today = now.astimezone(market_hours_for(snapshot.ticker_symbol)[0]).date()
+            provisional = last_session == today and is_market_open(snapshot.ticker_symbol, now)
+            monitor.seed(snapshot.ticker_symbol, snapshot.history['Close'].to_numpy(),
+                         last_session=last_session, provisional=provisional)
+    return monitor
+
+
+# --- Chart Output ---
+
+def show_figure(fig, chart_name):
+    """
+    Shows a Plotly figure according to CHART_OUTPUT_MODE. In 'file' mode the chart is written to
+    CHART_OUTPUT_DIR/<chart_name>.html and the path is returned; otherwise returns None.
+    """
+    if CHART_OUTPUT_MODE == 'none':
+        return None
+    if CHART_OUTPUT_MODE != 'file':
+        fig.show()
+        return None
+
+    import plotly
+    os.makedirs(CHART_OUTPUT_DIR, exist_ok=True)
+    # plotly.js (about 3.5 MB) is written once per version and referenced by every chart file
+    plotly_js_name = f"plotly-{plotly.__version__}.min.js"
+    plotly_js_path = os.path.join(CHART_OUTPUT_DIR, plotly_js_name)
+    if not os.path.exists(plotly_js_path):
+        _write_atomically(plotly_js_path, lambda path: _write_text_file(path, plotly.offline.get_plotlyjs()))
+
+    safe_name = "".join(c if c.isalnum() or c in '.-_' else '_' for c in chart_name)
+    html_path = os.path.join(CHART_OUTPUT_DIR, f"{safe_name}.html")
+    _write_atomically(html_path, lambda path: fig.write_html(path, include_plotlyjs=plotly_js_name, full_html=True))
+    print(f"Chart saved to '{html_path}'")
+    return html_path
+
+def _write_text_file(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
 # --- AI Assistant / Analysis Logic ---
 
+def interpret_signal(signal):
+    """
+    Renders a Signal as the conceptual market interpretation shown by analyze_stock_and_advise.
+    Returns (signal label, list of reasons).
+    """
+    label = "Potential Buy" if signal.code > 0 else "Potential Sell" if signal.code < 0 else "Neutral"
+    reason = []
+
+    if signal.trend > 0:
+        trend_text = "The 20-Day SMA is currently above the 50-Day SMA, suggesting a positive short-term trend relative to the medium-term."
+    elif signal.trend < 0:
+        trend_text = "The 20-Day SMA is currently below the 50-Day SMA, suggesting a negative short-term trend relative to the medium-term."
+    else:
+        trend_text = "The 20-Day and 50-Day SMAs are very close, indicating a period of consolidation or indecision."
+
+    if not signal.has_previous:
+        reason.append("Not enough previous SMA data to check for recent crossovers. Relying on current SMA positions.")
+        reason.append(trend_text)
+    elif signal.crossover > 0:
+        reason.append("The 20-Day Simple Moving Average (SMA) has recently crossed above the 50-Day SMA (a 'Golden Cross'). This is often considered a bullish signal, indicating potential upward momentum.")
+    elif signal.crossover < 0:
+        reason.append("The 20-Day Simple Moving Average (SMA) has recently crossed below the 50-Day SMA (a 'Death Cross'). This is often considered a bearish signal, indicating potential downward momentum.")
+    else:
+        reason.append(trend_text)
+
+    if signal.position is None:
+        reason.append("Current real-time price could not be obtained, so analysis is based purely on historical moving averages.")
+    elif signal.position > 0:
+        if signal.crossover > 0:
+            reason.append(f"Additionally, the current price (${signal.price:.2f}) is trading above both SMAs, reinforcing a bullish outlook.")
+        elif signal.crossover == 0:
+            reason.append(f"The current price (${signal.price:.2f}) is trading above both the 20-Day and 50-Day SMAs, which *conceptually* supports an upward trend.")
+    elif signal.position < 0:
+        if signal.crossover < 0:
+            reason.append(f"Additionally, the current price (${signal.price:.2f}) is trading below both SMAs, reinforcing a bearish outlook.")
+        elif signal.crossover == 0:
+            reason.append(f"The current price (${signal.price:.2f}) is trading below both the 20-Day and 50-Day SMAs, which *conceptually* supports a downward trend.")
+    else:
+        reason.append(f"The current price (${signal.price:.2f}) is hovering between the SMAs, suggesting a potentially mixed or indecisive short-term market.")
+
+    return label, reason
+
+def explain_recommendation(signal):
+    """
+    Renders a Signal as the direct recommendation shown by provide_buy_sell_recommendation.
+    Returns (recommendation label, list of reasons).
+    """
+    reason = []
+    if signal.crossover > 0:
+        reason.append("The 20-Day SMA has recently crossed ABOVE the 50-Day SMA (a 'Golden Cross'), indicating strong bullish momentum.")
+    elif signal.crossover < 0:
+        reason.append("The 20-Day SMA has recently crossed BELOW the 50-Day SMA (a 'Death Cross'), indicating strong bearish momentum.")
+
+    if signal.position is not None:
+        if signal.position > 0:
+            if signal.crossover > 0:
+                reason.append(f"Current price (${signal.price:.2f}) is significantly above both SMAs, reinforcing bullish sentiment.")
+            elif signal.crossover == 0:
+                reason.append(f"Current price (${signal.price:.2f}) is above both the 20-Day and 50-Day SMAs, suggesting an upward trend.")
+        elif signal.position < 0:
+            if signal.crossover < 0:
+                reason.append(f"Current price (${signal.price:.2f}) is significantly below both SMAs, reinforcing bearish sentiment.")
+            elif signal.crossover == 0:
+                reason.append(f"The current price (${signal.price:.2f}) is below both the 20-Day and 50-Day SMAs, which *conceptually* supports a downward trend.")
+        elif signal.crossover == 0:
+            reason.append(f"Current price (${signal.price:.2f}) is oscillating between the 20-Day and 50-Day SMAs, indicating a lack of clear direction or consolidation.")
+        else:
+            reason.append(f"Note: Current price (${signal.price:.2f}) is currently between the 20-Day and 50-Day SMAs, indicating some short-term indecision despite longer-term SMA signals.")
+
+    if not reason:
+        reason.append("Based on the provided data, the stock's movement relative to its simple moving averages is currently unclear, leading to a neutral outlook.")
+
+    return signal.label, reason
+
+def snapshot_signal(snapshot, require_price=True):
+    """
+    Evaluates the SMA rules for a snapshot without printing anything.
+    Returns (Signal, None), or (None, reason) when the price or history needed for it is missing.
+    """
+    current_price = snapshot.current_price
+    if current_price is None and require_price:
+        return None, "current price not available"
+    df = snapshot.history
+    if df is None or df.empty:
+        return None, "no price history"
+    if len(df) < 50:
+        return None, f"fewer than 50 days of price history ({len(df)})"
+    signal = evaluate_signal(df['Close'].to_numpy(), current_price)
+    if not signal.valid:
+        return None, "moving averages not available for the latest day"
+    return signal, None
+
+def get_recommendation(snapshot):
+    """
+    Returns (recommendation, reasons) for a snapshot without printing anything,
+    or (None, None) when the price or history needed for it is missing.
+    """
+    signal, _ = snapshot_signal(snapshot)
+    if signal is None:
+        return None, None
+    return explain_recommendation(signal)
+
+def _choose_symbol(results, prompt="Enter the number of the correct ticker, or '0' to try a different search/exit: "):
+    """
+    Lists symbol matches (dicts with 'symbol' and 'description') and asks which one is meant.
+    Returns the chosen match, or None if the user enters '0'.
+    """
+    for i, result in enumerate(results):
+        print(f"{i+1}. Ticker: {result.get('symbol')}, Name: {result.get('description')}")
+
+    while True:
+        try:
+            choice = input(prompt).strip()
+            if choice == '0':
+                return None
+
+            choice_idx = int(choice) - 1
+            if 0 <= choice_idx < len(results):
+                return results[choice_idx]
+            else:
+                print("Invalid number. Please try again.")
+        except ValueError:
+            print("Invalid input. Please enter a number.")
+
 def resolve_ticker_symbol(user_input_query): # Renamed parameter for clarity
     """
     Attempts to resolve a user's input (which might be a name or a ticker)
-    into a valid ticker symbol using Finnhub search.
+    into a valid ticker symbol using the local symbol index, then Finnhub search.
     """
     resolved_ticker = user_input_query.upper().strip()
+    index = get_symbol_index()
+
+    # Known tickers and previously resolved inputs are answered locally, without any network call
+    local_matches = index.lookup(user_input_query)
+    if local_matches and local_matches[0].match in ('symbol', 'cached'):
+        print(f"'{local_matches[0].symbol}' found in the local symbol index.")
+        return local_matches[0].symbol
+    if local_matches:
+        print("\n--- Possible Ticker Symbols Found (local symbol index) ---")
+        chosen = _choose_symbol([{'symbol': m.symbol, 'description': m.description} for m in local_matches],
+                                "Enter the number of the correct ticker, or '0' to search online instead: ")
+        if chosen:
+            index.remember(user_input_query, chosen['symbol'])
+            return chosen['symbol']
 
     # Check if the directly entered ticker works (using Finnhub for real-time check)
     print(f"Attempting to validate '{resolved_ticker}' as a direct ticker...")
     test_price = get_current_price_realtime_api(resolved_ticker, FINNHUB_API_KEY)
     if test_price is not None:
         print(f"'{resolved_ticker}' recognized as a valid ticker with real-time data.")
+        index.remember(user_input_query, resolved_ticker)
         return resolved_ticker
     else:
         print(f"'{resolved_ticker}' does not appear to be a direct valid ticker symbol or no real-time data found for it. Attempting search...")
@@ -212,43 +999,31 @@ def resolve_ticker_symbol(user_input_query): # Renamed parameter for clarity
 
     if search_results:
         print("\n--- Possible Ticker Symbols Found ---")
-        relevant_results = [
-            r for r in search_results
-            if r.get('type') in ['Common Stock', 'ADRC', 'ETP', 'Equity'] and r.get('symbol') # Filter for common stock types and ensure symbol exists
-        ]
+        relevant_results = _relevant_search_results(search_results) # Filter for common stock types and ensure symbol exists
 
         if not relevant_results:
             print(f"No relevant stock ticker symbols found for '{user_input_query}'. Please try a different query or check the spelling.")
             return None
 
-        for i, result in enumerate(relevant_results):
-            print(f"{i+1}. Ticker: {result.get('symbol')}, Name: {result.get('description')}")
-
-        while True:
-            try:
-                choice = input("Enter the number of the correct ticker, or '0' to try a different search/exit: ").strip()
-                if choice == '0':
-                    return None
-
-                choice_idx = int(choice) - 1
-                if 0 <= choice_idx < len(relevant_results):
-                    return relevant_results[choice_idx]['symbol']
-                else:
-                    print("Invalid number. Please try again.")
-            except ValueError:
-                print("Invalid input. Please enter a number.")
+        chosen = _choose_symbol(relevant_results)
+        if chosen:
+            # Remembered, so the same input resolves locally next time
+            index.remember(user_input_query, chosen['symbol'], chosen.get('description'), chosen.get('type'))
+            return chosen['symbol']
+        return None
     else:
         print(f"No ticker symbols found for '{user_input_query}'. Please try a different query or check the spelling.")
         return None
 
 
-def display_company_details(ticker_symbol):
+def display_company_details(ticker_symbol, snapshot=None):
     """
     Fetches and displays detailed company information using Finnhub.
     """
     print(f"\n--- Company Details for: {ticker_symbol} ---")
 
-    company_profile = get_company_profile_finnhub(ticker_symbol, FINNHUB_API_KEY)
+    snapshot = snapshot or TickerSnapshot(ticker_symbol)
+    company_profile = snapshot.profile
 
     if company_profile:
         print(f"Company Name: {company_profile.get('name', 'N/A')}")
@@ -279,118 +1054,87 @@ def display_company_details(ticker_symbol):
         print("This might be due to an invalid ticker, missing API key, or data not available for this ticker.")
 
 
-def analyze_stock_and_advise(ticker_symbol):
+def plot_price_chart(ticker_symbol, df):
+    """
+    Plots the close price with its 20- and 50-day SMAs (see show_figure for where the chart goes).
+    Long histories are downsampled to CHART_MAX_POINTS; the plotted points are real closes.
+    """
+    plotted = downsample_frame(df, 'Close', CHART_MAX_POINTS, CHART_DOWNSAMPLING)
+    title = f'{ticker_symbol} Close Price with Moving Averages (1 Year)'
+    if len(plotted) < len(df):
+        title += f' ({len(plotted):,} of {len(df):,} points shown)'
+    df = plotted
+    import plotly.graph_objects as go # Imported here so runs without interactive charts never load Plotly
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(x=df.index, y=df['Close'], mode='lines', name='Close Price',
+                             line=dict(color='blue', width=2)))
+    fig.add_trace(go.Scatter(x=df.index, y=df['SMA_20'], mode='lines', name='20-Day SMA',
+                             line=dict(color='orange', width=1, dash='dot')))
+    fig.add_trace(go.Scatter(x=df.index, y=df['SMA_50'], mode='lines', name='50-Day SMA',
+                             line=dict(color='red', width=1, dash='dash')))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title='Date',
+        yaxis_title='Price (USD)',
+        hovermode="x unified", # Shows all traces at a single x-coordinate on hover
+        xaxis_rangeslider_visible=True, # Adds a range slider at the bottom
+        template="plotly_white" # A clean template
+    )
+    return show_figure(fig, f"{ticker_symbol}_price_chart")
+
+
+def analyze_stock_and_advise(ticker_symbol, snapshot=None):
     """
     Performs stock analysis: fetches current price (with API fallback),
     calculates SMAs, plots data using Plotly, and provides conceptual AI-like interpretation.
+    Pass a TickerSnapshot to reuse data that has already been fetched.
     """
     print(f"\n--- AI Stock Analysis for: {ticker_symbol} ---")
 
-    current_price = None
+    snapshot = snapshot or TickerSnapshot(ticker_symbol)
     print("Attempting to fetch real-time price...")
-    if FINNHUB_API_KEY:
-        current_price = get_current_price_realtime_api(ticker_symbol, FINNHUB_API_KEY)
+    current_price = snapshot.realtime_price
 
     if current_price is None:
         print("Finnhub real-time price not available or failed. Falling back to yfinance (may be slightly delayed)...")
-        current_price = get_current_price_yfinance(ticker_symbol)
+        current_price = snapshot.yfinance_price
 
     if current_price:
         print(f"** Current Price: ${current_price:.2f} **")
     else:
         print("Could not retrieve current price for analysis. Proceeding with historical data if available.")
 
-    df = get_historical_data_yfinance(ticker_symbol, period="1y")
+    df = snapshot.history
 
     if df is not None and not df.empty:
         print("\nLast 5 days of historical data:")
         print(df.tail())
 
         if len(df) >= 50:
-            df['SMA_20'] = df['Close'].rolling(window=20).mean()
-            df['SMA_50'] = df['Close'].rolling(window=50).mean()
+            df = snapshot.history_with_smas()
 
             print("\nLatest Moving Averages (last 5 days):")
             print(df[['Close', 'SMA_20', 'SMA_50']].tail())
 
             # --- Plotting with Plotly ---
-            print(f"\nGenerating interactive chart for {ticker_symbol}...")
-            fig = go.Figure()
-
-            fig.add_trace(go.Scatter(x=df.index, y=df['Close'], mode='lines', name='Close Price',
-                                     line=dict(color='blue', width=2)))
-            fig.add_trace(go.Scatter(x=df.index, y=df['SMA_20'], mode='lines', name='20-Day SMA',
-                                     line=dict(color='orange', width=1, dash='dot')))
-            fig.add_trace(go.Scatter(x=df.index, y=df['SMA_50'], mode='lines', name='50-Day SMA',
-                                     line=dict(color='red', width=1, dash='dash')))
-
-            fig.update_layout(
-                title=f'{ticker_symbol} Close Price with Moving Averages (1 Year)',
-                xaxis_title='Date',
-                yaxis_title='Price (USD)',
-                hovermode="x unified", # Shows all traces at a single x-coordinate on hover
-                xaxis_rangeslider_visible=True, # Adds a range slider at the bottom
-                template="plotly_white" # A clean template
-            )
-            fig.show()
+            if CHART_OUTPUT_MODE != 'none':
+                print(f"\nGenerating interactive chart for {ticker_symbol}...")
+                plot_price_chart(ticker_symbol, df)
             # --- End Plotly Plotting ---
 
 
             print("\n--- AI Assistant's Market Signal Interpretation (Conceptual) ---")
-            # The logic for AI signal interpretation remains the same.
-            # (Keeping it concise for this example to avoid huge code block repetition)
-            if len(df) > 50 and not pd.isna(df['SMA_20'].iloc[-1]) and not pd.isna(df['SMA_50'].iloc[-1]):
-                last_sma_20 = df['SMA_20'].iloc[-1]
-                last_sma_50 = df['SMA_50'].iloc[-1]
-                prev_sma_20 = df['SMA_20'].iloc[-2] if len(df) > 51 else None
-                prev_sma_50 = df['SMA_50'].iloc[-2] if len(df) > 51 else None
-
-                signal = "Neutral"
-                reason = []
-
-                if prev_sma_20 is not None and prev_sma_50 is not None and \
-                   not pd.isna(prev_sma_20) and not pd.isna(prev_sma_50):
-                    if last_sma_20 > last_sma_50 and prev_sma_20 <= prev_sma_50:
-                        signal = "Potential Buy"
-                        reason.append("The 20-Day Simple Moving Average (SMA) has recently crossed above the 50-Day SMA (a 'Golden Cross'). This is often considered a bullish signal, indicating potential upward momentum.")
-                    elif last_sma_20 < last_sma_50 and prev_sma_20 >= prev_sma_50:
-                        signal = "Potential Sell"
-                        reason.append("The 20-Day Simple Moving Average (SMA) has recently crossed below the 50-Day SMA (a 'Death Cross'). This is often considered a bearish signal, indicating potential downward momentum.")
-                    else:
-                        if last_sma_20 > last_sma_50:
-                            reason.append("The 20-Day SMA is currently above the 50-Day SMA, suggesting a positive short-term trend relative to the medium-term.")
-                        elif last_sma_20 < last_sma_50:
-                            reason.append("The 20-Day SMA is currently below the 50-Day SMA, suggesting a negative short-term trend relative to the medium-term.")
-                        else:
-                            reason.append("The 20-Day and 50-Day SMAs are very close, indicating a period of consolidation or indecision.")
-                else:
-                    reason.append("Not enough previous SMA data to check for recent crossovers. Relying on current SMA positions.")
-                    if last_sma_20 > last_sma_50:
-                        reason.append("The 20-Day SMA is currently above the 50-Day SMA, suggesting a positive short-term trend relative to the medium-term.")
-                    elif last_sma_20 < last_sma_50:
-                        reason.append("The 20-Day SMA is currently below the 50-Day SMA, suggesting a negative short-term trend relative to the medium-term.")
-                    else:
-                        reason.append("The 20-Day and 50-Day SMAs are very close, indicating a period of consolidation or indecision.")
-
-
-                if current_price:
-                    if current_price > last_sma_20 and current_price > last_sma_50:
-                        if "Buy" in signal:
-                             reason.append(f"Additionally, the current price (${current_price:.2f}) is trading above both SMAs, reinforcing a bullish outlook.")
-                        elif "Sell" not in signal:
-                            signal = "Potential Buy" if signal == "Neutral" else signal
-                            reason.append(f"The current price (${current_price:.2f}) is trading above both the 20-Day and 50-Day SMAs, which *conceptually* supports an upward trend.")
-                    elif current_price < last_sma_20 and current_price < last_sma_50:
-                        if "Sell" in signal:
-                            reason.append(f"Additionally, the current price (${current_price:.2f}) is trading below both SMAs, reinforcing a bearish outlook.")
-                        elif "Buy" not in signal:
-                            signal = "Potential Sell" if signal == "Neutral" else signal
-                            reason.append(f"The current price (${current_price:.2f}) is trading below both the 20-Day and 50-Day SMAs, which *conceptually* supports a downward trend.")
-                    else:
-                        reason.append(f"The current price (${current_price:.2f}) is hovering between the SMAs, suggesting a potentially mixed or indecisive short-term market.")
-                else:
-                    reason.append("Current real-time price could not be obtained, so analysis is based purely on historical moving averages.")
-
+            # Same thresholds as before the shared rules: an interpretation needs more than 50 bars and a
+            # crossover check more than 51 (dropping the oldest of exactly 51 keeps the latest SMAs but
+            # leaves no previous bar), and a zero price counts as missing
+            closes = df['Close'].to_numpy()
+            signal_result = None
+            if len(closes) > 50:
+                signal_result = evaluate_signal(closes[1:] if len(closes) == 51 else closes, current_price or None)
+            if signal_result is not None and signal_result.valid:
+                signal, reason = interpret_signal(signal_result)
                 print(f"\nBased on Moving Average analysis, the AI Assistant's conceptual signal is: **{signal}**")
                 print("Reasoning:")
                 for r in reason:
@@ -414,17 +1158,15 @@ def analyze_stock_and_advise(ticker_symbol):
     return df, current_price # Return df and current_price for report generation
 
 
-def provide_buy_sell_recommendation(ticker_symbol):
+def provide_buy_sell_recommendation(ticker_symbol, snapshot=None):
     """
     Provides a direct buy/sell/hold recommendation based on current price and SMAs.
+    Pass a TickerSnapshot to reuse data that has already been fetched.
     """
     print(f"\n--- AI Assistant's Buy/Sell Recommendation for: {ticker_symbol} ---")
 
-    current_price = None
-    if FINNHUB_API_KEY:
-        current_price = get_current_price_realtime_api(ticker_symbol, FINNHUB_API_KEY)
-    if current_price is None:
-        current_price = get_current_price_yfinance(ticker_symbol)
+    snapshot = snapshot or TickerSnapshot(ticker_symbol)
+    current_price = snapshot.current_price
 
     if current_price is None:
         print("Could not retrieve current price for a direct recommendation.")
@@ -432,64 +1174,26 @@ def provide_buy_sell_recommendation(ticker_symbol):
         print("Cannot provide a direct buy/sell recommendation at this time.")
         return None, None # Return None for recommendation and reason
 
-    df = get_historical_data_yfinance(ticker_symbol, period="1y")
+    df = snapshot.history
 
     if df is None or df.empty or len(df) < 50:
         print("Not enough historical data to calculate reliable Moving Averages (at least 50 days needed).")
         print("Cannot provide a direct buy/sell recommendation at this time.")
         return None, None # Return None for recommendation and reason
 
-    df['SMA_20'] = df['Close'].rolling(window=20).mean()
-    df['SMA_50'] = df['Close'].rolling(window=50).mean()
+    signal_result = evaluate_signal(df['Close'].to_numpy(), current_price)
 
-    last_sma_20 = df['SMA_20'].iloc[-1]
-    last_sma_50 = df['SMA_50'].iloc[-1]
-
-    if pd.isna(last_sma_20) or pd.isna(last_sma_50):
+    if not signal_result.valid:
         print("Moving Averages could not be calculated for the most recent period.")
         print("This might be due to insufficient recent historical data.")
         print("Cannot provide a direct buy/sell recommendation.")
         return None, None # Return None for recommendation and reason
 
     print(f"Current Price: ${current_price:.2f}")
-    print(f"20-Day SMA: ${last_sma_20:.2f}")
-    print(f"50-Day SMA: ${last_sma_50:.2f}")
-
-    recommendation = "HOLD / NEUTRAL"
-    reason = []
+    print(f"20-Day SMA: ${signal_result.sma_short:.2f}")
+    print(f"50-Day SMA: ${signal_result.sma_long:.2f}")
 
-    if len(df) >= 51:
-        prev_sma_20 = df['SMA_20'].iloc[-2]
-        prev_sma_50 = df['SMA_50'].iloc[-2]
-
-        if not pd.isna(prev_sma_20) and not pd.isna(prev_sma_50):
-            if last_sma_20 > last_sma_50 and prev_sma_20 <= prev_sma_50:
-                recommendation = "BUY (Strong Signal)"
-                reason.append("The 20-Day SMA has recently crossed ABOVE the 50-Day SMA (a 'Golden Cross'), indicating strong bullish momentum.")
-            elif last_sma_20 < last_sma_50 and prev_sma_20 >= prev_sma_50:
-                recommendation = "SELL (Strong Signal)"
-                reason.append("The 20-Day SMA has recently crossed BELOW the 50-Day SMA (a 'Death Cross'), indicating strong bearish momentum.")
-
-    if current_price > last_sma_20 and current_price > last_sma_50:
-        if "BUY" in recommendation:
-            reason.append(f"Current price (${current_price:.2f}) is significantly above both SMAs, reinforcing bullish sentiment.")
-        elif recommendation == "HOLD / NEUTRAL":
-            recommendation = "BUY"
-            reason.append(f"Current price (${current_price:.2f}) is above both the 20-Day and 50-Day SMAs, suggesting an upward trend.")
-    elif current_price < last_sma_20 and current_price < last_sma_50:
-        if "SELL" in recommendation:
-            reason.append(f"Current price (${current_price:.2f}) is significantly below both SMAs, reinforcing bearish sentiment.")
-        elif recommendation == "HOLD / NEUTRAL":
-            recommendation = "SELL"
-            reason.append(f"The current price (${current_price:.2f}) is below both the 20-Day and 50-Day SMAs, which *conceptually* supports a downward trend.")
-    else:
-        if recommendation == "HOLD / NEUTRAL":
-            reason.append(f"Current price (${current_price:.2f}) is oscillating between the 20-Day and 50-Day SMAs, indicating a lack of clear direction or consolidation.")
-        else:
-            reason.append(f"Note: Current price (${current_price:.2f}) is currently between the 20-Day and 50-Day SMAs, indicating some short-term indecision despite longer-term SMA signals.")
-
-    if not reason:
-        reason.append("Based on the provided data, the stock's movement relative to its simple moving averages is currently unclear, leading to a neutral outlook.")
+    recommendation, reason = explain_recommendation(signal_result)
 
     print(f"\nAI Assistant's Recommendation: **{recommendation}**")
     print("Reasoning:")
@@ -511,82 +1215,211 @@ def provide_buy_sell_recommendation(ticker_symbol):
     return recommendation, reason # Return for report generation
 
 
-def download_sales_data_to_excel(ticker_symbol):
+def download_sales_data_to_excel(ticker_symbol, snapshot=None, num_years=None):
     """
     Fetches annual sales (revenue) data for a given ticker and exports it to an Excel file,
-    allowing the user to specify the number of past years.
+    allowing the user to specify the number of past years (asked for only if `num_years` is None).
     """
     print(f"\n--- Downloading Annual Sales Data for: {ticker_symbol} ---")
 
-    num_years_str = input("How many past years of annual sales data do you need? (e.g., 5 for the last 5 years): ").strip()
-    try:
-        num_years = int(num_years_str)
-        if num_years <= 0:
-            print("Please enter a positive number of years.")
+    if num_years is None:
+        num_years_str = input("How many past years of annual sales data do you need? (e.g., 5 for the last 5 years): ").strip()
+        try:
+            num_years = int(num_years_str)
+        except ValueError:
+            print("Invalid input. Please enter a whole number for the number of years.")
             return
-    except ValueError:
-        print("Invalid input. Please enter a whole number for the number of years.")
+    if num_years <= 0:
+        print("Please enter a positive number of years.")
         return
 
     print(f"Attempting to fetch annual financial statements (Income Statement) for the last {num_years} years...")
 
-    financials_df = get_annual_financials_yfinance(ticker_symbol)
+    snapshot = snapshot or TickerSnapshot(ticker_symbol)
+    financials_df = snapshot.financials
 
     if financials_df is not None and not financials_df.empty:
-        # Transpose to have years as columns and metrics as rows
-        financials_df_T = financials_df.T
-
-        sales_data = pd.DataFrame()
-        # Check for common sales/revenue keys
-        if 'Total Revenue' in financials_df_T.columns:
-            sales_data['Sales'] = financials_df_T['Total Revenue']
-        elif 'Revenue' in financials_df_T.columns:
-            sales_data['Sales'] = financials_df_T['Revenue']
-        elif 'Sales' in financials_df_T.columns: # Less common, but good to have
-            sales_data['Sales'] = financials_df_T['Sales']
-        else:
+        # 'Total Revenue', 'Revenue' or 'Sales', by fiscal period end, oldest first
+        sales = extract_sales(financials_df)
+        if sales is None:
             print(f"Could not find 'Total Revenue', 'Revenue', or 'Sales' in the financial statements for {ticker_symbol}.")
             print("Available financial metrics are:")
-            print(financials_df_T.columns.tolist())
+            print(financials_df.index.tolist())
             return
+        sales_data = sales.to_frame()
 
         if not sales_data.empty:
-            # yfinance's financials index is typically a DatetimeIndex
-            # Filter the data for the last 'num_years'
+            # Keep the latest 'num_years' periods
             if len(sales_data) > num_years:
                 sales_data = sales_data.tail(num_years)
             elif len(sales_data) < num_years:
                 print(f"Warning: Only {len(sales_data)} years of sales data are available, less than the requested {num_years} years.")
 
-            # Ensure index is sorted for display and export
-            sales_data = sales_data.sort_index(ascending=True)
-
             # Define filename
             filename = f"{ticker_symbol}_Annual_Sales_Data_Last_{num_years}_Years.xlsx"
 
             try:
-                sales_data.to_excel(filename, index=True) # index=True to keep the year/date
+                export_frame(sales_data.rename_axis('Period End'), filename, index=True) # Keep the fiscal period end
                 print(f"Successfully downloaded annual sales data to '{filename}'")
                 print(f"You can open this Excel file to view the company's sales value for the past {len(sales_data)} years.")
                 print("\nSales data exported (last few rows shown):")
                 print(sales_data.tail(max(5, len(sales_data)))) # Show up to 5 rows, or all if less than 5
             except Exception as e:
                 print(f"Error saving sales data to Excel: {e}")
-                print("Please ensure you have the 'openpyxl' engine installed: pip install openpyxl")
+                print("Please ensure you have the 'xlsxwriter' package installed: pip install xlsxwriter")
         else:
             print("No sales data could be extracted from the financial statements after filtering.")
     else:
         print(f"Could not retrieve annual financial data for {ticker_symbol}.")
         print("Please check the ticker symbol and your internet connection. Data might not be available for this company.")
 
+def export_financials(ticker_symbols, metrics=('Sales',), frequency='annual', periods=None, filename=None,
+                      format='xlsx'):
+    """
+    Exports income statement metrics for many tickers, one table per metric with a row per ticker
+    and a column per fiscal year (or quarter): sheets of one workbook for 'xlsx', one file per
+    metric for 'csv' and 'parquet'. Statements come from the local fundamentals store, so only
+    tickers with a newly due report are downloaded. Rows are streamed to the file in batches.
+    Returns the list of files written, or None if the export failed.
+    """
+    ticker_symbols = list(dict.fromkeys(t.strip().upper() for t in ticker_symbols if t.strip()))
+    filename = filename or f"Financials_{frequency.title()}_{len(ticker_symbols)}_Tickers.{format}"
+    print(f"\n--- Exporting {', '.join(metrics)} ({frequency}) for {len(ticker_symbols)} Tickers ---")
+
+    start = time.perf_counter()
+    downloads_before = UPSTREAM_CALL_COUNTS['yfinance_financials']
+    statements, errors = load_financial_statements(ticker_symbols, frequency)
+    downloads = UPSTREAM_CALL_COUNTS['yfinance_financials'] - downloads_before
+    print(f"Loaded statements in {time.perf_counter() - start:.1f}s "
+          f"({downloads} downloaded, {len(ticker_symbols) - downloads} from the local store).")
+
+    notes = [(ticker, f"Download failed: {errors[ticker]}" if ticker in errors else "No statement available")
+             for ticker, df in statements.items() if df is None]
+    try:
+        with open_export(filename, format) as export:
+            for metric in metrics:
+                table = metric_table(statements, metric, frequency, periods)
+                export.add_table(metric, ['Ticker'] + list(table.columns)).write_frame(table, index=True)
+            if notes:
+                export.add_table('Missing', ['Ticker', 'Issue']).write_rows(notes)
+    except Exception as e:
+        print(f"Error saving financial data: {e}")
+        print("Excel export needs 'xlsxwriter' and Parquet export 'pyarrow': pip install xlsxwriter pyarrow")
+        return None
+    print(f"Successfully exported {len(metrics)} metric(s) for {len(ticker_symbols) - len(notes)} tickers to "
+          f"{', '.join(repr(path) for path in export.paths)}.")
+    if notes:
+        print(f"{len(notes)} ticker(s) had no statement; see the 'Missing' table.")
+    return export.paths
+
+
+def align_closes(closes, join=None):
+    """
+    Aligns closes into one (dates x tickers) DataFrame. `closes` is {ticker: close Series}, joined
+    with a single concat, or a wide DataFrame on the union of dates (e.g. HistoryMatrix.to_frame()).
+    join='inner' keeps dates common to every ticker; 'outer' keeps all dates and forward-fills
+    gaps (dates before a ticker's first close stay NaN). Defaults to COMPARE_JOIN.
+    """
+    join = join or COMPARE_JOIN
+    if join not in ('inner', 'outer'):
+        raise ValueError("join must be 'inner' or 'outer'.")
+    if len(closes) == 0:
+        return pd.DataFrame()
+    if isinstance(closes, pd.DataFrame):
+        matrix = closes.sort_index()
+        matrix = matrix.dropna() if join == 'inner' else matrix.ffill()
+    else:
+        matrix = pd.concat(closes, axis=1, join=join).sort_index()
+        if join == 'outer':
+            matrix = matrix.ffill()
+    matrix.columns.name = 'Ticker'
+    return matrix
+
+def normalize_to_first(matrix):
+    """
+    Divides every column of a (dates x tickers) DataFrame by its first valid value, so all
+    tickers start at 1.0. Columns whose first value is 0 (or that have no data) become NaN.
+    """
+    values = matrix.to_numpy(dtype=float)
+    if values.size == 0:
+        return matrix.astype(float)
+    has_value = ~np.isnan(values)
+    first = values[has_value.argmax(axis=0), np.arange(values.shape[1])]
+    first[~has_value.any(axis=0) | (first == 0)] = np.nan
+    return pd.DataFrame(values / first, index=matrix.index, columns=matrix.columns)
+
+def plot_normalized_performance(normalized, title='Normalized Stock Performance (Last 1 Year)'):
+    """
+    Plots one line per column of a normalized (dates x tickers) DataFrame.
+    """
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    for ticker in normalized.columns:
+        series = downsample_series(normalized[ticker].dropna(), CHART_MAX_POINTS, CHART_DOWNSAMPLING)
+        fig.add_trace(go.Scatter(x=series.index, y=series.to_numpy(), mode='lines', name=ticker,
+                                 hovertemplate='%{y:.3f}'))
+    fig.update_layout(
+        title=title,
+        xaxis_title='Date',
+        yaxis_title='Normalized Price (Starting at 1.0)',
+        legend_title_text='Ticker',
+        hovermode="x unified", # Shows all traces at a single x-coordinate on hover
+        template="plotly_white"
+    )
+    fig.update_xaxes(rangeslider_visible=True) # Adds a range slider at the bottom
+    return show_figure(fig, "comparison_" + "_".join(normalized.columns))
+
+def compare_table(ticker_symbols, snapshots=None):
+    """
+    Side-by-side numbers for many tickers without printing anything: a DataFrame indexed by ticker with
+    Price, Market Cap (M), Industry, P/E Ratio, Dividend Yield (%) and 1y Return (%), None where missing.
+    Every price is fetched in one batched pass and every history in bulk; profiles and info concurrently.
+    Pass `snapshots` (one per ticker, in order) to reuse the data they already hold, histories included.
+    Returns (table, HistoryMatrix of the closes, {ticker: [exception, ...]} for failed or empty requests).
+    """
+    reuse = snapshots is not None
+    snapshots = snapshots if reuse else [TickerSnapshot(ticker) for ticker in ticker_symbols]
+    current_prices = get_current_prices(ticker_symbols)
+    for snapshot in snapshots:
+        # Passed-in snapshots may use a different spelling of the symbol; those fall back to their own price
+        snapshot.seed(current_price=current_prices.get(snapshot.ticker_symbol))
+    if reuse:
+        fetch_errors = prefetch_snapshots(snapshots, fields=('profile', 'info', 'history'))
+        frames = {snapshot.ticker_symbol: snapshot.history for snapshot in snapshots
+                  if snapshot.history is not None and not snapshot.history.empty}
+        histories = bulk_history.HistoryMatrix(*bulk_history.frames_to_matrix(frames))
+    else:
+        histories = load_histories(ticker_symbols)
+        fetch_errors = prefetch_snapshots(snapshots, fields=('profile', 'info'))
+        for ticker, reason in histories.failed.items():
+            fetch_errors.setdefault(ticker, []).append(MissingData(f"history: {reason}"))
+
+    rows = []
+    for ticker, snapshot in zip(ticker_symbols, snapshots):
+        profile = snapshot.profile or {}
+        yf_info = snapshot.info or {}
+        market_cap = profile.get('marketCapitalization')
+        closes = histories.column(ticker) if ticker in histories.ticker_index else None
+        if snapshot.current_price is None:
+            fetch_errors.setdefault(ticker, []).append(MissingData(f"price: no data returned for {ticker}"))
+        rows.append({
+            'Ticker': ticker,
+            'Price': snapshot.current_price or None,
+            'Market Cap (M)': market_cap if isinstance(market_cap, (int, float)) else None,
+            'Industry': profile.get('finnhubIndustry', 'N/A') if profile else None,
+            'P/E Ratio': yf_info.get('trailingPE') or None,
+            'Dividend Yield (%)': yf_info.get('dividendYield') * 100 if yf_info.get('dividendYield') else None,
+            '1y Return (%)': (closes.iloc[-1] / closes.iloc[0] - 1) * 100 if closes is not None and len(closes) > 1 else None,
+        })
+    return pd.DataFrame(rows).set_index('Ticker'), histories, fetch_errors
 
 def compare_stocks():
     """
     Allows users to compare multiple stocks side-by-side in a table and a normalized chart.
     """
     print("\n--- Compare Multiple Stocks ---")
-    tickers_input = input("Enter ticker symbols separated by commas (e.g., AAPL,MSFT,GOOG): ").strip()
-    ticker_symbols = [t.strip().upper() for t in tickers_input.split(',') if t.strip()]
+    tickers_input = input("Enter ticker symbols or company names separated by commas (e.g., AAPL,MSFT,Alphabet): ").strip()
+    ticker_symbols = _resolve_ticker_list(tickers_input.split(','))
 
     if not ticker_symbols:
         print("No ticker symbols entered. Returning to main menu.")
@@ -596,127 +1429,87 @@ def compare_stocks():
         print("Please enter at least two ticker symbols for comparison.")
         return
 
-    comparison_data = []
-    historical_dfs = {}
-    valid_tickers_for_chart = [] # To keep track of tickers with valid historical data for the chart
-
     print(f"Gathering data for: {', '.join(ticker_symbols)}")
-
+    table, histories, fetch_errors = compare_table(ticker_symbols)
+    for ticker, errors in fetch_errors.items():
+        print(f"Warning: {len(errors)} data request(s) failed for {ticker}: {errors[0]}")
+
+    comparison_df = pd.DataFrame({
+        'Current Price': [f"${price:,.2f}" if pd.notna(price) else "N/A" for price in table['Price']],
+        'Market Cap (M)': [f"${cap:,.2f}" if pd.notna(cap) else "N/A" for cap in table['Market Cap (M)']],
+        'Industry': table['Industry'].fillna("N/A"),
+        'P/E Ratio': [f"{pe:.2f}" if pd.notna(pe) else "N/A" for pe in table['P/E Ratio']],
+        'Dividend Yield': [f"{dy:.2f}%" if pd.notna(dy) else "N/A" for dy in table['Dividend Yield (%)']],
+    }, index=table.index)
     for ticker in ticker_symbols:
-        data = {'Ticker': ticker}
-        current_price = get_current_price_realtime_api(ticker, FINNHUB_API_KEY)
-        if current_price is None:
-            current_price = get_current_price_yfinance(ticker)
-        data['Current Price'] = f"${current_price:,.2f}" if current_price else "N/A"
-
-        profile = get_company_profile_finnhub(ticker, FINNHUB_API_KEY)
-        if profile:
-            market_cap = profile.get('marketCapitalization')
-            if isinstance(market_cap, (int, float)):
-                data['Market Cap (M)'] = f"${market_cap:,.2f}"
-            else:
-                data['Market Cap (M)'] = "N/A"
-            data['Industry'] = profile.get('finnhubIndustry', 'N/A')
-        else:
-            data['Market Cap (M)'] = "N/A"
-            data['Industry'] = "N/A"
-
-        yf_info = get_yfinance_info(ticker)
-        if yf_info:
-            data['P/E Ratio'] = f"{yf_info.get('trailingPE', 'N/A'):.2f}" if yf_info.get('trailingPE') else "N/A"
-            data['Dividend Yield'] = f"{yf_info.get('dividendYield', 0) * 100:.2f}%" if yf_info.get('dividendYield') else "N/A"
-        else:
-            data['P/E Ratio'] = "N/A"
-            data['Dividend Yield'] = "N/A"
-
-        comparison_data.append(data)
-
-        # Get historical data for chart
-        hist_df = get_historical_data_yfinance(ticker, period="1y")
-        if hist_df is not None and not hist_df.empty and not hist_df['Close'].iloc[0] == 0:
-            # Normalize price to 1 at the start of the period for comparison
-            initial_close = hist_df['Close'].iloc[0]
-            historical_dfs[ticker] = hist_df['Close'] / initial_close
-            valid_tickers_for_chart.append(ticker) # Add to list if valid for chart
-        else:
+        # Historical data for the chart comes from the bulk download in compare_table
+        if ticker not in histories.ticker_index:
             print(f"Warning: No valid historical data for chart comparison for {ticker}.")
 
-    comparison_df = pd.DataFrame(comparison_data)
-    comparison_df = comparison_df.set_index('Ticker') # Set Ticker as index for better table display
     print("\n--- Stock Comparison Summary ---")
     print(comparison_df.to_string())
 
     # --- Interactive Chart for Normalized Performance ---
-    if valid_tickers_for_chart:
+    if CHART_OUTPUT_MODE == 'none':
+        return
+    if histories.tickers:
         print("\nGenerating interactive performance comparison chart...")
-        
-        # Create a single DataFrame suitable for plotly.express.line
-        # Melt the historical_dfs dictionary into a long format DataFrame
-        # First, ensure all Series share a common index or merge them carefully
-        
-        # Find the common date range among all valid historical data
-        common_dates = None
-        for ticker in valid_tickers_for_chart:
-            if common_dates is None:
-                common_dates = historical_dfs[ticker].index
-            else:
-                common_dates = common_dates.intersection(historical_dfs[ticker].index)
-        
-        if common_dates.empty:
+
+        # One (dates x tickers) matrix: a single join, then every ticker is rebased to 1.0 on its first date
+        closes = align_closes(histories.to_frame())
+        if closes.empty:
             print("No common historical date range found for chart comparison. Skipping chart.")
             return
 
-        chart_df_list = []
-        for ticker in valid_tickers_for_chart:
-            # Re-normalize over the common_dates to ensure all start at 1.0 on the first common date
-            temp_series = historical_dfs[ticker].loc[common_dates].sort_index()
-            if not temp_series.empty and temp_series.iloc[0] != 0:
-                normalized_series = temp_series / temp_series.iloc[0]
-                chart_df_list.append(pd.DataFrame({
-                    'Date': normalized_series.index,
-                    'Normalized Price': normalized_series.values,
-                    'Ticker': ticker
-                }))
-
-        if chart_df_list:
-            final_chart_df = pd.concat(chart_df_list).reset_index(drop=True)
-            
-            fig = px.line(final_chart_df, x='Date', y='Normalized Price', color='Ticker',
-                          title='Normalized Stock Performance (Last 1 Year)',
-                          labels={'Normalized Price': 'Normalized Price (Starting at 1.0)', 'Date': 'Date'},
-                          hover_name="Ticker", # Show ticker name on hover
-                          template="plotly_white")
-            
-            fig.update_layout(hovermode="x unified") # Shows all traces at a single x-coordinate on hover
-            fig.update_xaxes(rangeslider_visible=True) # Adds a range slider at the bottom
-            fig.show()
+        normalized = normalize_to_first(closes).dropna(axis=1, how='all')
+        if not normalized.empty:
+            plot_normalized_performance(normalized)
         else:
             print("\nCould not prepare data for performance comparison chart.")
     else:
         print("\nCould not generate performance comparison chart due to lack of valid historical data for chosen tickers.")
 
 
-def generate_stock_report(ticker_symbol):
+def _write_atomically(filename, write):
+    """
+    Calls write(temp_path) and renames the result onto `filename`, so a failed or
+    interrupted write never leaves a truncated report behind.
+    """
+    temp_filename = f"{filename}.{os.getpid()}.tmp"
+    try:
+        write(temp_filename)
+        os.replace(temp_filename, filename)
+    finally:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+
+def _table_cell_text(cell):
+    from reportlab.platypus import Paragraph
+    return cell.text if isinstance(cell, Paragraph) else str(cell)
+
+def generate_stock_report(ticker_symbol, snapshot=None, output_dir=".", show_analysis=True):
     """
     Generates a comprehensive report for a given stock, saving it as a text file and PDF.
+    Every dataset is fetched once through a TickerSnapshot and shared by all sections.
+    With show_analysis=False the console analysis and chart are skipped (used for batch runs).
+    Returns (text_filename, pdf_filename) for the files that were written.
     """
     print(f"\n--- Generating Report for: {ticker_symbol} ---")
 
+    # ReportLab is only loaded by runs that write reports
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Image
+    from reportlab.lib.units import inch
+    from report_templates import get_report_template, binary_pdf_streams
+
+    snapshot = snapshot or TickerSnapshot(ticker_symbol)
+    calls_before = sum(UPSTREAM_CALL_COUNTS.values())
+
     report_content = []
-    styles = getSampleStyleSheet()
-    h1 = styles['h1']
-    h2 = styles['h2']
-    h3 = styles['h3']
-    normal = styles['Normal']
-    # Custom style for disclaimers
-    disclaimer_style = ParagraphStyle(
-        'Disclaimer',
-        parent=normal,
-        fontSize=8,
-        textColor=colors.red,
-        leading=10,
-        spaceBefore=6
-    )
+    template = get_report_template() # Styles and static sections are built once per process
+    h1 = template.h1
+    h2 = template.h2
+    normal = template.normal
 
 
     report_content.append(Paragraph(f"Stock Analysis Report: {ticker_symbol}", h1))
@@ -724,8 +1517,8 @@ def generate_stock_report(ticker_symbol):
     report_content.append(Spacer(1, 0.2 * inch))
 
     # --- Company Details ---
-    report_content.append(Paragraph("1. Company Details", h2))
-    company_profile = get_company_profile_finnhub(ticker_symbol, FINNHUB_API_KEY)
+    report_content.append(template.paragraph("1. Company Details", h2))
+    company_profile = snapshot.profile
     if company_profile:
         details = [
             ["Company Name:", company_profile.get('name', 'N/A')],
@@ -739,7 +1532,7 @@ def generate_stock_report(ticker_symbol):
         ]
         table_data = []
         for key, value in details:
-            table_data.append([Paragraph(key, normal), Paragraph(str(value), normal)])
+            table_data.append([template.paragraph(key, normal), Paragraph(str(value), normal)])
 
         report_content.append(Table(table_data, colWidths=[2*inch, 4*inch]))
     else:
@@ -747,14 +1540,17 @@ def generate_stock_report(ticker_symbol):
     report_content.append(Spacer(1, 0.2 * inch))
 
     # --- Price and Moving Averages ---
-    report_content.append(Paragraph("2. Price and Technical Analysis", h2))
-    df, current_price_for_report = analyze_stock_and_advise(ticker_symbol) # Call existing analysis logic
+    report_content.append(template.paragraph("2. Price and Technical Analysis", h2))
+    if show_analysis:
+        df, current_price_for_report = analyze_stock_and_advise(ticker_symbol, snapshot) # Call existing analysis logic
+    else:
+        df, current_price_for_report = snapshot.history_with_smas(), snapshot.current_price
     report_content.append(Spacer(1, 0.1 * inch))
 
     if current_price_for_report:
         report_content.append(Paragraph(f"Current Price: ${current_price_for_report:.2f}", normal))
     else:
-        report_content.append(Paragraph("Current price could not be retrieved.", normal))
+        report_content.append(template.paragraph("Current price could not be retrieved.", normal))
 
     if df is not None and not df.empty and len(df) >= 50:
         last_sma_20 = df['SMA_20'].iloc[-1]
@@ -763,76 +1559,60 @@ def generate_stock_report(ticker_symbol):
         report_content.append(Paragraph(f"50-Day SMA: ${last_sma_50:.2f}", normal))
         report_content.append(Spacer(1, 0.1 * inch))
 
+        chart_path = chart_cache.get_price_chart(ticker_symbol, df) if INCLUDE_CHARTS_IN_REPORTS else None
+        if chart_path:
+            report_content.append(Image(chart_path, width=6.5 * inch, height=3.25 * inch))
+            report_content.append(Spacer(1, 0.1 * inch))
+
         # Re-run recommendation logic to get recommendation string and reasons
-        recommendation, reasons = provide_buy_sell_recommendation(ticker_symbol)
+        if show_analysis:
+            recommendation, reasons = provide_buy_sell_recommendation(ticker_symbol, snapshot)
+        else:
+            recommendation, reasons = get_recommendation(snapshot)
         if recommendation and reasons:
             report_content.append(Paragraph(f"AI Assistant's Recommendation: <b>{recommendation}</b>", normal))
-            report_content.append(Paragraph("Reasoning:", normal))
+            report_content.append(template.paragraph("Reasoning:", normal))
             for r in reasons:
                 report_content.append(Paragraph(f"- {r}", normal))
         else:
-            report_content.append(Paragraph("Could not provide a direct buy/sell recommendation due to insufficient data or errors.", normal))
+            report_content.append(template.paragraph("Could not provide a direct buy/sell recommendation due to insufficient data or errors.", normal))
 
     else:
-        report_content.append(Paragraph("Not enough historical data to perform full technical analysis or generate SMAs.", normal))
+        report_content.append(template.paragraph("Not enough historical data to perform full technical analysis or generate SMAs.", normal))
     report_content.append(Spacer(1, 0.2 * inch))
 
     # --- Financials Summary (Example: Last 3 Years Sales) ---
-    report_content.append(Paragraph("3. Financials Summary (Last 3 Years Sales)", h2))
-    financials_df = get_annual_financials_yfinance(ticker_symbol)
+    report_content.append(template.paragraph("3. Financials Summary (Last 3 Years Sales)", h2))
+    financials_df = snapshot.financials
     if financials_df is not None and not financials_df.empty:
-        financials_df_T = financials_df.T
-        sales_data = pd.DataFrame()
-        if 'Total Revenue' in financials_df_T.columns:
-            sales_data['Sales'] = financials_df_T['Total Revenue']
-        elif 'Revenue' in financials_df_T.columns:
-            sales_data['Sales'] = financials_df_T['Revenue']
-        elif 'Sales' in financials_df_T.columns:
-            sales_data['Sales'] = financials_df_T['Sales']
+        sales = extract_sales(financials_df)
 
-        if not sales_data.empty:
-            sales_data_filtered = sales_data.sort_index(ascending=True).tail(3)
+        if sales is not None and not sales.empty:
             # Format sales data for table
             sales_table_data = [['Year', 'Sales']]
-            for index, row in sales_data_filtered.iterrows():
-                sales_table_data.append([str(index.year), f"${row['Sales']:,.0f}"]) # Format as currency, no decimals
+            for index, value in sales.tail(3).items():
+                sales_table_data.append([str(index.year), f"${value:,.0f}"]) # Format as currency, no decimals
 
             sales_table = Table(sales_table_data, colWidths=[1.5*inch, 2.5*inch])
-            sales_table.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), colors.grey),
-                ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-                ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0,0), (-1,0), 12),
-                ('BACKGROUND', (0,1), (-1,-1), colors.beige),
-                ('GRID', (0,0), (-1,-1), 1, colors.black)
-            ]))
+            sales_table.setStyle(template.sales_table_style)
             report_content.append(sales_table)
         else:
-            report_content.append(Paragraph("No sales data available for summary.", normal))
+            report_content.append(template.paragraph("No sales data available for summary.", normal))
     else:
-        report_content.append(Paragraph("Could not retrieve annual financial data for summary.", normal))
+        report_content.append(template.paragraph("Could not retrieve annual financial data for summary.", normal))
     report_content.append(Spacer(1, 0.2 * inch))
 
     # --- Disclaimer ---
-    report_content.append(Paragraph("IMPORTANT DISCLAIMER:", styles['h3']))
-    disclaimer_text = """
-    This report is generated by an AI assistant for informational and educational purposes only.
-    It relies on publicly available data and simplified technical indicators (Moving Averages).
-    It does NOT constitute financial advice. Investing in the stock market involves significant risks,
-    and past performance is not indicative of future results. Before making any investment decisions,
-    it is crucial to conduct your own thorough research, consider all relevant market factors,
-    and consult with a qualified and licensed financial advisor. The AI assistant does not consider
-    your individual financial situation, risk tolerance, or investment objectives.
-    You are solely responsible for your investment choices.
-    """
-    report_content.append(Paragraph(disclaimer_text, disclaimer_style))
+    report_content.extend(template.disclaimer())
 
 
     # --- Save as Text File ---
-    text_filename = f"{ticker_symbol}_Stock_Report.txt"
-    try:
-        with open(text_filename, 'w') as f:
+    text_filename = os.path.join(output_dir, f"{ticker_symbol}_Stock_Report.txt")
+    pdf_filename = os.path.join(output_dir, f"{ticker_symbol}_Stock_Report.pdf")
+    written = [None, None]
+
+    def write_text(path):
+        with open(path, 'w') as f:
             for item in report_content:
                 if isinstance(item, Paragraph):
                     f.write(item.text + "\n\n")
@@ -840,45 +1620,389 @@ def generate_stock_report(ticker_symbol):
                     f.write("\n")
                 elif isinstance(item, Table):
                     # Simple representation for text file
+                    cells = item._cellvalues # ReportLab keeps the table data here
                     # Extract header
-                    header = [p.text for p in item.data[0]] if item.data else []
+                    header = [_table_cell_text(c) for c in cells[0]] if cells else []
                     # Extract rows and convert Paragraphs to text
                     rows = []
-                    for row_data in item.data[1:]:
-                        rows.append([p.text if isinstance(p, Paragraph) else str(p) for p in row_data])
-                    
+                    for row_data in cells[1:]:
+                        rows.append([_table_cell_text(c) for c in row_data])
+
                     if header and rows:
                         f.write("\n" + pd.DataFrame(rows, columns=header).to_string(index=False) + "\n\n")
                     elif rows: # If no header, just print rows
                         f.write("\n" + pd.DataFrame(rows).to_string(index=False, header=False) + "\n\n")
 
+    try:
+        _write_atomically(text_filename, write_text)
+        written[0] = text_filename
         print(f"Basic stock report saved as text file: '{text_filename}'")
     except Exception as e:
         print(f"Error saving text report: {e}")
 
     # --- Save as PDF ---
-    pdf_filename = f"{ticker_symbol}_Stock_Report.pdf"
-    doc = SimpleDocTemplate(pdf_filename, pagesize=letter)
     try:
-        doc.build(report_content)
+        with binary_pdf_streams():
+            _write_atomically(pdf_filename, lambda path: SimpleDocTemplate(path, pagesize=letter).build(report_content))
+        written[1] = pdf_filename
         print(f"Detailed stock report saved as PDF: '{pdf_filename}'")
     except Exception as e:
         print(f"Error generating PDF report: {e}")
         print("Please ensure you have 'ReportLab' installed: pip install reportlab")
 
+    if DEBUG_FETCH_COUNTS:
+        print(f"[debug] Upstream data requests for this report: {sum(UPSTREAM_CALL_COUNTS.values()) - calls_before}")
+        print(f"[debug] Totals by endpoint: {dict(UPSTREAM_CALL_COUNTS)}")
+        if snapshot.api_key:
+            print(f"[debug] Finnhub connection metrics: {get_shared_finnhub_client(snapshot.api_key).metrics()}")
 
-# Main execution block
-if __name__ == "__main__":
+    return tuple(written)
+
+
+# --- Batch Report Generation ---
+
+def _render_report_worker(snapshot, output_dir):
+    """
+    Process-pool worker: lays out one report from an already loaded snapshot, quietly.
+    Returns (text_filename, pdf_filename, seconds spent rendering).
+    """
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        written = generate_stock_report(snapshot.ticker_symbol, snapshot, output_dir=output_dir, show_analysis=False)
+    return written[0], written[1], time.perf_counter() - start
+
+def generate_reports_batch(ticker_symbols, output_dir=".", workers=None):
+    """
+    Generates text and PDF reports for many tickers: every dataset is prefetched concurrently,
+    then the (CPU-bound) ReportLab layout runs in parallel worker processes. Files are written
+    atomically. Returns a DataFrame with per-ticker timings and errors, and prints a summary.
+    """
+    ticker_symbols = list(dict.fromkeys(t.strip().upper() for t in ticker_symbols if t.strip()))
+    workers = workers or REPORT_WORKERS or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"\n--- Generating Reports for {len(ticker_symbols)} Tickers ---")
+
+    # 1. Fetch everything up front; yfinance info is only needed where Finnhub had no price
+    start = time.perf_counter()
+    snapshots = [TickerSnapshot(ticker) for ticker in ticker_symbols]
+    fetch_errors = prefetch_snapshots(snapshots, fields=('realtime_price', 'profile', 'financials'))
+    for ticker, reason in prefetch_histories(snapshots).items():
+        fetch_errors.setdefault(ticker, []).append(f"history: {reason}")
+    needs_info = [snapshot for snapshot in snapshots if snapshot.realtime_price is None]
+    for ticker, errors in prefetch_snapshots(needs_info, fields=('info',)).items():
+        fetch_errors.setdefault(ticker, []).extend(errors)
+    fetch_seconds = time.perf_counter() - start
+    print(f"Fetched data for {len(snapshots)} tickers in {fetch_seconds:.1f}s.")
+
+    # 2. Lay out the reports in parallel
+    summary = {ticker: {'Ticker': ticker, 'Render (s)': None, 'PDF': None, 'Text': None,
+                        'Error': '; '.join(str(e) for e in fetch_errors.get(ticker, [])) or None}
+               for ticker in ticker_symbols}
+    start = time.perf_counter()
+    if workers <= 1:
+        outcomes = []
+        for snapshot in snapshots:
+            try:
+                outcomes.append((snapshot.ticker_symbol, _render_report_worker(snapshot, output_dir), None))
+            except Exception as e:
+                outcomes.append((snapshot.ticker_symbol, None, e))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(snapshots) or 1)) as pool:
+            futures = [(snapshot.ticker_symbol, pool.submit(_render_report_worker, snapshot, output_dir))
+                       for snapshot in snapshots]
+            outcomes = []
+            for ticker, future in futures:
+                try:
+                    outcomes.append((ticker, future.result(), None))
+                except Exception as e:
+                    outcomes.append((ticker, None, e))
+    render_seconds = time.perf_counter() - start
+
+    for ticker, result, error in outcomes:
+        row = summary[ticker]
+        if error is not None:
+            row['Error'] = str(error)
+            continue
+        row['Text'], row['PDF'], row['Render (s)'] = result[0], result[1], round(result[2], 3)
+        if row['PDF'] is None and not row['Error']:
+            row['Error'] = "PDF could not be generated"
+
+    summary_df = pd.DataFrame(list(summary.values())).set_index('Ticker')
+    failed = summary_df['PDF'].isna().sum()
+    print(f"Rendered {len(snapshots) - failed} of {len(snapshots)} reports in {render_seconds:.1f}s "
+          f"using {workers} worker process(es).")
+    print(summary_df[['Render (s)', 'Error']].fillna('').to_string())
+    return summary_df
+
+
+# --- Non-Interactive API ---
+# These functions return data instead of printing it and never prompt, so they can be called from other
+# Python code, cron jobs or job schedulers. The command line interface below is built on them.
+
+def load_snapshots(ticker_symbols, fields=()):
+    """
+    TickerSnapshots for many tickers with every price fetched in one batched pass and every history
+    in bulk; any other `fields` (e.g. ('profile',)) are then loaded concurrently.
+    Returns (snapshots, {ticker: [error, ...]} for failed requests).
+    """
+    snapshots = [TickerSnapshot(ticker) for ticker in ticker_symbols]
+    current_prices = get_current_prices(ticker_symbols)
+    for snapshot in snapshots:
+        snapshot.seed(current_price=current_prices[snapshot.ticker_symbol])
+    fetch_errors = {ticker: [f"history: {reason}"] for ticker, reason in prefetch_histories(snapshots).items()}
+    if fields:
+        for ticker, errors in prefetch_snapshots(snapshots, fields=fields).items():
+            fetch_errors.setdefault(ticker, []).extend(errors)
+    return snapshots, fetch_errors
+
+def get_analysis(ticker_symbol, snapshot=None):
+    """
+    The data behind analyze_stock_and_advise as a dict: price, latest SMAs, the conceptual signal and
+    its reasons. 'Error' says why there is no signal (it is None when there is one).
+    """
+    snapshot = snapshot or TickerSnapshot(ticker_symbol)
+    signal, error = snapshot_signal(snapshot, require_price=False)
+    label, reasons = interpret_signal(signal) if signal else (None, [])
+    df = snapshot.history
+    return {'Ticker': ticker_symbol, 'Price': snapshot.current_price,
+            'SMA_20': signal.sma_short if signal else None, 'SMA_50': signal.sma_long if signal else None,
+            'Signal': label, 'Reasons': reasons, 'History Days': 0 if df is None else len(df), 'Error': error}
+
+def get_buy_sell_recommendation(ticker_symbol, snapshot=None):
+    """
+    The data behind provide_buy_sell_recommendation as a dict: price, latest SMAs, the recommendation
+    and its reasons. 'Error' says why there is no recommendation (it is None when there is one).
+    """
+    snapshot = snapshot or TickerSnapshot(ticker_symbol)
+    signal, error = snapshot_signal(snapshot)
+    recommendation, reasons = explain_recommendation(signal) if signal else (None, [])
+    return {'Ticker': ticker_symbol, 'Price': snapshot.current_price,
+            'SMA_20': signal.sma_short if signal else None, 'SMA_50': signal.sma_long if signal else None,
+            'Recommendation': recommendation, 'Reasons': reasons, 'Error': error}
+
+def get_company_details(ticker_symbol, snapshot=None):
+    """
+    The company profile shown by display_company_details as a dict (market cap and shares outstanding
+    in millions). 'Error' is set when no profile could be retrieved.
+    """
+    snapshot = snapshot or TickerSnapshot(ticker_symbol)
+    profile = snapshot.profile or {}
+    fields = [('Name', 'name'), ('Exchange', 'exchange'), ('Industry', 'finnhubIndustry'), ('Sector', 'gsector'),
+              ('Country', 'country'), ('IPO Date', 'ipo'), ('Market Cap (M)', 'marketCapitalization'),
+              ('Shares Outstanding (M)', 'shareOutstanding'), ('Website', 'weburl'), ('Phone', 'phone'),
+              ('Currency', 'currency'), ('Employee Total', 'employeeTotal')]
+    details = {'Ticker': ticker_symbol}
+    details.update((name, profile.get(key)) for name, key in fields)
+    details['Error'] = None if profile else "company profile not available"
+    return details
+
+def get_financials_table(ticker_symbols, metric='Sales', frequency='annual', periods=None):
+    """
+    One income statement metric for many tickers (tickers x fiscal periods, oldest first; `periods`
+    keeps the latest N), through the local fundamentals store.
+    Returns (DataFrame, {ticker: reason} for tickers without the metric).
+    """
+    statements, fetch_errors = load_financial_statements(ticker_symbols, frequency)
+    table = metric_table(statements, metric, frequency, periods)
+    errors = {}
+    for ticker in table.index[table.isna().all(axis=1)]:
+        if ticker in fetch_errors:
+            errors[ticker] = f"download failed: {fetch_errors[ticker]}"
+        elif statements.get(ticker) is None:
+            errors[ticker] = "no statement available"
+        else:
+            errors[ticker] = f"no '{metric}' in the statement"
+    return table, errors
+
+
+# --- Command Line Interface ---
+# python stock_analyser_with_ai.py <command> TICKER ... [--file FILE] [--format json|csv]
+# Results go to stdout as JSON (a list of records) or CSV; progress and warnings go to stderr.
+
+EXIT_OK = 0  # Every ticker produced a result
+EXIT_FAILED = 1  # No ticker produced a result
+EXIT_USAGE = 2  # Invalid arguments or no tickers given (argparse uses 2 as well)
+EXIT_PARTIAL = 3  # Some tickers produced no result; the others were written
+
+def _read_ticker_entries(args):
+    """Tickers or company names from the command line (comma-separated or not) and the --file, if any."""
+    entries = [part for arg in args.tickers for part in arg.split(',')]
+    if args.file == '-':
+        entries += [line.split('#', 1)[0] for line in sys.stdin]
+    elif args.file:
+        entries += screener.read_universe(args.file)
+    return entries
+
+def write_records(table, format='json', stream=None):
+    """
+    Writes a DataFrame or a list of dicts to `stream` (default stdout) as a JSON list of records
+    (missing values as null) or as CSV (list values such as reasons joined with '; ').
+    """
+    stream = stream or sys.stdout
+    df = table if isinstance(table, pd.DataFrame) else pd.DataFrame(table)
+    if format == 'csv':
+        df = df.apply(lambda column: column.map(lambda v: '; '.join(map(str, v)) if isinstance(v, list) else v)
+                      if column.dtype == object else column)
+        df.to_csv(stream, index=False, lineterminator='\n')
+    else:
+        json.dump(json.loads(df.to_json(orient='records', date_format='iso')), stream, indent=2)
+        stream.write('\n')
+
+def _row_errors(rows, fetch_errors):
+    """{ticker: message} combining each row's own 'Error' with the fetch errors from load_snapshots."""
+    errors = {}
+    for row in rows:
+        messages = ([row['Error']] if row['Error'] else []) + [str(e) for e in fetch_errors.get(row['Ticker'], [])]
+        if messages:
+            errors[row['Ticker']] = '; '.join(messages)
+    return errors
+
+def _cli_analyze(args, ticker_symbols):
+    snapshots, fetch_errors = load_snapshots(ticker_symbols)
+    rows = [get_analysis(snapshot.ticker_symbol, snapshot) for snapshot in snapshots]
+    return rows, _row_errors(rows, fetch_errors)
+
+def _cli_recommend(args, ticker_symbols):
+    snapshots, fetch_errors = load_snapshots(ticker_symbols)
+    rows = [get_buy_sell_recommendation(snapshot.ticker_symbol, snapshot) for snapshot in snapshots]
+    return rows, _row_errors(rows, fetch_errors)
+
+def _cli_details(args, ticker_symbols):
+    snapshots = [TickerSnapshot(ticker) for ticker in ticker_symbols]
+    prefetch_snapshots(snapshots, fields=('profile',))
+    rows = [get_company_details(snapshot.ticker_symbol, snapshot) for snapshot in snapshots]
+    return rows, {row['Ticker']: row['Error'] for row in rows if row['Error']}
+
+def _cli_sales(args, ticker_symbols):
+    table, errors = get_financials_table(ticker_symbols, args.metric, args.frequency, args.periods)
+    return table.reset_index(), errors
+
+def _cli_compare(args, ticker_symbols):
+    table, histories, _ = compare_table(ticker_symbols)
+    errors = {ticker: "no price or price history" for ticker in ticker_symbols
+              if pd.isna(table.loc[ticker, 'Price']) and ticker not in histories.ticker_index}
+    return table.reset_index(), errors
+
+def _cli_report(args, ticker_symbols):
+    summary = generate_reports_batch(ticker_symbols, output_dir=args.output_dir, workers=args.workers)
+    errors = {ticker: row['Error'] or "PDF could not be generated" for ticker, row in summary.iterrows()
+              if pd.isna(row['PDF'])}
+    return summary.reset_index(), errors
+
+def _cli_screen(args, ticker_symbols):
+    results, errors = screener.screen(ticker_symbols, period=args.period, workers=args.workers,
+                                      cache=history_cache if USE_HISTORY_CACHE else None,
+                                      batch_size=args.batch_size)
+    if args.output:
+        screener.write_results(results, args.output)
+        print(f"Screen results written to '{args.output}'.")
+        return None, errors
+    return results, errors
+
+def build_parser():
+    """The argparse parser of the command line interface."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('tickers', nargs='*', help="Ticker symbols or company names (commas allowed)")
+    common.add_argument('-f', '--file', help="File with one ticker per line or a CSV with a Symbol column ('-' for stdin)")
+    common.add_argument('--format', choices=('json', 'csv'), default='json', help="Output format on stdout (default: json)")
+    common.add_argument('--no-search', action='store_true',
+                        help="Resolve names from the local symbol index only (no online symbol search)")
+    common.add_argument('-q', '--quiet', action='store_true', help="Suppress progress messages on stderr")
+
+    parser = argparse.ArgumentParser(description="AI Stock Analyzer. Run without arguments for the interactive menu.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('analyze', parents=[common], help="Price, SMAs and the conceptual market signal"
+                        ).set_defaults(run=_cli_analyze)
+    commands.add_parser('details', parents=[common], help="Company profile").set_defaults(run=_cli_details)
+    commands.add_parser('recommend', parents=[common], help="Buy/sell recommendation").set_defaults(run=_cli_recommend)
+    sales = commands.add_parser('sales', parents=[common], help="An income statement metric by fiscal period")
+    sales.add_argument('--metric', default='Sales', help="Statement row, e.g. 'Net Income' (default: Sales)")
+    sales.add_argument('--frequency', choices=('annual', 'quarterly'), default='annual')
+    sales.add_argument('--periods', type=int, default=None, help="Keep only the latest N periods")
+    sales.set_defaults(run=_cli_sales)
+    commands.add_parser('compare', parents=[common], help="Side-by-side comparison table").set_defaults(run=_cli_compare)
+    report = commands.add_parser('report', parents=[common], help="Text and PDF reports; writes a summary")
+    report.add_argument('-o', '--output-dir', default='.', help="Folder for the reports (default: current folder)")
+    report.add_argument('--workers', type=int, default=None, help="Worker processes laying out PDFs (default: all cores)")
+    report.set_defaults(run=_cli_report)
+    screen = commands.add_parser('screen', parents=[common], help="Rank tickers by the SMA buy/sell rules")
+    screen.add_argument('-o', '--output', help="Write a .csv, .xlsx or .parquet file instead of stdout")
+    screen.add_argument('--period', default=screener.DEFAULT_PERIOD, help="History period to load (default: 1y)")
+    screen.add_argument('--workers', type=int, default=HISTORY_DOWNLOAD_THREADS, help="Download threads per bulk request")
+    screen.add_argument('--batch-size', type=int, default=HISTORY_BATCH_SIZE, help="Symbols per bulk download request")
+    screen.set_defaults(run=_cli_screen)
+    return parser
+
+def main(argv=None):
+    """
+    Runs one command line command and returns its exit code (EXIT_OK, EXIT_PARTIAL, EXIT_FAILED or
+    EXIT_USAGE). Without arguments the interactive menu runs instead.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        interactive_menu()
+        return EXIT_OK
+    args = build_parser().parse_args(argv)
+
+    out = sys.stdout
+    # Anything the analyser prints while working goes to stderr, so stdout only carries the results
+    with contextlib.redirect_stdout(io.StringIO() if args.quiet else sys.stderr):
+        ticker_symbols = _resolve_ticker_list(_read_ticker_entries(args), allow_search=not args.no_search)
+        if not ticker_symbols:
+            print("No ticker symbols given.", file=sys.stderr)
+            return EXIT_USAGE
+        table, errors = args.run(args, ticker_symbols)
+
+    if table is not None:
+        write_records(table, args.format, out)
+    if not args.quiet:
+        for ticker, error in errors.items():
+            print(f"{ticker}: {error}", file=sys.stderr)
+    if not errors:
+        return EXIT_OK
+    return EXIT_FAILED if len(errors) >= len(ticker_symbols) else EXIT_PARTIAL
+
+
+def interactive_menu():
+    """
+    The interactive, input()-driven menu.
+    """
     print("Welcome to the AI Stock Analyzer!")
     print("This tool provides conceptual market signals and company details.")
     print("Remember: This is for educational purposes only and not financial advice.")
     while True:
-        choice = input("\nWhat would you like to do?\n1. Analyze a stock (price, charts, general signal)\n2. Get company details\n3. Get specific Buy/Sell recommendation\n4. Download Annual Sales Data to Excel\n5. Compare Multiple Stocks\n6. Generate a Basic Stock Report\n7. Exit\nEnter your choice (1, 2, 3, 4, 5, 6, or 7): ").strip()
+        choice = input("\nWhat would you like to do?\n1. Analyze a stock (price, charts, general signal)\n2. Get company details\n3. Get specific Buy/Sell recommendation\n4. Download Annual Sales Data to Excel\n5. Compare Multiple Stocks\n6. Generate a Basic Stock Report\n7. Generate Reports for a Watchlist\n8. Export Financials for a Watchlist (Excel, CSV or Parquet)\n9. Exit\nEnter your choice (1, 2, 3, 4, 5, 6, 7, 8, or 9): ").strip()
 
-        if choice in ['1', '2', '3', '4', '5', '6']:
+        if choice in ['1', '2', '3', '4', '5', '6', '7', '8']:
             if choice == '5': # Compare Multiple Stocks does not need an initial single ticker
                 compare_stocks()
                 continue # Go back to main loop after comparison
+
+            if choice in ['7', '8']: # Watchlist commands take a list of tickers (or company names), resolved without prompting
+                tickers_input = input("Enter ticker symbols or company names separated by commas, or the path to a file with one per line: ").strip()
+                if os.path.isfile(tickers_input):
+                    with open(tickers_input) as f:
+                        watchlist = [line.split('#', 1)[0].strip() for line in f]
+                else:
+                    watchlist = tickers_input.split(',')
+                watchlist = _resolve_ticker_list(watchlist)
+                if not watchlist:
+                    print("No ticker symbols entered. Returning to main menu.")
+                elif choice == '7':
+                    output_dir = input("Output folder for the reports (press Enter for the current folder): ").strip() or "."
+                    generate_reports_batch(watchlist, output_dir=output_dir)
+                else:
+                    metrics_input = input("Metrics separated by commas (e.g., Sales, Net Income, EBITDA; press Enter for Sales): ").strip()
+                    metrics = [m.strip() for m in metrics_input.split(',') if m.strip()] or ['Sales']
+                    frequency = 'quarterly' if input("Annual or quarterly statements? (annual/quarterly): ").strip().lower().startswith('q') else 'annual'
+                    periods_input = input("How many of the latest periods? (press Enter for all available): ").strip()
+                    periods = int(periods_input) if periods_input.isdigit() and int(periods_input) > 0 else None
+                    file_format = input("File format (xlsx, csv or parquet; press Enter for xlsx): ").strip().lower().lstrip('.') or 'xlsx'
+                    if file_format not in ('xlsx', 'csv', 'parquet'):
+                        print(f"Unknown format '{file_format}'; using xlsx.")
+                        file_format = 'xlsx'
+                    export_financials(watchlist, metrics=metrics, frequency=frequency, periods=periods, format=file_format)
+                continue
             
             user_input_ticker = input("Enter stock ticker symbol (e.g., AAPL, RELIANCE.NS) or company name (e.g., Apple, Apollo): ").strip()
             if not user_input_ticker:
@@ -901,8 +2025,12 @@ if __name__ == "__main__":
             else:
                 print("Could not resolve a valid ticker symbol. Please try again with a more specific input.")
 
-        elif choice == '7':
+        elif choice == '9':
             print("Exiting AI Stock Analyzer. Happy investing (responsibly)!")
             break
         else:
-            print("Invalid choice. Please enter 1, 2, 3, 4, 5, 6, or 7.")
\ No newline at end of file
+            print("Invalid choice. Please enter 1, 2, 3, 4, 5, 6, 7, 8, or 9.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
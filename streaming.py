@@ -0,0 +1,224 @@
+"""
+Incremental (streaming) moving averages and Golden/Death Cross detection.
+
+Each update is O(1): a ring buffer plus a running sum per window, so signals can be
+checked on every quote for thousands of tickers without recomputing rolling means.
+Trackers are seeded once from cached daily closes.
+
+Bar protocol: every update may carry a `session` key (e.g. the trading date). Live quotes
+(`update_quote` / `on_quote`) open a provisional bar for a new session and revise it for the
+same session; the official close (`add_bar` / `on_bar`) finalizes that provisional bar instead
+of appending another one. Without session keys, the first quote after a final bar opens the
+next session's bar and the next close finalizes it.
+"""
+import math
+
+GOLDEN_CROSS = 'Golden Cross'  # Short SMA crossed above the long SMA
+DEATH_CROSS = 'Death Cross'  # Short SMA crossed below the long SMA
+
+
+class StreamingSMA:
+    """
+    Simple moving average over the last `window` values with O(1) push/replace.
+    """
+    __slots__ = ('window', '_buffer', '_pos', '_count', '_sum', '_updates')
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be at least 1.")
+        self.window = window
+        self._buffer = [0.0] * window
+        self._pos = 0  # Slot the next pushed value goes into
+        self._count = 0
+        self._sum = 0.0
+        self._updates = 0
+
+    def push(self, value):
+        """
+        Appends a new value (a new bar), evicting the oldest once the window is full.
+        """
+        value = float(value)
+        if self._count == self.window:
+            self._sum -= self._buffer[self._pos]
+        else:
+            self._count += 1
+        self._buffer[self._pos] = value
+        self._sum += value
+        self._pos = (self._pos + 1) % self.window
+        self._resync_if_due()
+
+    def replace_last(self, value):
+        """
+        Overwrites the most recent value (e.g. today's bar updated by a live quote).
+        """
+        if self._count == 0:
+            self.push(value)
+            return
+        last = (self._pos - 1) % self.window
+        value = float(value)
+        self._sum += value - self._buffer[last]
+        self._buffer[last] = value
+        self._resync_if_due()
+
+    def _resync_if_due(self):
+        # Recompute the exact sum once per `window` updates so floating-point drift cannot accumulate
+        self._updates += 1
+        if self._updates >= self.window:
+            self._updates = 0
+            self._sum = math.fsum(self._buffer[:self._count] if self._count < self.window else self._buffer)
+
+    @property
+    def ready(self):
+        return self._count == self.window
+
+    @property
+    def value(self):
+        """Current average, or None until `window` values have been seen."""
+        return self._sum / self.window if self.ready else None
+
+
+class CrossoverTracker:
+    """
+    Tracks the short/long SMA pair for one ticker and reports Golden/Death Crosses using the same
+    rule as the analyser: short > long now and short <= long on the previous bar (or the reverse).
+
+    `update_quote(price, session)` revises the current session's provisional bar (opening it on
+    the first quote of a session), so intraday quotes are compared against the previous completed
+    bar; `add_bar(close, session)` finalizes it, or appends a completed bar when no quote for that
+    session was seen. Each cross is reported once per bar, however many quotes arrive.
+    """
+    __slots__ = ('short', 'long', '_prev_short', '_prev_long', '_reported', '_session', '_provisional')
+
+    def __init__(self, short_window=20, long_window=50):
+        self.short = StreamingSMA(short_window)
+        self.long = StreamingSMA(long_window)
+        self._prev_short = None  # SMAs as of the previous completed bar
+        self._prev_long = None
+        self._reported = None  # Event already reported for the current bar
+        self._session = None  # Session key of the newest bar
+        self._provisional = False  # True while the newest bar is built from live quotes
+
+    @classmethod
+    def from_history(cls, closes, short_window=20, long_window=50, last_session=None, provisional=False):
+        """
+        Seeds a tracker from historical closes (oldest first); only the last long_window + 1 are used.
+        `last_session` is the session of the final close; pass `provisional=True` when that bar is the
+        current, still-trading session (e.g. an intraday cache refresh) so quotes keep revising it.
+        """
+        tracker = cls(short_window, long_window)
+        closes = [c for c in closes[-(long_window + 1):] if c == c]  # Drop NaNs
+        for close in closes:
+            tracker.add_bar(close)
+        tracker._reported = tracker.crossover()  # Do not re-report a cross that happened in the history
+        tracker._session = last_session
+        tracker._provisional = provisional and bool(closes)
+        return tracker
+
+    def _open_bar(self, value, session, provisional):
+        self._prev_short, self._prev_long = self.short.value, self.long.value
+        self._reported = None
+        self.short.push(value)
+        self.long.push(value)
+        self._session = session
+        self._provisional = provisional
+        return self._check()
+
+    def _revise_bar(self, value):
+        self.short.replace_last(value)
+        self.long.replace_last(value)
+        return self._check()
+
+    def add_bar(self, close, session=None):
+        """
+        Commits the official close of a session and returns GOLDEN_CROSS, DEATH_CROSS or None.
+        Finalizes the provisional bar opened by quotes for the same session (or, without a session
+        key, the current provisional bar); otherwise appends a new completed bar.
+        """
+        same_session = session is not None and session == self._session
+        if same_session or (self._provisional and session is None):
+            self._provisional = False
+            return self._revise_bar(close)
+        # A provisional bar from an earlier session keeps its last quote as its close
+        return self._open_bar(close, session, provisional=False)
+
+    def update_quote(self, price, session=None):
+        """
+        Applies a live price and returns a newly detected cross (or None). The first quote of a new
+        session opens a provisional bar after the last one; later quotes revise it. Quotes for a
+        session whose close was already committed are ignored.
+        """
+        if session is None:
+            new_bar = not self._provisional
+        elif session == self._session:
+            if not self._provisional:
+                return None
+            new_bar = False
+        else:
+            new_bar = True
+        if new_bar:
+            return self._open_bar(price, session, provisional=True)
+        return self._revise_bar(price)
+
+    def crossover(self):
+        """
+        Returns the cross on the current bar (GOLDEN_CROSS, DEATH_CROSS or None), whether or not reported.
+        """
+        short, long = self.short.value, self.long.value
+        if short is None or long is None or self._prev_short is None or self._prev_long is None:
+            return None
+        if short > long and self._prev_short <= self._prev_long:
+            return GOLDEN_CROSS
+        if short < long and self._prev_short >= self._prev_long:
+            return DEATH_CROSS
+        return None
+
+    def _check(self):
+        event = self.crossover()
+        if event is None or event == self._reported:
+            return None
+        self._reported = event
+        return event
+
+    @property
+    def sma_values(self):
+        """(short SMA, long SMA) for the current bar; None until enough bars are seen."""
+        return self.short.value, self.long.value
+
+
+class CrossoverMonitor:
+    """
+    Crossover trackers for many tickers. `on_quote`/`on_bar` take an optional session key (see the
+    bar protocol above), return the event (if any) and also pass it to
+    `callback(ticker, event, short_sma, long_sma)` when one is given.
+    """
+
+    def __init__(self, short_window=20, long_window=50, callback=None):
+        self.short_window = short_window
+        self.long_window = long_window
+        self.callback = callback
+        self.trackers = {}
+
+    def seed(self, ticker_symbol, closes, last_session=None, provisional=False):
+        """
+        Creates (or replaces) the tracker for a ticker from its historical closes.
+        """
+        self.trackers[ticker_symbol] = CrossoverTracker.from_history(
+            closes, self.short_window, self.long_window, last_session=last_session, provisional=provisional)
+
+    def _emit(self, ticker_symbol, event):
+        if event is not None and self.callback is not None:
+            short, long = self.trackers[ticker_symbol].sma_values
+            self.callback(ticker_symbol, event, short, long)
+        return event
+
+    def on_quote(self, ticker_symbol, price, session=None):
+        tracker = self.trackers.get(ticker_symbol)
+        if tracker is None:
+            return None
+        return self._emit(ticker_symbol, tracker.update_quote(price, session))
+
+    def on_bar(self, ticker_symbol, close, session=None):
+        tracker = self.trackers.get(ticker_symbol)
+        if tracker is None:
+            return None
+        return self._emit(ticker_symbol, tracker.add_bar(close, session))
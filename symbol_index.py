@@ -0,0 +1,263 @@
+"""
+Persistent local index of ticker symbols and company names.
+
+Symbols are stored in a small SQLite database and loaded from Finnhub's per-exchange
+symbol lists or from a local CSV. The index is also held in memory as a dict plus sorted
+name and word lists. Exact tickers then resolve with a dict lookup, and company names by
+a binary search for their prefix, instead of a network round trip. When a query still has
+to be resolved over the network, the result is remembered, so it is only looked up once.
+Misses are remembered for MISS_TTL_SECONDS.
+"""
+import bisect
+import csv
+import difflib
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+# --- Configuration ---
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".stock_analyser", "symbols.sqlite")
+RELEVANT_TYPES = ('Common Stock', 'ADRC', 'ETP', 'Equity')  # Ranked ahead of warrants, units, preferreds...
+MISS_TTL_SECONDS = 24 * 3600  # Queries nothing was found for are not searched again for this long
+MAX_PREFIX_CANDIDATES = 500  # Candidates gathered per prefix before ranking
+FUZZY_CUTOFF = 0.8  # difflib similarity needed for a misspelled company name
+# Words dropped from company names and queries, so "Apple" matches "APPLE INC"
+NAME_STOPWORDS = frozenset({'INC', 'CORP', 'CORPORATION', 'CO', 'COMPANY', 'LTD', 'LIMITED', 'PLC', 'LLC',
+                            'SA', 'AG', 'NV', 'SE', 'THE', 'HOLDINGS', 'GROUP'})
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS symbols (
+    symbol TEXT PRIMARY KEY,
+    description TEXT,
+    name TEXT,               -- normalize_name(description)
+    type TEXT,
+    exchange TEXT,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS aliases (
+    query TEXT PRIMARY KEY,  -- normalize_name() of the query
+    symbol TEXT,             -- NULL: nothing was found
+    resolved_at REAL
+);
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    loaded_at REAL,
+    count INTEGER
+);
+"""
+
+
+@dataclass(frozen=True)
+class SymbolMatch:
+    """
+    match: how the symbol was found ('symbol', 'cached', 'name', 'prefix', 'words' or 'fuzzy')
+    """
+    symbol: str
+    description: str
+    type: str
+    match: str
+
+
+def _words(text):
+    return re.findall(r'[A-Z0-9]+', (text or '').upper())
+
+
+def normalize_name(text):
+    """
+    Upper-case words of a company name or query without punctuation and legal-form words.
+    """
+    words = _words(text)
+    kept = [word for word in words if word not in NAME_STOPWORDS]
+    return ' '.join(kept or words)
+
+
+def _prefix_range(entries, prefix, limit=None):
+    """Entries of a sorted list of (key, symbol) whose key starts with `prefix`."""
+    matches = []
+    for i in range(bisect.bisect_left(entries, (prefix,)), len(entries)):
+        key, symbol = entries[i]
+        if not key.startswith(prefix) or (limit is not None and len(matches) >= limit):
+            break
+        matches.append((key, symbol))
+    return matches
+
+
+class SymbolIndex:
+    """
+    Thread-safe symbol index backed by the SQLite file at `path` (':memory:' for a throwaway index).
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._reload()
+
+    def _reload(self):
+        """Rebuilds the in-memory lookup structures from the database."""
+        symbols = {}
+        names = []
+        for symbol, description, name, type_ in self._db.execute(
+                "SELECT symbol, description, name, type FROM symbols ORDER BY name, symbol"):
+            symbols[symbol] = (description or '', type_ or '')
+            if name:
+                names.append((name, symbol))
+        aliases = {query: (symbol, resolved_at)
+                   for query, symbol, resolved_at in self._db.execute("SELECT query, symbol, resolved_at FROM aliases")}
+        # Swapped in one go, so concurrent lookups see either the old or the new index.
+        # The word list is only needed for multi-word queries and is built on first use.
+        self._symbols, self._names, self._name_words, self._aliases = symbols, names, None, aliases
+
+    def _words_index(self):
+        """Sorted (word, symbol) pairs for every word of every company name."""
+        words = self._name_words
+        if words is None:
+            words = sorted((word, symbol) for name, symbol in self._names for word in set(name.split()))
+            self._name_words = words
+        return words
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def __contains__(self, ticker_symbol):
+        return ticker_symbol.strip().upper() in self._symbols
+
+    # --- Loading ---
+
+    def add_symbols(self, rows, source):
+        """
+        Adds or replaces symbols from dicts with 'symbol', 'description' and optional 'type' and
+        'exchange' (or 'mic') keys, as returned by Finnhub's /stock/symbol. Returns the number added.
+        """
+        records = [(str(row['symbol']).strip().upper(), row.get('description'), normalize_name(row.get('description')),
+                    row.get('type'), row.get('exchange') or row.get('mic'), source)
+                   for row in rows if row.get('symbol')]
+        with self._lock:
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO symbols VALUES (?, ?, ?, ?, ?, ?)", records)
+                self._db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (source, time.time(), len(records)))
+            self._reload()
+        return len(records)
+
+    def load_csv(self, path, source=None):
+        """
+        Adds the symbols of a CSV with a 'symbol' (or 'ticker') column and optional 'description'
+        (or 'name'), 'type' and 'exchange' columns. Returns the number added.
+        """
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = []
+            for row in csv.DictReader(f):
+                row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+                rows.append({'symbol': row.get('symbol') or row.get('ticker'),
+                             'description': row.get('description') or row.get('name'),
+                             'type': row.get('type'), 'exchange': row.get('exchange')})
+        return self.add_symbols(rows, source or f"csv:{os.path.abspath(path)}")
+
+    def source_loaded_at(self, source):
+        """Epoch seconds when `source` was last loaded, or None if it never was."""
+        with self._lock:
+            row = self._db.execute("SELECT loaded_at FROM sources WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    # --- Lookup ---
+
+    def _match(self, symbol, match):
+        description, type_ = self._symbols.get(symbol, ('', ''))
+        return SymbolMatch(symbol, description, type_, match)
+
+    def _ranked(self, symbols, match, limit):
+        def rank(symbol):
+            description, type_ = self._symbols[symbol]
+            # Common stock first, then primary listings (no exchange suffix), then the shortest name
+            return (type_ not in RELEVANT_TYPES, '.' in symbol, len(description), symbol)
+        return [self._match(symbol, match) for symbol in sorted(set(symbols), key=rank)[:limit]]
+
+    def lookup(self, query, limit=10, exact_only=False):
+        """
+        Local matches for a ticker or company name, best first, without any network call.
+        The first stage that finds anything wins:
+        exact ticker, remembered query, exact name, name prefix, prefixes of every word, fuzzy name.
+        With `exact_only`, only the first two stages run.
+        """
+        ticker = (query or '').strip().upper()
+        if not ticker:
+            return []
+        if ticker in self._symbols:
+            return [self._match(ticker, 'symbol')]
+        key = normalize_name(query)
+        cached = self._aliases.get(key)
+        if cached and cached[0]:
+            return [self._match(cached[0], 'cached')]
+        if not key or exact_only:
+            return []
+
+        names = self._names
+        prefixed = _prefix_range(names, key, MAX_PREFIX_CANDIDATES)
+        exact = [symbol for name, symbol in prefixed if name == key]
+        if exact:
+            return self._ranked(exact, 'name', limit)
+        if prefixed:
+            return self._ranked([symbol for _, symbol in prefixed], 'prefix', limit)
+
+        query_words = key.split()
+        if len(query_words) > 1:
+            found = None
+            for word in query_words:
+                with_word = {symbol for _, symbol in _prefix_range(self._words_index(), word)}
+                found = with_word if found is None else found & with_word
+                if not found:
+                    break
+            if found:
+                return self._ranked(found, 'words', limit)
+
+        # Misspellings: compare against the names sharing the query's first letter only
+        candidates = {name: symbol for name, symbol in _prefix_range(names, key[0])}
+        close = difflib.get_close_matches(key, list(candidates), n=limit, cutoff=FUZZY_CUTOFF)
+        return [self._match(candidates[name], 'fuzzy') for name in close]
+
+    def resolve(self, query, exact_only=False):
+        """The best local symbol for `query`, or None."""
+        matches = self.lookup(query, limit=1, exact_only=exact_only)
+        return matches[0].symbol if matches else None
+
+    def is_known_miss(self, query, max_age=MISS_TTL_SECONDS):
+        """True if a network search for `query` found nothing within the last `max_age` seconds."""
+        cached = self._aliases.get(normalize_name(query))
+        return bool(cached) and cached[0] is None and time.time() - cached[1] <= max_age
+
+    def remember(self, query, symbol, description=None, type=None):
+        """
+        Records what `query` resolved to over the network (None for nothing found), so it is answered
+        locally next time. A symbol missing from the index is added to it.
+        """
+        key = normalize_name(query)
+        if not key:
+            return
+        symbol = symbol.strip().upper() if symbol else None
+        with self._lock:
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?, ?)", (key, symbol, time.time()))
+                if symbol and symbol not in self._symbols:
+                    self._db.execute("INSERT OR REPLACE INTO symbols VALUES (?, ?, ?, ?, ?, ?)",
+                                     (symbol, description, normalize_name(description), type, None, 'resolved'))
+            # Updated in place rather than reloaded, so each remembered result costs O(log n) searches plus
+            # a list insert. A lookup running meanwhile may miss the new entry, which is harmless.
+            self._aliases[key] = (symbol, time.time())
+            if symbol and symbol not in self._symbols:
+                self._symbols[symbol] = (description or '', type or '')
+                name = normalize_name(description)
+                if name:
+                    bisect.insort(self._names, (name, symbol))
+                    if self._name_words is not None:
+                        for word in set(name.split()):
+                            bisect.insort(self._name_words, (word, symbol))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,116 @@
+"""
+FinnhubClient against a local http.server stub: retries on 429/5xx, Retry-After, and giving up.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from finnhub_client import FinnhubClient
+from rate_limiter import TokenBucket
+
+
+class StubFinnhub(BaseHTTPRequestHandler):
+    """
+    Answers each request with the next scripted (status, headers, body) for its path;
+    the last entry repeats once the script runs out.
+    """
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+    scripts = {}
+    seen = []
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        self.seen.append((path, self.headers.get('X-Finnhub-Token')))
+        script = self.scripts[path]
+        status, headers, body = script.pop(0) if len(script) > 1 else script[0]
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FinnhubClientTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubFinnhub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubFinnhub.scripts = {}
+        StubFinnhub.seen = []
+        self.client = FinnhubClient('test-key', base_url=self.base_url, max_retries=3,
+                                    backoff_base=0.001, backoff_max=1.0)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_retries_server_errors_then_succeeds(self):
+        StubFinnhub.scripts['/quote'] = [(503, {}, {}), (500, {}, {}), (200, {}, {'c': 123.4})]
+        self.assertEqual(self.client.quote('AAPL'), {'c': 123.4})
+        metrics = self.client.metrics()
+        self.assertEqual((metrics['requests'], metrics['retries'], metrics['failures']), (3, 2, 0))
+        self.assertEqual(metrics['connections_opened'], 1)  # Every retry reused the pooled connection
+        self.assertTrue(all(token == 'test-key' for _, token in StubFinnhub.seen))
+
+    def test_429_waits_for_retry_after(self):
+        StubFinnhub.scripts['/quote'] = [(429, {'Retry-After': '0.3'}, {'error': 'limit'}), (200, {}, {'c': 1.0})]
+        start = time.perf_counter()
+        self.assertEqual(self.client.quote('AAPL'), {'c': 1.0})
+        self.assertGreaterEqual(time.perf_counter() - start, 0.3)
+        self.assertEqual(self.client.metrics()['retries'], 1)
+
+    def test_429_penalizes_the_shared_rate_limiter(self):
+        limiter = TokenBucket(6000, burst=5)
+        client = FinnhubClient('test-key', base_url=self.base_url, backoff_base=0.001, rate_limiter=limiter)
+        self.addCleanup(client.close)
+        StubFinnhub.scripts['/search'] = [(429, {'Retry-After': '0.2'}, {}), (200, {}, {'result': []})]
+        self.assertEqual(client.search('apple'), {'result': []})
+        # The retry waited in the limiter as well as in the backoff
+        self.assertGreaterEqual(client.metrics()['rate_limited_calls'], 1)
+
+    def test_gives_up_after_max_retries(self):
+        StubFinnhub.scripts['/stock/profile2'] = [(502, {}, {})]
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.client.company_profile('AAPL')
+        metrics = self.client.metrics()
+        self.assertEqual((metrics['requests'], metrics['retries'], metrics['failures']), (4, 3, 1))
+
+    def test_client_errors_are_not_retried(self):
+        StubFinnhub.scripts['/quote'] = [(403, {}, {'error': 'no access'})]
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.client.quote('AAPL')
+        self.assertEqual(self.client.metrics()['requests'], 1)
+
+    def test_connection_errors_are_retried_then_raised(self):
+        client = FinnhubClient('test-key', base_url='http://127.0.0.1:9', max_retries=2,
+                               backoff_base=0.001, connect_timeout=0.5)
+        self.addCleanup(client.close)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            client.quote('AAPL')
+        self.assertEqual(client.metrics()['requests'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()